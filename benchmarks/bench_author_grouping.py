@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Compare the groupby/iterrows and vectorized author grouping on a synthetic PaperAuthorAffiliations table"""
+
+import sys, os, time
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from paper_collection.data_getter import get_authors_by_paper
+from synthetic import make_paper_authors
+
+def get_authors_by_paper_loop(df_authors):
+    """Previous implementation: groupby, then sort_values and iterrows for each paper
+
+    """
+    author_data = {}
+    for paper_id, group in df_authors.groupby('PaperId'):
+        group = group.sort_values('AuthorSequenceNumber')
+        this_authors = []
+        for _, row in group.iterrows():
+            this_authors.append({'name': row.OriginalAuthor, 'author_id': row.AuthorId})
+        author_data[paper_id] = this_authors
+    return author_data
+
+def main(args):
+    df_authors = make_paper_authors(args.num_rows)
+    logger.info("synthetic table: {} rows, {} papers".format(len(df_authors), df_authors['PaperId'].nunique()))
+
+    start = timer()
+    vectorized = get_authors_by_paper(df_authors)
+    elapsed_vectorized = timer() - start
+    logger.info("vectorized: {}".format(format_timespan(elapsed_vectorized)))
+
+    if args.skip_loop:
+        return
+    start = timer()
+    loop = get_authors_by_paper_loop(df_authors)
+    elapsed_loop = timer() - start
+    logger.info("groupby/iterrows: {}".format(format_timespan(elapsed_loop)))
+    logger.info("speedup: {:.1f}x".format(elapsed_loop / elapsed_vectorized))
+    assert vectorized == loop
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--num-rows", type=int, default=1000000, help="number of rows in the synthetic PaperAuthorAffiliations table (default: 1000000)")
+    parser.add_argument("--skip-loop", action='store_true', help="only time the vectorized path")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
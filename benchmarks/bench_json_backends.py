@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Measure JSON encode throughput (MB/s) for each installed serializer backend"""
+
+import sys, os, time
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from paper_collection import PaperCollection
+from paper_collection.serialize import SERIALIZERS, get_serializer
+from synthetic import make_papers, make_paper_authors, make_citations
+
+COLUMN_MAP = {
+    'paper_id': 'PaperId',
+    'title': 'PaperTitle',
+    'display_title': 'OriginalTitle',
+    'doi': 'Doi',
+    'pub_date': 'Date',
+    'year': 'Year',
+    'venue': 'OriginalVenue',
+    'node_rank': 'flow',
+    'citing': 'PaperId',
+    'cited': 'PaperReferenceId',
+}
+
+def main(args):
+    df_papers = make_papers(args.num_papers)
+    df_authors = make_paper_authors(paper_ids=df_papers['PaperId'].values)
+    df_citations = make_citations(df_papers['PaperId'].values)
+    coll = PaperCollection.from_frames(df_papers, df_citations, df_authors, column_map=COLUMN_MAP,
+                                       dataset='mag', dataset_version='mag-2019-11-22')
+    records = [p.to_dict() for p in coll.papers]
+    records.extend({'source': str(citing), 'target': str(cited)} for citing, cited in coll.citations)
+    logger.info("{} papers, {} citations, {} records".format(len(coll.papers), len(coll.citations), len(records)))
+
+    for name in SERIALIZERS:
+        try:
+            _, dumps = get_serializer(name)
+        except ImportError:
+            logger.info("{}: not installed".format(name))
+            continue
+        start = timer()
+        num_bytes = sum(len(dumps(r)) for r in records)
+        elapsed_encode = timer() - start
+        with tempfile.TemporaryDirectory() as tmpdir:
+            start = timer()
+            coll.write_graph(Path(tmpdir).joinpath('graph.json'), serializer=name)
+            elapsed_write = timer() - start
+        logger.info("{}: encode {:.1f} MB/s ({:.1f} MB in {}); write_graph {}".format(
+            name, num_bytes / 1e6 / elapsed_encode, num_bytes / 1e6, format_timespan(elapsed_encode), format_timespan(elapsed_write)))
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--num-papers", type=int, default=100000, help="number of synthetic papers (default: 100000)")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Time PageRank node ranks (cold and warm start) on a synthetic citation graph, optionally against networkx"""
+
+import sys, os, time
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+import numpy as np
+
+from paper_collection.citation_graph import CitationGraph
+from paper_collection.ranking import pagerank
+from synthetic import make_paper_ids, make_citations
+
+def main(args):
+    paper_ids = make_paper_ids(args.num_papers)
+    df_citations = make_citations(paper_ids, refs_per_paper=args.refs_per_paper)
+    start = timer()
+    cg = CitationGraph.from_collection([], df_citations[['PaperId', 'PaperReferenceId']].values)
+    logger.info("built {} in {}".format(cg, format_timespan(timer() - start)))
+
+    for use_scipy in [True, False]:
+        start = timer()
+        ranks, iterations = pagerank(cg, use_scipy=use_scipy)
+        logger.info("pagerank (use_scipy={}): {} iterations in {}".format(use_scipy, iterations, format_timespan(timer() - start)))
+
+    start = timer()
+    _, iterations = pagerank(cg, start=ranks)
+    logger.info("pagerank (warm start): {} iterations in {}".format(iterations, format_timespan(timer() - start)))
+
+    if args.networkx:
+        import networkx as nx
+        G = cg.to_networkx()
+        start = timer()
+        expected = nx.pagerank(G)
+        logger.info("networkx pagerank: {}".format(format_timespan(timer() - start)))
+        expected = np.array([expected[str(x)] for x in cg.node_ids.tolist()])
+        logger.info("max abs difference: {:g}".format(np.abs(expected - ranks).max()))
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--num-papers", type=int, default=1000000, help="number of citing papers (default: 1000000)")
+    parser.add_argument("--refs-per-paper", type=int, default=10, help="average number of references per paper (default: 10)")
+    parser.add_argument("--networkx", action='store_true', help="also time networkx.pagerank and compare (slow for large graphs)")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Compare memory used by a list of Papers (with and without __slots__) and a PaperTable"""
+
+import sys, os, time
+import gc
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan, format_size
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+    def format_size(num_bytes):
+        return "{:.1f} MB".format(num_bytes / 1e6)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from paper_collection import PaperCollection, Paper, PAPER_FIELDS
+from synthetic import make_papers, make_paper_authors
+
+COLUMN_MAP = {
+    'paper_id': 'PaperId',
+    'title': 'PaperTitle',
+    'display_title': 'OriginalTitle',
+    'doi': 'Doi',
+    'pub_date': 'Date',
+    'year': 'Year',
+    'venue': 'OriginalVenue',
+    'node_rank': 'flow',
+}
+
+class DictPaper:
+
+    """Paper without __slots__, as the class was before"""
+
+    def __init__(self, **kwargs):
+        for f in PAPER_FIELDS:
+            setattr(self, f, kwargs.get(f))
+        if (not self.display_title) and (self.title):
+            self.display_title = self.title.title()
+        if (not self.url) and (self.doi):
+            self.url = "https://doi.org/{}".format(self.doi)
+        self.authors = kwargs.get('authors') or []
+        self.display_authors = ", ".join(a['name'] for a in self.authors) if self.authors else None
+
+def measure(name, build):
+    """Trace memory allocated by build() that is still alive afterwards"""
+    gc.collect()
+    tracemalloc.start()
+    start = timer()
+    obj = build()
+    elapsed = timer() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logger.info("{}: {} retained, {} peak, built in {}".format(name, format_size(current), format_size(peak), format_timespan(elapsed)))
+    del obj
+    return current
+
+def main(args):
+    df_papers = make_papers(args.num_papers)
+    df_authors = make_paper_authors(paper_ids=df_papers['PaperId'].values)
+    logger.info("{} papers, {} paper/author rows".format(len(df_papers), len(df_authors)))
+    kwargs = dict(df_authors=df_authors, column_map=COLUMN_MAP, dataset='mag', dataset_version='mag-2019-11-22')
+
+    def build_dict_papers():
+        coll = PaperCollection.from_frames(df_papers, **kwargs)
+        return [DictPaper(authors=p.authors, **{f: getattr(p, f) for f in PAPER_FIELDS}) for p in coll.papers]
+
+    # the DictPaper list is built from a temporary collection; only what survives is counted
+    baseline = measure("list of Papers without __slots__", build_dict_papers)
+    slots = measure("list of Papers with __slots__", lambda: PaperCollection.from_frames(df_papers, **kwargs))
+    table = measure("PaperTable", lambda: PaperCollection.from_frames(df_papers, compact=True, **kwargs))
+    logger.info("__slots__: {:.1f}x smaller; PaperTable: {:.1f}x smaller".format(baseline / slots, baseline / table))
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--num-papers", type=int, default=100000, help="number of synthetic papers (default: 100000)")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
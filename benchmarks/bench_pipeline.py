@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Time each stage of building and writing a collection on synthetic MAG tables, and check for regressions
+
+Stages: author grouping, load_collection (PaperCollection.from_frames),
+construct_graph, to_dict, and write_graph. Each size runs in a fresh
+process, so the peak RSS reported for it is not affected by the others.
+
+Save a baseline with --output, then run again with --compare to exit
+with an error if any stage got slower by more than --max-regression percent.
+"""
+
+import sys, os, time, json
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan, format_size
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+    def format_size(num_bytes):
+        return "{:.1f} MB".format(num_bytes / 1e6)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+STAGES = ['author_grouping', 'load_collection', 'construct_graph', 'to_dict', 'write_graph']
+
+COLUMN_MAP = {
+    'paper_id': 'PaperId',
+    'title': 'PaperTitle',
+    'display_title': 'OriginalTitle',
+    'doi': 'Doi',
+    'pub_date': 'Date',
+    'year': 'Year',
+    'venue': 'OriginalVenue',
+    'node_rank': 'flow',
+    'citing': 'PaperId',
+    'cited': 'PaperReferenceId',
+}
+
+def peak_rss():
+    """Peak resident set size of this process so far, in bytes"""
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+def run_size(num_papers, refs_per_paper=10, repeat=1, stages=None):
+    """Generate synthetic tables and time each stage (best of `repeat` runs)
+
+    :returns: dict of stage -> {'seconds': ..., 'peak_rss': ...}. peak_rss is the process's high-water mark after the stage
+
+    """
+    import tempfile
+    from paper_collection import PaperCollection
+    from paper_collection.data_getter import get_authors_by_paper
+    from synthetic import make_mag_tables
+    stages = stages or STAGES
+    tables = make_mag_tables(num_papers, refs_per_paper=refs_per_paper)
+    results = {'num_citations': len(tables['citations']), 'num_author_rows': len(tables['paper_authors'])}
+    coll = None
+    with tempfile.TemporaryDirectory() as tmpdir:
+        funcs = {
+            'author_grouping': lambda: get_authors_by_paper(tables['paper_authors']),
+            'load_collection': lambda: PaperCollection.from_frames(tables['papers'],
+                                                                   df_citations=tables['citations'],
+                                                                   df_authors=tables['paper_authors'],
+                                                                   column_map=COLUMN_MAP,
+                                                                   dataset='mag',
+                                                                   dataset_version='mag-2019-11-22'),
+            'construct_graph': lambda: coll.construct_graph(),
+            'to_dict': lambda: [p.to_dict() for p in coll.papers],
+            'write_graph': lambda: coll.write_graph(os.path.join(tmpdir, 'graph.json')),
+        }
+        # the later stages need the collection
+        needed = set(stages)
+        if needed - {'author_grouping'}:
+            needed.add('load_collection')
+        for stage in STAGES:
+            if stage not in needed:
+                continue
+            best = None
+            for _ in range(repeat):
+                start = timer()
+                r = funcs[stage]()
+                elapsed = timer() - start
+                best = elapsed if best is None else min(best, elapsed)
+                if stage == 'load_collection':
+                    coll = r
+                del r
+            if stage in stages:
+                results[stage] = {'seconds': best, 'peak_rss': peak_rss()}
+            if stage == 'construct_graph':
+                coll.G = None
+    return results
+
+def compare(results, baseline, max_regression):
+    """Find stages that got slower than the baseline by more than max_regression percent
+
+    Stages that took less than 0.05 seconds in the baseline are skipped, since timer noise dominates.
+
+    :returns: list of (size, stage, baseline seconds, seconds)
+
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, r in stages.items():
+            if not isinstance(r, dict):
+                continue
+            base = baseline.get(size, {}).get(stage)
+            if base is None or base['seconds'] < 0.05:
+                continue
+            if r['seconds'] > base['seconds'] * (1 + max_regression / 100):
+                regressions.append((size, stage, base['seconds'], r['seconds']))
+    return regressions
+
+def main(args):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    results = {}
+    for num_papers in args.sizes:
+        logger.info("{} papers".format(num_papers))
+        # a fresh process for each size, so peak RSS is per size
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            r = executor.submit(run_size, num_papers, refs_per_paper=args.refs_per_paper, repeat=args.repeat, stages=args.stages).result()
+        logger.info("  {} citations, {} author rows".format(r['num_citations'], r['num_author_rows']))
+        for stage in STAGES:
+            if stage in r:
+                logger.info("  {:<16} {:>16}   peak RSS {}".format(stage, format_timespan(r[stage]['seconds']), format_size(r[stage]['peak_rss'])))
+        results[str(num_papers)] = r
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        logger.info("results written to {}".format(args.output))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.max_regression)
+        for size, stage, base_seconds, seconds in regressions:
+            logger.error("regression: {} papers, {}: {:.3f}s -> {:.3f}s (+{:.0f}%)".format(
+                size, stage, base_seconds, seconds, 100 * (seconds / base_seconds - 1)))
+        if regressions:
+            sys.exit(1)
+        logger.info("no stage is more than {}% slower than {}".format(args.max_regression, args.compare))
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs='+', type=int, default=[10**4, 10**5, 10**6], help="numbers of papers (default: 10000 100000 1000000). 10000000 needs tens of GB of memory")
+    parser.add_argument("--refs-per-paper", type=int, default=10, help="average number of references per paper (default: 10)")
+    parser.add_argument("--stages", nargs='+', choices=STAGES, help="stages to time (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="run each stage this many times and keep the fastest (default: 1)")
+    parser.add_argument("--output", help="write the results to this JSON file (e.g., to use as a baseline)")
+    parser.add_argument("--compare", help="baseline results JSON file to compare against")
+    parser.add_argument("--max-regression", type=float, default=20, help="with --compare, fail if a stage is more than this percent slower (default: 20)")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
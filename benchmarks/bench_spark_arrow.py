@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Time the get_*_spark calls of DataGetterMAG2019 with Arrow transfer on and off (local mode)"""
+
+import sys, os, time
+import tempfile
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from config import Config
+from paper_collection.data_getter import DataGetterMAG2019
+from synthetic import make_papers, make_paper_authors, make_citations
+
+def write_parquet(spark, outdir, num_papers):
+    """Write synthetic MAG tables to parquet; returns the seed paper IDs"""
+    df_papers = make_papers(num_papers)
+    paper_ids = df_papers['PaperId'].values
+    sdf = spark.createDataFrame(df_papers)
+    sdf.withColumn('Date', sdf['Date'].cast('date')).write.parquet(str(outdir.joinpath('papers')))
+    spark.createDataFrame(make_citations(paper_ids)).write.parquet(str(outdir.joinpath('citations')))
+    spark.createDataFrame(make_paper_authors(paper_ids=paper_ids)).write.parquet(str(outdir.joinpath('paper_authors')))
+    return paper_ids
+
+def main(args):
+    logging.getLogger('py4j').setLevel(logging.WARNING)
+    config = Config(spark_mem=args.spark_mem)
+    spark = config.spark
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outdir = Path(tmpdir)
+            paper_ids = write_parquet(spark, outdir, args.num_papers)
+            # seed half the papers
+            paper_ids = paper_ids[::2].tolist()
+            for arrow in [False, True, False, True]:
+                datagetter = DataGetterMAG2019(config, paper_ids, method=None)
+                datagetter.arrow = datagetter.set_arrow(arrow)
+                datagetter.sdf_papers = datagetter.read_spark(outdir.joinpath('papers'))
+                datagetter.sdf_citations = datagetter.read_spark(outdir.joinpath('citations'))
+                datagetter.sdf_paper_authors = datagetter.read_spark(outdir.joinpath('paper_authors'))
+                datagetter.sdf_seed_ids = datagetter.get_seed_ids_spark()
+                for name in ['get_papers_spark', 'get_citations_spark', 'get_paper_authors_spark']:
+                    start = timer()
+                    df = getattr(datagetter, name)()
+                    logger.info("arrow={}: {} ({} rows): {}".format(arrow, name, len(df), format_timespan(timer() - start)))
+    finally:
+        config.teardown()
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--num-papers", type=int, default=100000, help="number of synthetic papers (default: 100000)")
+    parser.add_argument("--spark-mem", default='4g', help="spark driver/executor memory (default: 4g)")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
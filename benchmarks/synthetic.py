@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Synthetic MAG-shaped data for benchmarks"""
+
+import numpy as np
+import pandas as pd
+
+VENUES = ["Journal {}".format(i) for i in range(500)]
+
+def make_paper_ids(num_papers, seed=0):
+    """Make unique MAG-like paper IDs"""
+    rng = np.random.default_rng(seed)
+    return rng.choice(np.arange(10**9, 10**9 + num_papers * 10), size=num_papers, replace=False)
+
+def make_papers(num_papers, seed=0):
+    """Make a synthetic table of papers with the MAG columns used by DataGetterMAG2019
+
+    :num_papers: number of papers
+    :returns: pandas DataFrame
+
+    """
+    rng = np.random.default_rng(seed)
+    paper_ids = make_paper_ids(num_papers, seed=seed)
+    years = rng.integers(1950, 2020, size=num_papers)
+    months = rng.integers(1, 13, size=num_papers)
+    titles = ["a study of topic {} and topic {}".format(a, b)
+              for a, b in zip(rng.integers(0, 10**6, size=num_papers), rng.integers(0, 10**6, size=num_papers))]
+    venue_idx = rng.integers(0, len(VENUES), size=num_papers)
+    return pd.DataFrame({
+        'PaperId': paper_ids,
+        'Doi': ["10.{}/{}".format(1000 + (x % 9000), x) for x in paper_ids],
+        'PaperTitle': titles,
+        'OriginalTitle': [t.capitalize() for t in titles],
+        'Year': years,
+        'Date': ["{}-{:02d}-01".format(y, m) for y, m in zip(years, months)],
+        'OriginalVenue': [VENUES[i] for i in venue_idx],
+        'flow': rng.pareto(2.0, size=num_papers) * 1e-8,
+    })
+
+def make_paper_authors(num_rows=None, max_authors=10, seed=0, paper_ids=None):
+    """Make a synthetic PaperAuthorAffiliations table
+
+    :num_rows: approximate number of paper/author rows (ignored if paper_ids is given)
+    :max_authors: maximum number of authors per paper
+    :paper_ids: paper IDs to assign authors to (default: make new IDs)
+    :returns: pandas DataFrame, shuffled so that papers are not contiguous
+
+    """
+    rng = np.random.default_rng(seed)
+    if paper_ids is None:
+        authors_per_paper = rng.integers(1, max_authors + 1, size=num_rows // ((max_authors + 1) // 2) + 1)
+        authors_per_paper = authors_per_paper[np.cumsum(authors_per_paper) <= num_rows]
+        paper_ids = make_paper_ids(len(authors_per_paper), seed=seed)
+    else:
+        authors_per_paper = rng.integers(1, max_authors + 1, size=len(paper_ids))
+    paper_col = np.repeat(paper_ids, authors_per_paper)
+    starts = np.repeat(np.cumsum(authors_per_paper) - authors_per_paper, authors_per_paper)
+    seq_col = np.arange(len(paper_col)) - starts + 1
+    author_ids = rng.integers(10**8, 10**8 + len(paper_col), size=len(paper_col))
+    df = pd.DataFrame({
+        'PaperId': paper_col,
+        'AuthorId': author_ids,
+        'AffiliationId': np.nan,
+        'AuthorSequenceNumber': seq_col,
+        'OriginalAuthor': ["Author {}".format(x) for x in author_ids],
+        'OriginalAffiliation': '',
+    })
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+def make_citations(paper_ids, refs_per_paper=10, seed=0):
+    """Make a synthetic citations table among the given papers
+
+    Citing papers are uniform; cited papers are skewed toward a few
+    highly cited ones.
+
+    :paper_ids: array of paper IDs
+    :refs_per_paper: average number of references per paper
+    :returns: pandas DataFrame with PaperId and PaperReferenceId columns
+
+    """
+    rng = np.random.default_rng(seed)
+    paper_ids = np.asarray(paper_ids)
+    num_citations = len(paper_ids) * refs_per_paper
+    citing = rng.integers(0, len(paper_ids), size=num_citations)
+    cited = np.minimum((rng.pareto(1.5, size=num_citations) * len(paper_ids) / 100).astype(np.int64), len(paper_ids) - 1)
+    cited = rng.permutation(len(paper_ids))[cited]
+    keep = citing != cited
+    df = pd.DataFrame({'PaperId': paper_ids[citing[keep]], 'PaperReferenceId': paper_ids[cited[keep]]})
+    return df.drop_duplicates().reset_index(drop=True)
+
+def make_mag_tables(num_papers, refs_per_paper=10, max_authors=10, seed=0):
+    """Make the three MAG tables used by DataGetterMAG2019, for the same papers
+
+    :num_papers: number of papers (about 10**7 is the most that fits in a few tens of GB)
+    :returns: dict with 'papers', 'citations', and 'paper_authors' pandas DataFrames
+
+    """
+    df_papers = make_papers(num_papers, seed=seed)
+    paper_ids = df_papers['PaperId'].to_numpy()
+    return {
+        'papers': df_papers,
+        'citations': make_citations(paper_ids, refs_per_paper=refs_per_paper, seed=seed),
+        'paper_authors': make_paper_authors(max_authors=max_authors, seed=seed, paper_ids=paper_ids),
+    }
@@ -1,10 +1,18 @@
 import os
 from pathlib import Path
-# from dotenv import load_dotenv, find_dotenv, DotEnv
-from dotenv import load_dotenv, find_dotenv, dotenv_values
-dotenv_path = find_dotenv()
-load_dotenv(dotenv_path)
-# dotenv_vals = load_dotenv(dotenv_path)
+
+# the .env file is found and loaded when the first Config is created (see load_env()),
+# so that importing this module is cheap
+dotenv_path = None
+
+def load_env():
+    """Load environment variables from the .env file, once"""
+    global dotenv_path
+    if dotenv_path is None:
+        from dotenv import load_dotenv, find_dotenv
+        dotenv_path = find_dotenv()
+        load_dotenv(dotenv_path)
+    return dotenv_path
 
 REQUIRED_VARS = [
 ]
@@ -20,7 +28,8 @@ OPTIONAL_VARS = [
 
 class Config(object):
 
-    def __init__(self, spark_mem=None, path_to_paper_data=None, path_to_citation_data=None):
+    def __init__(self, spark_mem=None, path_to_paper_data=None, path_to_citation_data=None, spark_arrow=None):
+        load_env()
         self.PROJECT_DIR = os.environ.get('PROJECT_DIR') or Path(__file__).resolve().parents[1]
 
         for var in REQUIRED_VARS:
@@ -35,6 +44,10 @@ class Config(object):
         self._mysql_db = None
         self._spark = None
         self.spark_mem = spark_mem or os.environ.get('SPARK_MEM') or '80g'
+        # use Apache Arrow to transfer data in toPandas() (off unless SPARK_ARROW or spark_arrow turns it on)
+        if spark_arrow is None:
+            spark_arrow = os.environ.get('SPARK_ARROW', 'false').lower() in ['1', 'true', 'yes']
+        self.spark_arrow = spark_arrow
 
         self._elasticsearch = None
 
@@ -57,7 +70,7 @@ class Config(object):
     @property
     def spark(self):
         if self.get('_spark') is None:
-            self._spark = self.load_spark_session(mem=self.spark_mem)
+            self._spark = self.load_spark_session(mem=self.spark_mem, arrow=self.spark_arrow)
         return self._spark
 
     @spark.deleter
@@ -109,18 +122,22 @@ class Config(object):
         """
         self._mysql_db = self._get_mysql_connection(db_name=db_name)
 
-    def load_spark_session(self, appName="sparkApp", mem='80g', showConsoleProgress=False, additional_conf=[], logLevel=None):
+    def load_spark_session(self, appName="sparkApp", mem='80g', showConsoleProgress=False, additional_conf=[], logLevel=None, arrow=False):
         # import findspark
         # findspark.init()
 
         import pyspark
+        arrow = "true" if arrow else "false"
         conf = pyspark.SparkConf().setAll([
             ('spark.executor.memory', mem), 
             ('spark.driver.memory', mem),
             ('spark.ui.showConsoleProgress', showConsoleProgress),
             ('spark.driver.maxResultSize', '0'),
             ('spark.reducer.maxSizeInFlight', '5g'),
-            ("spark.sql.execution.arrow.enabled", "false"),
+            ("spark.sql.execution.arrow.enabled", arrow),  # spark 2.x
+            ("spark.sql.execution.arrow.pyspark.enabled", arrow),  # spark 3.x
+            ("spark.sql.execution.arrow.fallback.enabled", "true"),
+            ("spark.sql.execution.arrow.pyspark.fallback.enabled", "true"),
             ("spark.driver.extraJavaOptions", "-Duser.timezone=UTC"),  # https://stackoverflow.com/a/48767250
             ("spark.executor.extraJavaOptions", "-Duser.timezone=UTC"),
         ])
@@ -4,4 +4,39 @@ __author__ = """Jason Portenoy"""
 __email__ = 'jason.portenoy@gmail.com'
 __version__ = '0.1.0'
 
-from .paper_collection import *
+from .paper_collection import PAPER_FIELDS, DERIVED_FIELDS, derive_display_fields, Paper, PaperCollection
+
+# Names from submodules that need numpy, pandas, pyarrow, pyspark, or aiohttp.
+# They are imported on first access, so that `import paper_collection` stays fast.
+_LAZY_IMPORTS = {
+    'PaperTable': 'paper_table',
+    'CitationGraph': 'citation_graph',
+    'CoauthorshipGraph': 'coauthorship',
+    'pagerank': 'ranking',
+    'FrameCache': 'cache',
+    'Metrics': 'metrics',
+    'get_authors_by_paper': 'data_getter',
+    'DataGetterMAG2019': 'data_getter',
+    'BatchDataGetterMAG2019': 'batch',
+    'make_app': 'server',
+}
+
+__all__ = [
+    'PAPER_FIELDS',
+    'DERIVED_FIELDS',
+    'derive_display_fields',
+    'Paper',
+    'PaperCollection',
+]
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        module = importlib.import_module('.' + _LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
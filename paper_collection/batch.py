@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Build many collections from one extraction of the MAG tables.
+
+The seed sets are combined, so each MAG table is scanned once (by either
+engine) for the union of the seed papers. The extracted rows are then
+tagged with each collection they belong to and split per collection.
+Building the PaperCollections and writing their graphs is spread over a
+process pool.
+
+"""
+
+import os
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from . import PaperCollection
+from .data_getter import DataGetterMAG2019
+
+def build_collection(frames, column_map, description=None, dataset=None, dataset_version=None):
+    """Build a PaperCollection from one collection's frames (as split by BatchDataGetterMAG2019)"""
+    return PaperCollection.from_frames(frames['papers'],
+                                       df_citations=frames['citations'],
+                                       df_authors=frames['paper_authors'],
+                                       column_map=column_map,
+                                       description=description,
+                                       dataset=dataset,
+                                       dataset_version=dataset_version)
+
+def _build_and_write(job):
+    """Process pool worker: build one collection and write its graph
+    :returns: dict summarizing the collection, with the metrics of its stages
+
+    """
+    from .metrics import Metrics
+    start = timer()
+    metrics = Metrics()
+    with metrics.stage('load_collection') as record:
+        coll = build_collection(job['frames'], job['column_map'],
+                                description=job['description'],
+                                dataset=job['dataset'],
+                                dataset_version=job['dataset_version'])
+        record['rows'] = len(coll)
+    coll.metrics = metrics
+    coll.write_graph(job['outfpath'], compress=job['compress'], serializer=job['serializer'])
+    return {
+        'name': job['name'],
+        'outfpath': str(job['outfpath']),
+        'num_papers': len(coll),
+        'num_citations': len(coll.citations),
+        'seconds': timer() - start,
+        'metrics': metrics.to_dict(),
+    }
+
+class BatchDataGetterMAG2019:
+
+    """Get several collections from the MAG 2019 data set with one extraction
+
+    The extraction for the union of the seed sets is done by a
+    DataGetterMAG2019 (self.extraction) that does not build a collection.
+    """
+
+    def __init__(self, config, seed_sets, descriptions=None, method='spark', papers=None, citations=None, paper_authors=None, arrow=None, cache_dir=None, cache_max_bytes=None):
+        """
+        config: Config object
+        seed_sets: dict of collection name -> list of seed paper IDs
+        descriptions: dict of collection name -> description (default: the name)
+        method, papers, citations, paper_authors, arrow, cache_dir, cache_max_bytes: see DataGetterMAG2019
+                (the cache, if used, stores the extraction for the union of the seed sets)
+
+        k-hop expansion is not supported, since each collection's neighborhood
+        depends on its own seed set.
+        """
+        self.seed_sets = {name: sorted(set(int(x) for x in paper_ids if str(x).strip()))
+                          for name, paper_ids in seed_sets.items()}
+        self.descriptions = {name: name for name in self.seed_sets}
+        if descriptions:
+            self.descriptions.update(descriptions)
+        paper_ids = sorted(set().union(*self.seed_sets.values()))
+        self.extraction = DataGetterMAG2019(config, paper_ids, method=method,
+                                            papers=papers, citations=citations, paper_authors=paper_authors,
+                                            arrow=arrow, cache_dir=cache_dir, cache_max_bytes=cache_max_bytes,
+                                            load=False)
+        self.metrics = self.extraction.metrics
+        self.seed_ids = self.extraction.seed_ids
+        self.from_cache = self.extraction.from_cache
+        self.column_map = self.extraction.column_map
+        self.dataset = self.extraction.dataset
+        self.dataset_version = self.extraction.dataset_version
+        self.frames = self.split_frames() if method in ['spark', 'arrow'] else {}
+
+    def get_membership(self):
+        """Get a pandas DataFrame with one row per (collection, seed paper), with the collection as an integer code"""
+        import numpy as np
+        import pandas as pd
+        names = list(self.seed_sets)
+        sizes = [len(self.seed_sets[name]) for name in names]
+        ids = [x for name in names for x in self.seed_sets[name]]
+        return pd.DataFrame({
+            '_collection': np.repeat(np.arange(len(names), dtype=np.int32), sizes),
+            '_seed_id': np.asarray(ids, dtype=np.int64),
+        })
+
+    def tag_rows(self, df, colnames, membership):
+        """Tag the rows of df with each collection they belong to
+
+        A row belongs to a collection if the values in all of colnames are
+        seeds of that collection (e.g., both ends of a citation). Rows are
+        repeated once per collection, and keep their original order within
+        each collection.
+
+        :returns: pandas DataFrame with an added '_collection' column
+        """
+        df = df.assign(_row=range(len(df)))
+        tagged = df.merge(membership, left_on=colnames[0], right_on='_seed_id').drop(columns='_seed_id')
+        for colname in colnames[1:]:
+            tagged = tagged.merge(membership, left_on=['_collection', colname], right_on=['_collection', '_seed_id']) \
+                .drop(columns='_seed_id')
+        return tagged.sort_values(['_collection', '_row'], kind='mergesort').drop(columns='_row')
+
+    def split_frames(self):
+        """Split the extracted frames by collection
+
+        :returns: dict of collection name -> dict of 'papers', 'citations', 'paper_authors' pandas DataFrames
+
+        """
+        x = self.extraction
+        start = timer()
+        with self.metrics.stage('split_frames') as record:
+            membership = self.get_membership()
+            names = list(self.seed_sets)
+            tagged = {
+                'papers': self.tag_rows(x.df_papers, [x.paper_id_colname], membership),
+                'citations': self.tag_rows(x.df_citations, [x.citing_paper_colname, x.cited_paper_colname], membership),
+                'paper_authors': self.tag_rows(x.df_paper_authors, [x.paper_id_colname], membership),
+            }
+            frames = {name: {} for name in names}
+            for key, df in tagged.items():
+                empty = df.iloc[:0].drop(columns='_collection')
+                for name in names:
+                    frames[name][key] = empty
+                for code, group in df.groupby('_collection', sort=False):
+                    frames[names[code]][key] = group.drop(columns='_collection').reset_index(drop=True)
+            record['rows'] = sum(len(df) for df in tagged.values())
+        logger.debug("split {} rows into {} collections in {}".format(
+            record['rows'], len(names), format_timespan(timer() - start)))
+        return frames
+
+    def get_collection(self, name):
+        """Build one collection in this process
+        :returns: PaperCollection
+
+        """
+        return build_collection(self.frames[name], self.column_map,
+                                description=self.descriptions[name],
+                                dataset=self.dataset,
+                                dataset_version=self.dataset_version)
+
+    def write_graphs(self, outfpaths, processes=None, compress=None, serializer=None):
+        """Build each collection and write its graph, in a pool of processes
+
+        :outfpaths: dict of collection name -> output path (collections not in it are skipped)
+        :processes: number of worker processes (default: os.cpu_count()). 1 builds them all in this process
+        :compress, serializer: see PaperCollection.write_graph()
+        :returns: list of dicts summarizing each collection (including its 'metrics'), in the order of outfpaths
+
+        """
+        jobs = [{
+            'name': name,
+            'frames': self.frames[name],
+            'column_map': self.column_map,
+            'description': self.descriptions[name],
+            'dataset': self.dataset,
+            'dataset_version': self.dataset_version,
+            'outfpath': outfpath,
+            'compress': compress,
+            'serializer': serializer,
+        } for name, outfpath in outfpaths.items()]
+        processes = min(processes or os.cpu_count() or 1, len(jobs))
+        logger.debug("building {} collections with {} processes".format(len(jobs), processes))
+        if processes <= 1:
+            results = [_build_and_write(job) for job in jobs]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = list(executor.map(_build_and_write, jobs))
+        for r in results:
+            logger.debug("{}: {} papers, {} citations written to {} ({})".format(
+                r['name'], r['num_papers'], r['num_citations'], r['outfpath'], format_timespan(r['seconds'])))
+        return results
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """On-disk cache of extracted dataframes, keyed by a hash of what they were extracted from.
+
+Each entry is a directory of parquet files (one per dataframe). Entries
+are evicted least recently used first when the cache grows past a size
+limit.
+
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from timeit import default_timer as timer
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+DEFAULT_MAX_BYTES = 10 * 1024**3
+
+def fingerprint_path(path):
+    """Fingerprint a file, or a directory of files, from names, sizes, and modification times
+
+    Reading file contents would take as long as the extraction the cache
+    is meant to skip, so this only stats the files.
+
+    :path: path to a file or directory
+    :returns: list of [relative path, size, mtime_ns]
+
+    """
+    path = Path(path)
+    if path.is_file():
+        files = [path]
+    else:
+        files = sorted(p for p in path.rglob('*') if p.is_file())
+    fingerprint = []
+    for p in files:
+        st = p.stat()
+        fingerprint.append([str(p.relative_to(path)) if p != path else p.name, st.st_size, st.st_mtime_ns])
+    return fingerprint
+
+def make_key(**parts):
+    """Hash JSON-serializable parts into a cache key"""
+    s = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(s.encode('utf-8')).hexdigest()
+
+def _dir_size(path):
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+class FrameCache:
+
+    """Size-bounded LRU cache of pandas DataFrames stored as parquet"""
+
+    def __init__(self, cache_dir, max_bytes=None):
+        """
+        cache_dir: directory to store the cache in (created if it doesn't exist)
+        max_bytes: maximum total size of the cache (default: 10 GiB)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or DEFAULT_MAX_BYTES
+
+    def __repr__(self):
+        return "FrameCache({})".format(self.cache_dir)
+
+    def entry_dir(self, key):
+        return self.cache_dir.joinpath(key)
+
+    def entries(self):
+        """List cache entry directories, least recently used first"""
+        entries = [p for p in self.cache_dir.iterdir() if p.is_dir() and not p.name.startswith('.')]
+        return sorted(entries, key=lambda p: p.stat().st_mtime_ns)
+
+    def __contains__(self, key):
+        return self.entry_dir(key).is_dir()
+
+    def get(self, key):
+        """Load the dataframes for a key
+
+        :returns: dict of name -> pandas DataFrame, or None if the key is not in the cache
+
+        """
+        import pandas as pd
+        entry = self.entry_dir(key)
+        if not entry.is_dir():
+            logger.debug("cache miss: {}".format(key))
+            return None
+        start = timer()
+        frames = {p.stem: pd.read_parquet(p) for p in sorted(entry.glob('*.parquet'))}
+        os.utime(str(entry))  # mark as recently used
+        logger.debug("cache hit: {} (loaded in {:.3f} seconds)".format(key, timer() - start))
+        return frames
+
+    def put(self, key, frames):
+        """Store dataframes under a key, then evict old entries if the cache is too big
+
+        :frames: dict of name -> pandas DataFrame
+
+        """
+        entry = self.entry_dir(key)
+        tmp = self.cache_dir.joinpath(".tmp-{}-{}".format(key, os.getpid()))
+        shutil.rmtree(str(tmp), ignore_errors=True)
+        tmp.mkdir()
+        for name, df in frames.items():
+            df.to_parquet(str(tmp.joinpath('{}.parquet'.format(name))), index=False)
+        try:
+            os.replace(str(tmp), str(entry))
+        except OSError:
+            # another process stored the same key first
+            shutil.rmtree(str(tmp), ignore_errors=True)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes
+
+        :keep: key of an entry never to remove (e.g., the one just stored)
+
+        """
+        entries = self.entries()
+        sizes = {p: _dir_size(p) for p in entries}
+        total = sum(sizes.values())
+        for p in entries:
+            if total <= self.max_bytes:
+                break
+            if p.name == keep:
+                continue
+            logger.debug("evicting cache entry {}".format(p.name))
+            shutil.rmtree(str(p), ignore_errors=True)
+            total -= sizes[p]
+        return total
+
+    def clear(self):
+        for p in self.entries():
+            shutil.rmtree(str(p), ignore_errors=True)
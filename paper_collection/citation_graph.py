@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Compact citation graph: paper IDs mapped to dense integer indexes, edges in CSR/CSC arrays.
+
+An alternative to the networkx DiGraph from PaperCollection.construct_graph()
+for large collections. Out-links (references) are stored in CSR form and
+in-links (citations received) in CSC form, so degrees and neighbor
+lookups are array slices.
+
+"""
+
+import numpy as np
+
+def _index_dtype(n):
+    return np.int32 if n < 2**31 else np.int64
+
+def _compress(rows, cols, n):
+    """Get (indptr, indices) for edges grouped by row, keeping edge order within each row"""
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    return indptr, cols[order]
+
+def _dense_ids(values):
+    """Map values to dense indexes in order of first appearance
+
+    :returns: (unique values in first-appearance order, index of each value)
+
+    """
+    uniq, first, inverse = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=_index_dtype(len(order)))
+    rank[order] = np.arange(len(order))
+    return uniq[order], rank[inverse.ravel()]
+
+class CitationGraph:
+
+    """Directed citation graph stored as CSR (out-links) and CSC (in-links) arrays"""
+
+    def __init__(self, node_ids, sources, targets):
+        """
+        node_ids: array of paper IDs; node_ids[i] is the ID of node i
+        sources: array of node indexes of citing papers
+        targets: array of node indexes of cited papers (repeated edges are dropped)
+        """
+        self.node_ids = np.asarray(node_ids)
+        n = len(self.node_ids)
+        dtype = _index_dtype(n)
+        sources = np.asarray(sources, dtype=dtype)
+        targets = np.asarray(targets, dtype=dtype)
+        # drop repeated edges, keeping the first of each
+        _, first = np.unique(sources.astype(np.int64) * n + targets, return_index=True)
+        first.sort()
+        self.sources = sources[first]
+        self.targets = targets[first]
+        self.out_indptr, self.out_indices = _compress(self.sources, self.targets, n)
+        self.in_indptr, self.in_indices = _compress(self.targets, self.sources, n)
+        self._sorter = np.argsort(self.node_ids, kind='stable')
+
+    @classmethod
+    def from_arrays(cls, node_ids, sources, targets, out_indptr, out_indices, in_indptr, in_indices, sorter):
+        """Create a graph from arrays that were already built (e.g., memory-mapped from a saved collection)
+
+        The arrays are used as they are, without copying or checking them.
+        sorter: argsort of node_ids
+        """
+        graph = cls.__new__(cls)
+        graph.node_ids = node_ids
+        graph.sources = sources
+        graph.targets = targets
+        graph.out_indptr = out_indptr
+        graph.out_indices = out_indices
+        graph.in_indptr = in_indptr
+        graph.in_indices = in_indices
+        graph._sorter = sorter
+        return graph
+
+    @classmethod
+    def from_collection(cls, papers, citations):
+        """Build from a sequence of Papers and a list of (citing_id, cited_id) tuples
+
+        Nodes are the papers in order, then any cited or citing IDs that are
+        not papers in the collection (as in construct_graph()).
+        """
+        from .paper_table import PaperTable
+        if isinstance(papers, PaperTable) and isinstance(papers.get_column('paper_id'), np.ndarray):
+            paper_ids = papers.get_column('paper_id')
+        else:
+            paper_ids = np.asarray([p.paper_id for p in papers])
+        edges = np.asarray(citations).reshape(-1, 2) if len(citations) else np.empty((0, 2), dtype=paper_ids.dtype)
+        if len(paper_ids) and len(edges) and paper_ids.dtype != edges.dtype:
+            edges = edges.astype(np.result_type(paper_ids, edges))
+            paper_ids = paper_ids.astype(edges.dtype)
+        node_ids, idx = _dense_ids(np.concatenate([paper_ids, edges.ravel()]))
+        edge_idx = idx[len(paper_ids):].reshape(-1, 2)
+        return cls(node_ids, edge_idx[:, 0], edge_idx[:, 1])
+
+    def __repr__(self):
+        return "CitationGraph({} nodes, {} edges)".format(self.number_of_nodes(), self.number_of_edges())
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        return len(self.sources)
+
+    def index_of(self, paper_ids):
+        """Get node indexes for paper IDs
+
+        :paper_ids: a paper ID or array of paper IDs
+        :returns: node index (or array of them); -1 where the ID is not in the graph
+
+        """
+        ids = np.asarray(paper_ids)
+        if len(self.node_ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)[()]
+        pos = np.searchsorted(self.node_ids, ids, sorter=self._sorter)
+        pos = np.minimum(pos, len(self.node_ids) - 1)
+        idx = self._sorter[pos]
+        return np.where(self.node_ids[idx] == ids, idx, -1)[()]
+
+    def _index(self, paper_id):
+        i = self.index_of(paper_id)
+        if i < 0:
+            raise KeyError(paper_id)
+        return i
+
+    def out_degree(self):
+        """Number of references of each node (array aligned with node_ids)"""
+        return np.diff(self.out_indptr)
+
+    def in_degree(self):
+        """Number of citations received by each node (array aligned with node_ids)"""
+        return np.diff(self.in_indptr)
+
+    def successors(self, paper_id):
+        """IDs of the papers that paper_id cites"""
+        i = self._index(paper_id)
+        return self.node_ids[self.out_indices[self.out_indptr[i]:self.out_indptr[i+1]]]
+
+    def predecessors(self, paper_id):
+        """IDs of the papers that cite paper_id"""
+        i = self._index(paper_id)
+        return self.node_ids[self.in_indices[self.in_indptr[i]:self.in_indptr[i+1]]]
+
+    def neighbors(self, paper_id):
+        """IDs of the papers that paper_id cites or is cited by"""
+        return np.union1d(self.successors(paper_id), self.predecessors(paper_id))
+
+    def subgraph(self, paper_ids):
+        """Get the subgraph induced on paper_ids (IDs not in the graph are ignored)
+
+        :returns: CitationGraph, with nodes in the same relative order as this graph
+
+        """
+        idx = self.index_of(np.asarray(list(paper_ids)))
+        idx = np.unique(idx[idx >= 0])
+        remap = np.full(len(self.node_ids), -1, dtype=np.int64)
+        remap[idx] = np.arange(len(idx))
+        keep = (remap[self.sources] >= 0) & (remap[self.targets] >= 0)
+        return CitationGraph(self.node_ids[idx], remap[self.sources[keep]], remap[self.targets[keep]])
+
+    def to_networkx(self):
+        """Get a networkx DiGraph with string node IDs, as construct_graph() uses (no node attributes)"""
+        import networkx as nx
+        G = nx.DiGraph()
+        labels = [str(x) for x in self.node_ids.tolist()]
+        G.add_nodes_from(labels)
+        G.add_edges_from((labels[s], labels[t]) for s, t in zip(self.sources.tolist(), self.targets.tolist()))
+        return G
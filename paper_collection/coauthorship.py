@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Coauthorship graph: authors linked by the papers they wrote together.
+
+Built from (paper, author) pairs, e.g. the rows of MAG's
+PaperAuthorAffiliations, without looping over pairs of authors in Python.
+With B the paper x author incidence matrix, the edge weights are the
+upper triangle of B.T @ B (a sparse matrix product). Papers with very
+many authors (e.g., large collaborations) are left out of the edges, since
+each adds a clique with a quadratic number of edges.
+
+"""
+
+import numpy as np
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+# papers with more authors than this add no coauthorship edges (by default)
+DEFAULT_MAX_AUTHORS = 100
+
+WEIGHTINGS = ['count', 'fractional']
+
+def _pair_weights_scipy(paper_codes, author_codes, paper_weights, num_papers, num_authors):
+    from scipy import sparse
+    B = sparse.csr_matrix((np.ones(len(paper_codes)), (paper_codes, author_codes)), shape=(num_papers, num_authors))
+    Bw = sparse.csr_matrix((paper_weights[paper_codes], (paper_codes, author_codes)), shape=(num_papers, num_authors))
+    C = sparse.triu(Bw.T.tocsr() @ B, k=1).tocoo()
+    order = np.lexsort((C.col, C.row))
+    return C.row[order].astype(np.int64), C.col[order].astype(np.int64), C.data[order]
+
+def _pair_weights_numpy(paper_codes, author_codes, paper_weights, num_papers, num_authors):
+    # pairs are (paper_codes, author_codes) sorted by paper; each author pairs with the later authors of its paper
+    order = np.lexsort((author_codes, paper_codes))
+    paper_codes, author_codes = paper_codes[order], author_codes[order]
+    counts = np.bincount(paper_codes, minlength=num_papers)
+    ends = np.cumsum(counts)[paper_codes]
+    num_later = ends - np.arange(len(paper_codes)) - 1
+    left = np.repeat(np.arange(len(paper_codes)), num_later)
+    starts = np.cumsum(num_later) - num_later
+    right = left + 1 + np.arange(len(left)) - np.repeat(starts, num_later)
+    keys = author_codes[left].astype(np.int64) * num_authors + author_codes[right]
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    weights = np.bincount(inverse.ravel(), weights=paper_weights[paper_codes[left]], minlength=len(uniq))
+    return uniq // num_authors, uniq % num_authors, weights
+
+class CoauthorshipGraph:
+
+    """Undirected, weighted coauthorship graph stored as arrays
+
+    Nodes are authors, in order of first appearance. Each edge (source <
+    target, as node indexes) has a weight: the number of papers the two
+    authors wrote together ('count'), or the sum over those papers of
+    1/(number of authors - 1) ('fractional', as in Newman 2001).
+    """
+
+    def __init__(self, author_ids, names, num_papers, sources, targets, weights):
+        """
+        author_ids: array of author IDs; author_ids[i] is the ID of node i
+        names: list of author names aligned with author_ids
+        num_papers: array of the number of papers of each author (including papers left out of the edges)
+        sources, targets: arrays of node indexes, with sources < targets
+        weights: array of edge weights
+        """
+        self.author_ids = np.asarray(author_ids)
+        self.names = names
+        self.num_papers = np.asarray(num_papers)
+        self.sources = np.asarray(sources)
+        self.targets = np.asarray(targets)
+        self.weights = np.asarray(weights)
+
+    @classmethod
+    def from_pairs(cls, paper_ids, author_ids, names=None, max_authors=DEFAULT_MAX_AUTHORS, weighting='count', use_scipy=None):
+        """Build from (paper ID, author ID) pairs
+
+        Repeated pairs (e.g., one row per affiliation) count once. Pairs
+        with a missing author ID are ignored.
+
+        :paper_ids: array of paper IDs
+        :author_ids: array of author IDs, aligned with paper_ids
+        :names: author names aligned with paper_ids (the first name seen for each author is kept)
+        :max_authors: papers with more authors than this add no edges (None: no limit)
+        :weighting: 'count' or 'fractional'
+        :use_scipy: True/False to force or avoid scipy.sparse. Default: use it if installed
+        :returns: CoauthorshipGraph
+
+        """
+        import pandas as pd
+        if weighting not in WEIGHTINGS:
+            raise ValueError("weighting must be one of {}".format(WEIGHTINGS))
+        paper_ids = pd.Series(np.asarray(paper_ids))
+        author_ids = pd.Series(np.asarray(author_ids))
+        keep = (paper_ids.notna() & author_ids.notna()).to_numpy()
+        paper_codes, _ = pd.factorize(paper_ids[keep])
+        author_codes, uniq_authors = pd.factorize(author_ids[keep])
+        num_papers, num_authors = paper_codes.max(initial=-1) + 1, len(uniq_authors)
+
+        _, first = np.unique(author_codes, return_index=True)  # codes are 0..num_authors-1
+        if names is not None:
+            names = np.asarray(names, dtype=object)[keep][first].tolist()
+        else:
+            names = [None] * num_authors
+
+        # each (paper, author) once
+        _, unique_pairs = np.unique(paper_codes.astype(np.int64) * max(num_authors, 1) + author_codes, return_index=True)
+        paper_codes, author_codes = paper_codes[unique_pairs], author_codes[unique_pairs]
+        author_counts = np.bincount(paper_codes, minlength=num_papers)
+        papers_per_author = np.bincount(author_codes, minlength=num_authors)
+
+        in_edges = author_counts[paper_codes] > 1
+        if max_authors is not None:
+            num_pruned = int((author_counts > max_authors).sum())
+            if num_pruned:
+                logger.debug("{} papers with more than {} authors add no coauthorship edges".format(num_pruned, max_authors))
+            in_edges &= author_counts[paper_codes] <= max_authors
+        paper_weights = np.ones(num_papers)
+        if weighting == 'fractional':
+            np.divide(1.0, author_counts - 1, out=paper_weights, where=author_counts > 1)
+
+        args = (paper_codes[in_edges], author_codes[in_edges], paper_weights, num_papers, num_authors)
+        if use_scipy is not False:
+            try:
+                sources, targets, weights = _pair_weights_scipy(*args)
+            except ImportError:
+                if use_scipy:
+                    raise
+                sources, targets, weights = _pair_weights_numpy(*args)
+        else:
+            sources, targets, weights = _pair_weights_numpy(*args)
+        if weighting == 'count':
+            weights = np.rint(weights).astype(np.int64)
+        return cls(np.asarray(uniq_authors), names, papers_per_author, sources, targets, weights)
+
+    @classmethod
+    def from_frame(cls,
+                   df_authors,
+                   paper_id_colname='PaperId',
+                   author_seq_colname='AuthorSequenceNumber',
+                   author_name_colname='OriginalAuthor',
+                   author_id_colname='AuthorId',
+                   **kwargs):
+        """Build from a pandas DataFrame of paper/author rows (e.g., MAG PaperAuthorAffiliations)
+
+        Rows are taken in order of paper ID and author sequence number (if
+        that column exists), so the node order does not depend on the row order.
+
+        :kwargs: see from_pairs()
+
+        """
+        sort_by = [c for c in [paper_id_colname, author_seq_colname] if c in df_authors.columns]
+        df_authors = df_authors.sort_values(sort_by, kind='mergesort')
+        names = df_authors[author_name_colname].to_numpy() if author_name_colname in df_authors.columns else None
+        return cls.from_pairs(df_authors[paper_id_colname].to_numpy(), df_authors[author_id_colname].to_numpy(),
+                              names=names, **kwargs)
+
+    @classmethod
+    def from_collection(cls, papers, **kwargs):
+        """Build from the authors of a sequence of Papers (a list or PaperTable)
+
+        :kwargs: see from_pairs()
+
+        """
+        from .paper_table import PaperTable
+        if isinstance(papers, PaperTable):
+            counts = np.diff(papers.author_offsets)
+            paper_codes = np.repeat(np.arange(len(papers)), counts)
+            author_ids = papers.author_ids
+            author_ids = author_ids if isinstance(author_ids, np.ndarray) else author_ids.tolist()
+            names = papers.author_names.tolist()
+        else:
+            paper_codes, author_ids, names = [], [], []
+            for i, paper in enumerate(papers):
+                for author in paper.authors:
+                    paper_codes.append(i)
+                    author_ids.append(author.get('author_id'))
+                    names.append(author.get('name'))
+        return cls.from_pairs(paper_codes, author_ids, names=names, **kwargs)
+
+    def __repr__(self):
+        return "CoauthorshipGraph({} nodes, {} edges)".format(self.number_of_nodes(), self.number_of_edges())
+
+    def number_of_nodes(self):
+        return len(self.author_ids)
+
+    def number_of_edges(self):
+        return len(self.sources)
+
+    def iter_nodes(self):
+        """Yield node dicts for node-link JSON: 'id' (the author ID as a string), 'name', and 'num_papers'"""
+        for author_id, name, num_papers in zip(self.author_ids.tolist(), self.names, self.num_papers.tolist()):
+            yield {'id': str(author_id), 'name': name, 'num_papers': num_papers}
+
+    def iter_links(self, chunk_size=65536):
+        """Yield link dicts for node-link JSON: 'source', 'target', and 'weight'"""
+        labels = [str(x) for x in self.author_ids.tolist()]
+        for start in range(0, len(self.sources), chunk_size):
+            stop = start + chunk_size
+            for s, t, w in zip(self.sources[start:stop].tolist(), self.targets[start:stop].tolist(), self.weights[start:stop].tolist()):
+                yield {'source': labels[s], 'target': labels[t], 'weight': w}
+
+    def to_networkx(self):
+        """Get a networkx Graph with the same node and edge attributes as the node-link JSON"""
+        import networkx as nx
+        G = nx.Graph()
+        G.add_nodes_from((node.pop('id'), node) for node in self.iter_nodes())
+        G.add_edges_from((link['source'], link['target'], {'weight': link['weight']}) for link in self.iter_links())
+        return G
@@ -21,7 +21,37 @@ import logging
 root_logger = logging.getLogger()
 logger = root_logger.getChild(__name__)
 
-from . import PaperCollection, Paper
+from . import PaperCollection, Paper, PAPER_FIELDS
+from .metrics import Metrics
+
+def get_authors_by_paper(df_authors,
+                         paper_id_colname='PaperId',
+                         author_seq_colname='AuthorSequenceNumber',
+                         author_name_colname='OriginalAuthor',
+                         author_id_colname='AuthorId'):
+    """Get a dictionary mapping paper_id to author data
+
+    Does one global sort by (paper_id, author sequence number), then slices
+    the sorted column arrays at the boundaries between papers. This avoids
+    a groupby with a sort and an iterrows() for every paper.
+
+    :df_authors: pandas DataFrame of paper/author rows (e.g., MAG PaperAuthorAffiliations)
+    :returns: dict of paper_id -> list of dicts (with keys 'name', 'author_id'), in author order
+
+    """
+    import numpy as np
+    df_authors = df_authors[df_authors[paper_id_colname].notna()]
+    df_authors = df_authors.sort_values([paper_id_colname, author_seq_colname], kind='mergesort')
+    paper_ids = df_authors[paper_id_colname].to_numpy()
+    if len(paper_ids) == 0:
+        return {}
+    authors = [{'name': name, 'author_id': author_id}
+               for name, author_id in zip(df_authors[author_name_colname].tolist(),
+                                          df_authors[author_id_colname].tolist())]
+    starts = np.flatnonzero(np.r_[True, paper_ids[1:] != paper_ids[:-1]])
+    ends = np.r_[starts[1:], len(paper_ids)]
+    return {paper_id: authors[start:end]
+            for paper_id, start, end in zip(paper_ids[starts].tolist(), starts.tolist(), ends.tolist())}
 
 class DataGetterBase:
 
@@ -29,10 +59,15 @@ class DataGetterBase:
 
     def __init__(self, config, paper_ids, description=None, method='spark'):
         self.config = config
-        if method == 'spark':
-            self.spark = config.spark
+        self.method = method
         self.paper_ids = paper_ids
         self.collection = PaperCollection(description=description)
+        self.metrics = Metrics()
+
+    @property
+    def spark(self):
+        """The config's spark session (started on first use, so cached runs don't start a JVM)"""
+        return self.config.spark
 
     def load_paper(self):
         raise NotImplementedError
@@ -42,8 +77,22 @@ class DataGetterMAG2019(DataGetterBase):
 
     """DataGetter class for the MAG 2019 data set"""
 
-    def __init__(self, config, paper_ids, description=None, method='spark', papers=None, citations=None, paper_authors=None):
-        """TODO: to be defined1. """
+    def __init__(self, config, paper_ids, description=None, method='spark', papers=None, citations=None, paper_authors=None, arrow=None, cache_dir=None, cache_max_bytes=None, hops=0, max_per_node=None, load=True):
+        """
+        config: Config object
+        paper_ids: list of seed paper IDs
+        description: (str) description of the collection
+        method: 'spark', or 'arrow' to read the parquet data with pyarrow (no JVM)
+        papers, citations, paper_authors: paths to MAG parquet data (or spark DataFrames / pyarrow Datasets)
+        arrow: use Apache Arrow for toPandas() (True/False). If None, keep the spark session's setting
+        cache_dir: directory for caching the extracted dataframes (optional).
+                   Only used when papers, citations, and paper_authors are paths
+        cache_max_bytes: size limit for the cache (default: see cache.DEFAULT_MAX_BYTES)
+        hops: expand the seed papers to their k-hop citation neighborhood (references and citing papers)
+        max_per_node: when expanding, keep at most this many neighbors per paper, highest node_rank first
+        load: build self.collection from the extracted dataframes. If False, only extract them
+              (self.df_papers, self.df_citations, self.df_paper_authors), e.g., to split them up
+        """
         super().__init__(config, paper_ids, description, method)
 
         self.dataset = 'mag'
@@ -57,59 +106,553 @@ class DataGetterMAG2019(DataGetterBase):
         self.doi_colname = 'Doi'
         self.pub_date_colname = 'Date'
         self.title_colname = 'Title'
+        self.column_map = {
+            'paper_id': self.paper_id_colname,
+            'title': 'PaperTitle',
+            'display_title': 'OriginalTitle',
+            'doi': self.doi_colname,
+            'pub_date': self.pub_date_colname,
+            'year': 'Year',
+            'venue': 'OriginalVenue',
+            'node_rank': 'flow',
+            'citing': self.citing_paper_colname,
+            'cited': self.cited_paper_colname,
+            'author_paper_id': self.paper_id_colname,
+            'author_seq': self.author_seq_colname,
+            'author_name': self.author_name_colname,
+            'author_id': self.author_id_colname,
+        }
+
+        self.inputs = {'papers': papers, 'citations': citations, 'paper_authors': paper_authors}
+        self.arrow = arrow
+        self.sources_open = False
+        self.seed_ids = self.get_seed_ids()
+        self.initial_seed_ids = self.seed_ids
+        self.hops = hops
+        self.max_per_node = max_per_node
+
+        self.cache = None
+        self.cache_key = None
+        self.from_cache = False
+        if cache_dir is not None:
+            from .cache import FrameCache
+            self.cache = FrameCache(cache_dir, max_bytes=cache_max_bytes)
+            self.cache_key = self.get_cache_key()
+            if self.load_from_cache():
+                if load:
+                    self.load_collection()
+                return
+
+        if method in ['spark', 'arrow']:
+            self.open_sources()
+            if hops:
+                self.expand(hops, max_per_node=max_per_node)
+
+            self.df_papers = self.get_papers()
+            self.df_citations = self.get_citations()
+            self.df_paper_authors = self.get_paper_authors()
+
+            self.save_to_cache()
+            if load:
+                self.load_collection()
+
+    def open_sources(self):
+        """Open the MAG tables with the engine given by self.method"""
+        if self.sources_open:
+            return
+        if self.method not in ['spark', 'arrow']:
+            raise ValueError("unknown method: {}".format(self.method))
+        with self.metrics.stage('open_sources'):
+            if self.method == 'spark':
+                self.arrow = self.set_arrow(self.arrow)
+                self.sdf_papers = self.read_spark(self.inputs['papers'])
+                self.sdf_citations = self.read_spark(self.inputs['citations'])
+                self.sdf_paper_authors = self.read_spark(self.inputs['paper_authors'])
+                self.sdf_seed_ids = self.get_seed_ids_spark()
+            else:
+                self.ds_papers = self.read_arrow(self.inputs['papers'])
+                self.ds_citations = self.read_arrow(self.inputs['citations'])
+                self.ds_paper_authors = self.read_arrow(self.inputs['paper_authors'])
+        self.sources_open = True
+
+    def stage(self, name):
+        """Record a stage in self.metrics, with the spark jobs it runs when the method is 'spark'"""
+        spark = None
+        if self.method == 'spark' and self.sources_open:
+            spark = getattr(self.sdf_papers, 'sparkSession', None) or self.sdf_papers.sql_ctx.sparkSession
+        return self.metrics.stage(name, spark=spark)
+
+    def expand(self, hops=1, max_per_node=None):
+        """Expand the seed papers to their k-hop citation neighborhood
+
+        Each hop adds the references and the citing papers of the previous
+        hop's new papers (the frontier). The expanded set becomes the seed set,
+        so the collection is the subgraph induced on the neighborhood.
+
+        :hops: number of hops
+        :max_per_node: keep at most this many new neighbors per frontier paper, highest node_rank first
+        :returns: sorted list of the paper IDs in the neighborhood
+
+        """
+        self.open_sources()
+        start = timer()
+        with self.stage('expand') as record:
+            if self.method == 'spark':
+                self.seed_ids = self.expand_spark(hops, max_per_node)
+                self.sdf_seed_ids = self.get_seed_ids_spark()
+            else:
+                self.seed_ids = self.expand_arrow(hops, max_per_node)
+            record['rows'] = len(self.seed_ids)
+        self.paper_ids = self.seed_ids
+        logger.debug("expanded {} seed papers to {} papers in {} hops ({})".format(
+            len(self.initial_seed_ids), len(self.seed_ids), hops, format_timespan(timer() - start)))
+        return self.seed_ids
+
+    def expand_spark(self, hops, max_per_node=None):
+        """k-hop expansion in spark. Each frontier is cached, and stays in spark until the end
+        :returns: sorted list of paper IDs
+
+        """
+        from pyspark.sql import functions as F
+        from pyspark.sql.window import Window
+        pid = self.paper_id_colname
+        citations = self.project(self.sdf_citations, ['citing', 'cited'])
+        citing, cited = citations[self.citing_paper_colname], citations[self.cited_paper_colname]
+        if max_per_node:
+            ranks = self.project(self.sdf_papers, ['paper_id', 'node_rank'])
+            rank_colname = self.column_map['node_rank']
+        visited = self.sdf_seed_ids
+        frontier = visited
+        for hop in range(hops):
+            f = frontier.withColumnRenamed(pid, '_source')
+            refs = citations.join(f, citing == f['_source']).select(f['_source'], cited.alias(pid))
+            citers = citations.join(f, cited == f['_source']).select(f['_source'], citing.alias(pid))
+            # only new papers count toward the cap
+            neighbors = refs.unionByName(citers).distinct().join(visited, on=pid, how='left_anti')
+            if max_per_node:
+                w = Window.partitionBy('_source').orderBy(F.col(rank_colname).desc_nulls_last(), F.col(pid))
+                neighbors = neighbors.join(ranks, on=pid, how='left') \
+                    .withColumn('_rank', F.row_number().over(w)) \
+                    .filter(F.col('_rank') <= max_per_node)
+            frontier = neighbors.select(pid).distinct().cache()
+            num_new = frontier.count()
+            logger.debug("hop {}: {} new papers".format(hop + 1, num_new))
+            visited = visited.unionByName(frontier).cache()
+            if num_new == 0:
+                break
+        return sorted(row[0] for row in visited.collect())
+
+    def expand_arrow(self, hops, max_per_node=None):
+        """k-hop expansion with pyarrow. Each hop is one scan of the citations (and, if capping, the papers)
+        :returns: sorted list of paper IDs
+
+        """
+        import numpy as np
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        pid = self.paper_id_colname
+        citing, cited = self.citing_paper_colname, self.cited_paper_colname
+        visited = np.asarray(self.seed_ids, dtype=np.int64)
+        frontier = visited
+        for hop in range(hops):
+            expr = ds.field(citing).isin(pa.array(frontier, type=self.ds_citations.schema.field(citing).type)) \
+                | ds.field(cited).isin(pa.array(frontier, type=self.ds_citations.schema.field(cited).type))
+            df = self.ds_citations.to_table(columns=[citing, cited], filter=expr).to_pandas()
+            is_ref = df[citing].isin(frontier).to_numpy()
+            is_citer = df[cited].isin(frontier).to_numpy()
+            neighbors = pd.DataFrame({
+                '_source': np.concatenate([df[citing].to_numpy()[is_ref], df[cited].to_numpy()[is_citer]]),
+                pid: np.concatenate([df[cited].to_numpy()[is_ref], df[citing].to_numpy()[is_citer]]),
+            })
+            # only new papers count toward the cap
+            neighbors = neighbors[~np.isin(neighbors[pid].to_numpy(dtype=np.int64), visited)].drop_duplicates()
+            if max_per_node:
+                rank_colname = self.column_map['node_rank']
+                ranks = self.scan_arrow(self.ds_papers, ['paper_id', 'node_rank'], [(pid, neighbors[pid].unique().tolist())])
+                neighbors = neighbors.merge(ranks.drop_duplicates(subset=[pid]), on=pid, how='left')
+                neighbors = neighbors.sort_values(['_source', rank_colname, pid], ascending=[True, False, True], na_position='last')
+                neighbors = neighbors.groupby('_source').head(max_per_node)
+            frontier = np.unique(neighbors[pid].to_numpy(dtype=np.int64))
+            logger.debug("hop {}: {} new papers".format(hop + 1, len(frontier)))
+            visited = np.union1d(visited, frontier)
+            if len(frontier) == 0:
+                break
+        return visited.tolist()
+
+    def get_papers(self, paper_ids=None):
+        """Get papers (default: the seed papers) with the engine given by self.method
+        :returns: pandas DataFrame
 
-        if method == 'spark':
-            self.sdf_papers = self.spark.read.parquet(str(papers))
-            self.sdf_citations = self.spark.read.parquet(str(citations))
-            self.sdf_paper_authors = self.spark.read.parquet(str(paper_authors))
+        """
+        with self.stage('get_papers') as record:
+            if self.method == 'spark':
+                df = self.get_papers_spark(paper_ids)
+            else:
+                df = self.get_papers_arrow(paper_ids)
+            record['rows'] = len(df)
+        return df
+
+    def get_citations(self, citing_ids=None, cited_ids=None):
+        """Get citations from citing_ids to cited_ids (default: the seed papers) with the engine given by self.method
+        :returns: pandas DataFrame
+
+        """
+        with self.stage('get_citations') as record:
+            if self.method == 'spark':
+                df = self.get_citations_spark(citing_ids, cited_ids)
+            else:
+                df = self.get_citations_arrow(citing_ids, cited_ids)
+            record['rows'] = len(df)
+        return df
+
+    def get_paper_authors(self, paper_ids=None):
+        """Get author rows for papers (default: the seed papers) with the engine given by self.method
+        :returns: pandas DataFrame
+
+        """
+        with self.stage('get_paper_authors') as record:
+            if self.method == 'spark':
+                df = self.get_paper_authors_spark(paper_ids)
+            else:
+                df = self.get_paper_authors_arrow(paper_ids)
+            record['rows'] = len(df)
+        return df
+
+    def update(self, paper_ids, graph_fpath=None, none_strings=True, layout=None):
+        """Update the collection for a new list of seed paper IDs
+
+        Only the papers and authors for added seeds, and the citations that
+        touch them, are extracted. Papers for removed seeds are dropped with
+        their citations. self.collection (and its graph, if constructed) is
+        patched in place.
+
+        If the collection was expanded (hops), the new seeds are expanded
+        the same way (one scan of the citations per hop), and the papers
+        added and removed are the difference between the two neighborhoods.
+
+        If the collection had a layout (see PaperCollection.compute_layout()),
+        it is computed again for the updated collection, and the node
+        positions in graph_fpath are updated with it.
+
+        :paper_ids: the new list of seed paper IDs (before expansion)
+        :graph_fpath: path to a JSON file written by write_graph for this collection, to patch as well
+        :none_strings: the none_strings setting graph_fpath was written with (see PaperCollection.write_graph())
+        :layout: keyword arguments for compute_layout(), if the layout was computed with other than the defaults.
+                 If given, a layout is computed even if the collection had none
+        :returns: (added, removed) lists of paper IDs in the collection
+
+        """
+        import pandas as pd
+        had_layout = self.collection.layout is not None
+        old_ids = set(self.seed_ids)
+        old_seeds = self.initial_seed_ids
+        self.paper_ids = paper_ids
+        self.seed_ids = self.get_seed_ids()
+        self.initial_seed_ids = self.seed_ids
+        if self.hops:
+            if self.seed_ids == old_seeds:
+                self.seed_ids = sorted(old_ids)
+            else:
+                self.open_sources()
+                if self.method == 'spark':
+                    self.sdf_seed_ids = self.get_seed_ids_spark()
+                self.expand(self.hops, max_per_node=self.max_per_node)
+        new_ids = set(self.seed_ids)
+        added = sorted(new_ids - old_ids)
+        removed = sorted(old_ids - new_ids)
+        kept = sorted(old_ids & new_ids)
+        logger.debug("updating collection: {} papers added, {} removed".format(len(added), len(removed)))
+
+        if removed:
+            self.df_papers = self.df_papers[~self.df_papers[self.paper_id_colname].isin(removed)]
+            self.df_citations = self.df_citations[~(self.df_citations[self.citing_paper_colname].isin(removed)
+                                                    | self.df_citations[self.cited_paper_colname].isin(removed))]
+            self.df_paper_authors = self.df_paper_authors[~self.df_paper_authors[self.paper_id_colname].isin(removed)]
+            self.collection.remove_papers(removed)
+
+        if added:
+            self.open_sources()
+            if self.method == 'spark':
+                self.sdf_seed_ids = self.get_seed_ids_spark()
+            df_papers_added = self.get_papers(added)
+            df_authors_added = self.get_paper_authors(added)
+            # citations from new papers to any seed, and from old seeds to new papers
+            df_citations_added = pd.concat([self.get_citations(added, self.seed_ids),
+                                            self.get_citations(kept, added)], ignore_index=True)
+            self.df_papers = pd.concat([self.df_papers, df_papers_added], ignore_index=True)
+            self.df_citations = pd.concat([self.df_citations, df_citations_added], ignore_index=True)
+            self.df_paper_authors = pd.concat([self.df_paper_authors, df_authors_added], ignore_index=True)
+            added_coll = PaperCollection.from_frames(df_papers_added,
+                                                     df_citations=df_citations_added,
+                                                     df_authors=df_authors_added,
+                                                     column_map=self.column_map,
+                                                     dataset=self.dataset,
+                                                     dataset_version=self.dataset_version)
+            self.collection.add_papers(added_coll.papers, added_coll.citations)
+
+        positions = None
+        if had_layout or layout is not None:
+            positions = self.collection.compute_layout(**(layout or {})).node_positions()
+
+        if graph_fpath is not None:
+            from .serialize import update_node_link
+            update_node_link(graph_fpath,
+                             papers=added_coll.papers if added else None,
+                             citations=added_coll.citations if added else None,
+                             remove_ids=removed,
+                             none_strings=none_strings,
+                             positions=positions)
+
+        if self.cache is not None:
+            self.cache_key = self.get_cache_key()
+            self.save_to_cache()
+        return added, removed
+
+    def get_cache_key(self):
+        """Hash the seed IDs (before expansion), expansion parameters, method, dataset version, column map, and input file fingerprints
+
+        :returns: cache key (str), or None if any input is not a path (e.g., a spark DataFrame)
+
+        """
+        from .cache import make_key, fingerprint_path
+        inputs = [self.inputs[k] for k in ['papers', 'citations', 'paper_authors']]
+        if not all(isinstance(x, (str, Path)) for x in inputs):
+            return None
+        # spark gives different dtypes with Arrow on or off (see to_pandas())
+        arrow = None
+        if self.method == 'spark':
+            arrow = self.arrow if self.arrow is not None else getattr(self.config, 'spark_arrow', None)
+        return make_key(seed_ids=self.initial_seed_ids,
+                        hops=self.hops,
+                        max_per_node=self.max_per_node,
+                        method=self.method,
+                        arrow=arrow,
+                        dataset_version=self.dataset_version,
+                        column_map=self.column_map,
+                        inputs=[fingerprint_path(x) for x in inputs])
+
+    def load_from_cache(self):
+        """Load self.df_papers, self.df_citations, and self.df_paper_authors from the cache,
+        and self.seed_ids (the papers after expansion, if hops)
+        :returns: True if they were in the cache
+
+        """
+        if self.cache is None or self.cache_key is None:
+            return False
+        with self.metrics.stage('load_from_cache') as record:
+            frames = self.cache.get(self.cache_key)
+            record['rows'] = sum(len(df) for df in frames.values()) if frames else 0
+        if frames is None or 'seed_ids' not in frames:
+            return False
+        logger.debug("loaded dataframes from cache {}".format(self.cache_key))
+        self.df_papers = frames['papers']
+        self.df_citations = frames['citations']
+        self.df_paper_authors = frames['paper_authors']
+        self.seed_ids = frames['seed_ids'][self.paper_id_colname].tolist()
+        self.paper_ids = self.seed_ids
+        self.from_cache = True
+        return True
+
+    def save_to_cache(self):
+        import pandas as pd
+        if self.cache is None or self.cache_key is None:
+            return
+        logger.debug("saving dataframes to cache {}".format(self.cache_key))
+        with self.metrics.stage('save_to_cache'):
+            self.cache.put(self.cache_key, {
+                'papers': self.df_papers,
+                'citations': self.df_citations,
+                'paper_authors': self.df_paper_authors,
+                'seed_ids': pd.DataFrame({self.paper_id_colname: self.seed_ids}, dtype='int64'),
+            })
+
+    def read_spark(self, data):
+        """Get a spark DataFrame for a MAG table
+
+        :data: path to parquet data, or a spark DataFrame
+        :returns: spark DataFrame
+
+        """
+        if hasattr(data, 'schema'):
+            return data
+        return self.spark.read.parquet(str(data))
 
-            self.df_papers = self.get_papers_spark()
-            self.df_citations = self.get_citations_spark()
-            self.df_paper_authors = self.get_paper_authors_spark()
+    def set_arrow(self, arrow=None):
+        """Turn Arrow transfer for toPandas() on or off for the spark session
 
-            self.author_data = self.get_authors_by_paper(self.df_paper_authors)
-            self.load_collection()
+        :arrow: True/False, or None to keep the current setting
+        :returns: whether Arrow is enabled
 
-    def get_papers_spark(self):
-        """TODO: Docstring for get_papers_spark.
-        :returns: TODO
+        """
+        import pyspark
+        if int(pyspark.__version__.split('.')[0]) >= 3:
+            key = 'spark.sql.execution.arrow.pyspark.enabled'
+        else:
+            key = 'spark.sql.execution.arrow.enabled'
+        if arrow is None:
+            return self.spark.conf.get(key, 'false').lower() == 'true'
+        self.spark.conf.set(key, 'true' if arrow else 'false')
+        return bool(arrow)
+
+    def to_pandas(self, sdf):
+        """Collect a spark DataFrame as a pandas DataFrame
+
+        With Arrow enabled, date and timestamp columns are cast to strings
+        first. Arrow converts these using the session time zone and returns
+        different types than the non-Arrow path. As strings they give the
+        same pub_date output either way.
+        """
+        if self.arrow:
+            from pyspark.sql.types import DateType, TimestampType
+            for field in sdf.schema.fields:
+                if isinstance(field.dataType, (DateType, TimestampType)):
+                    sdf = sdf.withColumn(field.name, sdf[field.name].cast('string'))
+        return sdf.toPandas()
+
+    def get_seed_ids(self):
+        """Get the seed paper IDs as a sorted list of unique ints, skipping blanks"""
+        return sorted(set(int(x) for x in self.paper_ids if str(x).strip()))
+
+    def get_seed_ids_spark(self, paper_ids=None):
+        """Get a spark DataFrame of paper IDs (default: the seed papers), marked for broadcast
+
+        Joining against this (rather than filtering with isin()) keeps the
+        ID list out of the query plan.
+        """
+        from pyspark.sql import functions as F
+        from pyspark.sql.types import StructType, StructField, LongType
+        if paper_ids is None:
+            paper_ids = self.seed_ids
+        schema = StructType([StructField(self.paper_id_colname, LongType(), False)])
+        sdf = self.spark.createDataFrame([(int(x), ) for x in paper_ids], schema=schema)
+        return F.broadcast(sdf)
+
+    def semi_join_seeds(self, sdf, colname, paper_ids=None):
+        """Keep the rows of sdf whose colname value is in paper_ids (default: the seed papers)"""
+        if paper_ids is None:
+            seeds = self.sdf_seed_ids
+        else:
+            seeds = self.get_seed_ids_spark(paper_ids)
+        seeds = seeds.withColumnRenamed(self.paper_id_colname, '_seed_id')
+        return sdf.join(seeds, sdf[colname] == seeds['_seed_id'], how='left_semi')
+
+    def get_colnames(self, keys, available):
+        """Get the column names in self.column_map for the given keys (if they are available)"""
+        cols = [self.column_map[k] for k in keys if k in self.column_map]
+        return [c for c in dict.fromkeys(cols) if c in available]
+
+    def project(self, sdf, keys):
+        """Select the columns in self.column_map for the given keys (if they exist in sdf)"""
+        return sdf.select(*self.get_colnames(keys, sdf.columns))
+
+    def get_papers_spark(self, paper_ids=None):
+        """Get the seed papers (or paper_ids), with only the columns used to load Papers
+        :returns: pandas DataFrame
 
         """
         logger.debug('getting papers from spark')
-        r = self.sdf_papers.filter(self.sdf_papers[self.paper_id_colname].isin(self.paper_ids))
-        return r.toPandas()
+        r = self.project(self.sdf_papers, PAPER_FIELDS)
+        r = self.semi_join_seeds(r, self.paper_id_colname, paper_ids)
+        return self.to_pandas(r)
 
-    def get_citations_spark(self):
-        """TODO: Docstring for get_citations_spark.
-        :returns: TODO
+    def get_citations_spark(self, citing_ids=None, cited_ids=None):
+        """Get the citations from citing_ids to cited_ids (by default, both are the seed papers)
+        :returns: pandas DataFrame
 
         """
         logger.debug('getting citations from spark')
-        r = self.sdf_citations.filter(self.sdf_citations[self.citing_paper_colname].isin(self.paper_ids))
-        r = r.filter(r[self.cited_paper_colname].isin(self.paper_ids))
-        return r.toPandas()
+        r = self.project(self.sdf_citations, ['citing', 'cited'])
+        r = self.semi_join_seeds(r, self.citing_paper_colname, citing_ids)
+        r = self.semi_join_seeds(r, self.cited_paper_colname, cited_ids)
+        return self.to_pandas(r)
 
-    def get_paper_authors_spark(self):
-        """TODO: Docstring for get_paper_authors_spark.
-        :returns: TODO
+    def get_paper_authors_spark(self, paper_ids=None):
+        """Get the author rows for the seed papers (or paper_ids)
+        :returns: pandas DataFrame
 
         """
         logger.debug('getting paper_authors from spark')
-        r = self.sdf_paper_authors.filter(self.sdf_paper_authors[self.paper_id_colname].isin(self.paper_ids))
-        return r.toPandas()
+        r = self.project(self.sdf_paper_authors, ['author_paper_id', 'author_id', 'author_seq', 'author_name'])
+        r = self.semi_join_seeds(r, self.paper_id_colname, paper_ids)
+        return self.to_pandas(r)
+
+    def read_arrow(self, data):
+        """Get a pyarrow Dataset for a MAG table
+
+        :data: path to parquet data (a file or a directory of files), or a pyarrow Dataset
+        :returns: pyarrow Dataset
+
+        """
+        import pyarrow.dataset as ds
+        if isinstance(data, ds.Dataset):
+            return data
+        return ds.dataset(str(data), format='parquet')
+
+    def seed_filter_arrow(self, dataset, colname, paper_ids=None):
+        """Get a pyarrow filter expression that keeps rows whose colname value is in paper_ids (default: the seed papers)
+
+        The min/max range lets pyarrow skip row groups using their parquet
+        statistics before checking set membership.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        seed_ids = self.seed_ids if paper_ids is None else sorted(set(int(x) for x in paper_ids))
+        field = ds.field(colname)
+        expr = field.isin(pa.array(seed_ids, type=dataset.schema.field(colname).type))
+        if seed_ids:
+            expr = (field >= seed_ids[0]) & (field <= seed_ids[-1]) & expr
+        return expr
+
+    def scan_arrow(self, dataset, keys, filters):
+        """Read the projected columns of the rows that pass all filters
+
+        :filters: list of (colname, paper_ids) tuples. paper_ids=None means the seed papers
+        :returns: pandas DataFrame
+
+        """
+        columns = self.get_colnames(keys, dataset.schema.names)
+        expr = None
+        for colname, paper_ids in filters:
+            this_expr = self.seed_filter_arrow(dataset, colname, paper_ids)
+            expr = this_expr if expr is None else expr & this_expr
+        return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+    def get_papers_arrow(self, paper_ids=None):
+        """Get the seed papers (or paper_ids) using pyarrow
+        :returns: pandas DataFrame
+
+        """
+        logger.debug('getting papers from arrow')
+        return self.scan_arrow(self.ds_papers, PAPER_FIELDS, [(self.paper_id_colname, paper_ids)])
+
+    def get_citations_arrow(self, citing_ids=None, cited_ids=None):
+        """Get the citations from citing_ids to cited_ids (by default, both are the seed papers) using pyarrow
+        :returns: pandas DataFrame
+
+        """
+        logger.debug('getting citations from arrow')
+        return self.scan_arrow(self.ds_citations, ['citing', 'cited'],
+                               [(self.citing_paper_colname, citing_ids), (self.cited_paper_colname, cited_ids)])
+
+    def get_paper_authors_arrow(self, paper_ids=None):
+        """Get the author rows for the seed papers (or paper_ids) using pyarrow
+        :returns: pandas DataFrame
+
+        """
+        logger.debug('getting paper_authors from arrow')
+        return self.scan_arrow(self.ds_paper_authors, ['author_paper_id', 'author_id', 'author_seq', 'author_name'],
+                               [(self.paper_id_colname, paper_ids)])
 
     def get_authors_by_paper(self, df_authors):
         """Get a dictionary mapping paper_id to author data
 
         """
-        author_data = {}
-        for paper_id, group in df_authors.groupby(self.paper_id_colname):
-            group = group.sort_values(self.author_seq_colname)
-            this_authors = []
-            for _, row in group.iterrows():
-                this_authors.append({'name': row[self.author_name_colname], 'author_id': row[self.author_id_colname]})
-            author_data[paper_id] = this_authors
-        return author_data
+        return get_authors_by_paper(df_authors,
+                                    paper_id_colname=self.paper_id_colname,
+                                    author_seq_colname=self.author_seq_colname,
+                                    author_name_colname=self.author_name_colname,
+                                    author_id_colname=self.author_id_colname)
 
     def load_paper(self, prow, author_data=None):
         paper_id = prow[self.paper_id_colname]
@@ -128,16 +671,23 @@ class DataGetterMAG2019(DataGetterBase):
         return p
 
     def load_collection(self):
-        """TODO: Docstring for load_collection.
-        :returns: TODO
+        """Load the papers, citations, and authors dataframes into self.collection
+        :returns: PaperCollection
 
         """
         logger.debug("loading collection")
-        for _, prow in self.df_papers.iterrows():
-            p = self.load_paper(prow, author_data=self.author_data)
-            self.collection.papers.append(p)
-        for _, row in self.df_citations.iterrows():
-            self.collection.citations.append((row[self.citing_paper_colname], row[self.cited_paper_colname]))
+        with self.metrics.stage('load_collection') as record:
+            self.collection = PaperCollection.from_frames(self.df_papers,
+                                                          df_citations=self.df_citations,
+                                                          df_authors=self.df_paper_authors,
+                                                          column_map=self.column_map,
+                                                          description=self.collection.description,
+                                                          dataset=self.dataset,
+                                                          dataset_version=self.dataset_version)
+            record['rows'] = len(self.collection)
+        # later stages (construct_graph, write_graph) are recorded with the extraction
+        self.collection.metrics = self.metrics
+        return self.collection
 
         
 
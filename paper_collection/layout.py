@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Time-directed layout of the citation graph, computed server-side.
+
+x is fixed by time: the year plus the fraction of the year given by the
+publication date, scaled to [0, 1]. Nodes with no date are placed at the
+mean time of their neighbors. y comes from a vectorized force pass, with
+every force computed for all nodes at once with numpy:
+
+  - attraction: springs along citation links pull each node toward the
+    mean y of its neighbors (a sparse matrix-vector product with scipy,
+    or numpy.bincount over the edge arrays);
+  - repulsion: approximated on a mesh of time columns (one per year),
+    by spreading the nodes of each column evenly over its height, in
+    their current order. Busier years get taller columns.
+
+Each iteration is O(number of links + number of nodes * log(number of nodes)).
+Layouts are cached by a hash of the graph, the dates, and the parameters.
+
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+# positions are rounded to this many decimals in exported records
+POSITION_DECIMALS = 4
+
+def get_times(years, pub_dates):
+    """Get times as fractional years, from years and publication dates
+
+    :years: list of years (None or NaN where missing)
+    :pub_dates: list of publication dates (strings or dates; None where missing)
+    :returns: float array (NaN where neither is known)
+
+    """
+    import pandas as pd
+    years = pd.to_numeric(pd.Series(years, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    dates = pd.to_datetime(pd.Series(pub_dates, dtype=object), errors='coerce')
+    date_years = dates.dt.year.to_numpy(dtype=np.float64)
+    fraction = (dates.dt.dayofyear.to_numpy(dtype=np.float64) - 1) / 366
+    times = np.where(np.isnan(years), date_years, years)
+    # the date gives the position within the year, unless it is from another year
+    same_year = date_years == times
+    return np.where(same_year, times + fraction, times + 0.5)
+
+def fill_times(graph, times, max_passes=10):
+    """Fill missing times with the mean time of the node's neighbors (repeated up to max_passes times)
+
+    Nodes still without a time (no dated neighbors) get the earliest time.
+    """
+    times = np.array(times, dtype=np.float64)
+    n = len(times)
+    sources, targets = graph.sources, graph.targets
+    for _ in range(max_passes):
+        missing = np.isnan(times)
+        if not missing.any() or missing.all():
+            break
+        known = np.nan_to_num(times)
+        has = (~missing).astype(np.float64)
+        total = np.bincount(sources, weights=known[targets], minlength=n) + np.bincount(targets, weights=known[sources], minlength=n)
+        count = np.bincount(sources, weights=has[targets], minlength=n) + np.bincount(targets, weights=has[sources], minlength=n)
+        fill = missing & (count > 0)
+        if not fill.any():
+            break
+        times[fill] = total[fill] / count[fill]
+    if np.isnan(times).all():
+        return np.zeros(n)
+    times[np.isnan(times)] = np.nanmin(times)
+    return times
+
+def _get_neighbor_sum(graph, use_scipy=None):
+    """Get a function computing, for each node, the sum of v over its neighbors (links in either direction)
+
+    Uses a symmetric scipy sparse matrix if scipy is installed, otherwise
+    numpy.bincount over the edge arrays (as ranking._get_matvec does).
+    """
+    n = graph.number_of_nodes()
+    sources, targets = graph.sources, graph.targets
+    if use_scipy is not False:
+        try:
+            from scipy import sparse
+        except ImportError:
+            if use_scipy:
+                raise
+        else:
+            M = sparse.csr_matrix((np.ones(len(sources)), (sources, targets)), shape=(n, n))
+            return (M + M.T).tocsr().dot
+    def neighbor_sum(v):
+        return np.bincount(sources, weights=v[targets], minlength=n) + np.bincount(targets, weights=v[sources], minlength=n)
+    return neighbor_sum
+
+def spread_columns(y, columns, column_heights):
+    """Spread the nodes of each column evenly over its height (centered at 0), keeping their order in y
+
+    :columns: column index of each node
+    :column_heights: height of each column
+    :returns: new y
+
+    """
+    n = len(y)
+    if n == 0:
+        return y
+    # one argsort of a float key, which is faster than numpy.lexsort((y, columns))
+    y_range = y.max() - y.min()
+    scaled = (y - y.min()) / y_range * 0.5 if y_range > 0 else np.zeros(n)
+    order = np.argsort(columns + scaled)
+    sorted_columns = columns[order]
+    counts = np.bincount(columns, minlength=len(column_heights))
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(n) - starts[sorted_columns]
+    heights = column_heights[sorted_columns]
+    out = np.empty(n)
+    out[order] = ((rank + 0.5) / counts[sorted_columns] - 0.5) * heights
+    return out
+
+def time_directed_layout(graph, times, iterations=50, attraction=0.5, spread=0.5, seed=0, use_scipy=None):
+    """Compute a time-directed layout
+
+    :graph: CitationGraph
+    :times: times (fractional years) aligned with graph.node_ids; NaN where unknown
+    :iterations: number of force iterations
+    :attraction: fraction of the way each node moves toward the mean y of its neighbors, per iteration
+    :spread: fraction of the way each node moves toward its evenly spread position in its column, per iteration
+    :seed: seed for the random starting positions
+    :use_scipy: True/False to force or avoid scipy.sparse. Default: use it if installed
+    :returns: (x, y) arrays aligned with graph.node_ids, both in [0, 1]
+
+    """
+    n = graph.number_of_nodes()
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+    times = fill_times(graph, times)
+    t_min, t_max = times.min(), times.max()
+    x = (times - t_min) / (t_max - t_min) if t_max > t_min else np.full(n, 0.5)
+
+    columns = (np.floor(times) - np.floor(t_min)).astype(np.int64)
+    column_sizes = np.bincount(columns)
+    column_heights = np.sqrt(column_sizes / column_sizes.max())
+
+    neighbor_sum = _get_neighbor_sum(graph, use_scipy=use_scipy)
+    degree = neighbor_sum(np.ones(n))
+    has_neighbors = degree > 0
+    inv_degree = np.zeros(n)
+    np.divide(1.0, degree, out=inv_degree, where=has_neighbors)
+    rng = np.random.default_rng(seed)
+    y = rng.uniform(-0.5, 0.5, n) * column_heights[columns]
+    for _ in range(iterations):
+        pull = np.where(has_neighbors, neighbor_sum(y) * inv_degree - y, 0.0)
+        y = y + attraction * pull
+        y = y + spread * (spread_columns(y, columns, column_heights) - y)
+    y = spread_columns(y, columns, column_heights)
+    return x, (y + 0.5)
+
+def layout_key(graph, times, **params):
+    """Hash of a graph's nodes and edges, the node times, and the layout parameters"""
+    h = hashlib.sha256()
+    for arr in (graph.node_ids, graph.sources, graph.targets, np.asarray(times, dtype=np.float64)):
+        arr = np.ascontiguousarray(arr)
+        h.update(str(arr.dtype).encode('utf-8'))
+        h.update(arr.tobytes() if arr.dtype != object else json.dumps(arr.tolist(), default=str).encode('utf-8'))
+    h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+class Layout:
+
+    """Node positions aligned with the nodes of a CitationGraph"""
+
+    def __init__(self, graph, x, y, key=None):
+        """
+        graph: CitationGraph
+        x, y: arrays aligned with graph.node_ids
+        key: hash of what the layout was computed from (see layout_key)
+        """
+        self.graph = graph
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.key = key
+
+    def __repr__(self):
+        return "Layout({} nodes)".format(len(self.x))
+
+    def get_positions(self, node_ids):
+        """Get rounded positions for node IDs
+
+        :returns: (x, y) lists (None for IDs not in the graph)
+
+        """
+        idx = np.asarray(self.graph.index_of(np.asarray(node_ids))).reshape(-1)
+        found = idx >= 0
+        out = []
+        for values in (self.x, self.y):
+            arr = np.full(len(idx), None, dtype=object)
+            arr[found] = np.round(values[idx[found]], POSITION_DECIMALS)
+            out.append(arr.tolist())
+        return out[0], out[1]
+
+    def node_positions(self):
+        """Get a dict of node ID (str) -> (x, y), rounded, as in the exported records"""
+        labels = [str(x) for x in self.graph.node_ids.tolist()]
+        xs = np.round(self.x, POSITION_DECIMALS).tolist()
+        ys = np.round(self.y, POSITION_DECIMALS).tolist()
+        return dict(zip(labels, zip(xs, ys)))
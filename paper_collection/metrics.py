@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Per-stage instrumentation: timings, row counts, spark jobs, and peak memory.
+
+A Metrics object collects one record per named stage. It can be read as
+a dict, logged as one JSON line, or written as a Prometheus text file
+(e.g., for the node_exporter textfile collector).
+
+"""
+
+import os
+import sys
+import json
+from contextlib import contextmanager
+from timeit import default_timer as timer
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+def peak_rss():
+    """Peak resident set size of this process so far, in bytes (None if not available)"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+def get_spark_job_durations(sc, job_ids):
+    """Get the durations (seconds) of finished spark jobs
+
+    Uses the application status store, which is not part of the public
+    pyspark API. Returns None if it is not available.
+    """
+    try:
+        store = sc._jsc.sc().statusStore()
+        durations = []
+        for job_id in job_ids:
+            job = store.job(job_id)
+            if job.submissionTime().isDefined() and job.completionTime().isDefined():
+                durations.append((job.completionTime().get().getTime() - job.submissionTime().get().getTime()) / 1000)
+        return durations
+    except Exception as e:
+        logger.debug("could not get spark job durations: {}".format(e))
+        return None
+
+class Metrics:
+
+    """Records of named stages, in the order they first ran"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def __repr__(self):
+        return "Metrics({} stages)".format(len(self.stages))
+
+    @contextmanager
+    def stage(self, name, spark=None):
+        """Time a block of code as a stage
+
+        Yields the stage's record (a dict), so that the block can add to it,
+        e.g. record['rows'] = len(df). If a stage runs more than once, its
+        times and counts are summed and 'calls' is counted.
+
+        :spark: SparkSession. If given, the spark jobs run in the block are tracked with a job group
+
+        """
+        record = {}
+        sc = None
+        if spark is not None:
+            sc = spark.sparkContext
+            job_group = "paper_collection-{}-{}".format(name, id(record))
+            previous_group = sc.getLocalProperty('spark.jobGroup.id')
+            sc.setJobGroup(job_group, name)
+        rss_before = peak_rss()
+        start = timer()
+        try:
+            yield record
+        finally:
+            record['seconds'] = timer() - start
+            rss = peak_rss()
+            if rss is not None:
+                record['peak_rss'] = rss
+                record['peak_rss_increase'] = rss - rss_before
+            if sc is not None:
+                job_ids = sc.statusTracker().getJobIdsForGroup(job_group)
+                record['spark_jobs'] = len(job_ids)
+                durations = get_spark_job_durations(sc, job_ids)
+                if durations is not None:
+                    record['spark_job_seconds'] = sum(durations)
+                sc.setLocalProperty('spark.jobGroup.id', previous_group)
+            self.add(name, record)
+            logger.debug("stage {}: {}".format(name, json.dumps(record)))
+
+    def add(self, name, record):
+        """Add a stage record, combining it with an earlier record of the same name"""
+        old = self.stages.get(name)
+        if old is None:
+            self.stages[name] = dict(record, calls=1)
+            return
+        for k, v in record.items():
+            if k in ['seconds', 'rows', 'edges', 'bytes', 'spark_jobs', 'spark_job_seconds', 'peak_rss_increase']:
+                old[k] = old.get(k, 0) + v
+            elif k == 'peak_rss':
+                old[k] = max(old.get(k, 0), v)
+            else:
+                old[k] = v
+        old['calls'] += 1
+
+    def update(self, other):
+        """Add the stages of another Metrics object"""
+        for name, record in other.stages.items():
+            calls = record.get('calls', 1)
+            self.add(name, {k: v for k, v in record.items() if k != 'calls'})
+            self.stages[name]['calls'] += calls - 1
+
+    def to_dict(self):
+        """:returns: dict of stage name -> record (a copy)"""
+        return {name: dict(record) for name, record in self.stages.items()}
+
+    def to_json(self, **labels):
+        """One line of JSON with the stages and any labels (e.g., collection='...')"""
+        return json.dumps(dict(labels, stages=self.to_dict()), sort_keys=True, default=str)
+
+    def log(self, logger=logger, level=logging.INFO, **labels):
+        """Log the metrics as one JSON line, prefixed with 'metrics '"""
+        logger.log(level, "metrics {}".format(self.to_json(**labels)))
+
+    def to_prometheus(self, prefix='paper_collection', **labels):
+        """Format the metrics in the Prometheus text exposition format
+
+        Each numeric field of the records is a gauge named
+        <prefix>_stage_<field>, with a 'stage' label plus any labels given.
+        """
+        help_text = {
+            'seconds': "Wall-clock time of the stage",
+            'rows': "Rows (or items) produced by the stage",
+            'edges': "Edges produced by the stage",
+            'bytes': "Bytes written by the stage",
+            'calls': "Number of times the stage ran",
+            'peak_rss': "Peak resident set size of the process after the stage, in bytes",
+            'peak_rss_increase': "Increase in peak resident set size during the stage, in bytes",
+            'spark_jobs': "Number of spark jobs run by the stage",
+            'spark_job_seconds': "Total duration of the spark jobs run by the stage",
+        }
+        fields = []
+        for record in self.stages.values():
+            for k, v in record.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool) and k not in fields:
+                    fields.append(k)
+        lines = []
+        for field in fields:
+            metric = "{}_stage_{}".format(prefix, field)
+            if field in ['peak_rss', 'peak_rss_increase']:
+                metric += '_bytes'
+            lines.append("# HELP {} {}".format(metric, help_text.get(field, field)))
+            lines.append("# TYPE {} gauge".format(metric))
+            for name, record in self.stages.items():
+                if field not in record:
+                    continue
+                these_labels = dict(labels, stage=name)
+                label_str = ",".join('{}="{}"'.format(k, _escape_label(v)) for k, v in sorted(these_labels.items()))
+                lines.append("{}{{{}}} {}".format(metric, label_str, float(record[field])))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, fpath, prefix='paper_collection', **labels):
+        """Write the metrics to a Prometheus text file
+
+        The file is written to a temporary file and then renamed, so that a
+        collector never reads a partial file.
+        """
+        fpath = str(fpath)
+        tmp = "{}.tmp-{}".format(fpath, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as outf:
+            outf.write(self.to_prometheus(prefix=prefix, **labels))
+        os.replace(tmp, fpath)
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
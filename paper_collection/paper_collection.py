@@ -2,25 +2,180 @@
 
 DESCRIPTION = """main module"""
 
-import sys, os, time, json
-from pathlib import Path
-from datetime import datetime
-from timeit import default_timer as timer
-try:
-    from humanfriendly import format_timespan
-except ImportError:
-    def format_timespan(seconds):
-        return "{:.2f} seconds".format(seconds)
-
+# Keep imports at module level to the standard library modules needed here.
+# pandas, numpy, networkx, etc. are imported where they are used, so that
+# importing the package stays fast.
+import os
 import logging
 root_logger = logging.getLogger()
 logger = root_logger.getChild(__name__)
 
-import math
+__all__ = [
+    'PAPER_FIELDS',
+    'STRING_FIELDS',
+    'NUMBER_FIELDS',
+    'DERIVED_FIELDS',
+    'derive_display_fields',
+    'Paper',
+    'PaperCollection',
+]
+
+# Paper attributes that can be loaded from a dataframe column
+PAPER_FIELDS = [
+    'dataset',
+    'dataset_version',
+    'paper_id',
+    'title',
+    'display_title',
+    'doi',
+    'url',
+    'pub_date',
+    'year',
+    'venue',
+    'node_rank',
+]
+
+# Paper attributes output by Paper.to_dict() (and PaperCollection.to_records()), as strings and numbers
+STRING_FIELDS = [
+    'dataset',
+    'dataset_version',
+    'title',
+    'display_title',
+    'doi',
+    'url',
+    'pub_date',
+    'venue',
+    'display_authors'
+]
+
+NUMBER_FIELDS = [
+    'year',
+    'node_rank'
+]
+
+# Paper attributes that are derived from other attributes (when not given) on first access
+DERIVED_FIELDS = [
+    'display_title',
+    'url',
+]
+
+def is_missing(value):
+    """True if an attribute value is missing: None, NaN, or the empty string"""
+    return value is None or value != value or (isinstance(value, str) and not value)
+
+def derive_display_fields(titles, display_titles, dois, urls):
+    """Derive display_title and url for many papers at once, a column at a time
+
+    Gives the same values as Paper's lazy attributes: display_title is the
+    title in title case, and url is the DOI URL, unless they are given.
+    Where neither is there (None, NaN, or empty), they are None.
+
+    :titles, display_titles, dois, urls: sequences of the same length
+    :returns: (display_titles, urls) lists
+
+    """
+    import pandas as pd
+
+    def missing(values):
+        values = pd.Series(values, dtype=object).to_numpy()
+        return values, pd.isna(values) | (values == '')
+
+    def derive(given, source, func):
+        given, given_missing = missing(given)
+        source, source_missing = missing(source)
+        todo = given_missing & ~source_missing
+        out = given.copy()
+        out[given_missing] = None
+        # an object column of str, so that pandas uses Python's str methods, as Paper's attributes do
+        out[todo] = func(pd.Series([str(v) for v in source[todo]], dtype=object))
+        return out.tolist()
+
+    def title_case(s):
+        try:
+            import pyarrow as pa
+            import pyarrow.compute as pc
+        except ImportError:
+            return s.str.title().to_numpy(dtype=object)
+        # Arrow's ascii_title is the same as str.title on ASCII text (its utf8_title is not, for some
+        # characters), so only the other titles go through Python
+        arr = pa.array(s.to_numpy(dtype=object), type=pa.string())
+        out = pc.ascii_title(arr).to_numpy(zero_copy_only=False).astype(object)
+        other = ~pc.string_is_ascii(arr).to_numpy(zero_copy_only=False)
+        if other.any():
+            out[other] = s[other].str.title().to_numpy(dtype=object)
+        return out
+
+    display_titles = derive(display_titles, titles, title_case)
+    urls = derive(urls, dois, lambda s: ("https://doi.org/" + s).to_numpy(dtype=object))
+    return display_titles, urls
+
+def join_author_names(author_lists):
+    """Get display_authors for many papers at once, as Paper.get_display_authors() does
+
+    The names of all the papers are joined with ', ' in one call, and each
+    paper's names are sliced out of the result, at positions computed
+    from the name lengths with numpy.
+
+    :author_lists: sequence of lists of author dicts (with key 'name'), one per paper
+    :returns: list of str (None for papers with no authors)
+
+    """
+    import numpy as np
+    counts = np.fromiter(map(len, author_lists), dtype=np.int64, count=len(author_lists))
+    names = [a['name'] for authors in author_lists for a in authors]
+    text = ", ".join(names)
+    # position in text after each name and the separator that follows it
+    ends = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, names), dtype=np.int64, count=len(names)) + 2, out=ends[1:])
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    starts = ends[offsets[:-1]].tolist()
+    stops = (ends[offsets[1:]] - 2).tolist()
+    return [text[a:b] if a < b else None for a, b in zip(starts, stops)]
+
+def clean_strings(values, none_strings=False):
+    """Clean a column of string attributes as Paper.to_dict() does, with pandas column operations
+
+    Missing values (None, NaN, empty) become None, or the string 'None' if
+    none_strings is True (as in Paper.to_dict()). Other values become str.
+
+    :returns: list
+
+    """
+    import pandas as pd
+    s = pd.Series(values, dtype=object)
+    if len(s) == 0:
+        return []
+    missing = (s.isna() | ~s.astype(bool)).to_numpy()
+    out = s.astype(str).to_numpy(dtype=object)
+    out[missing] = 'None' if none_strings else None
+    return out.tolist()
+
+def clean_numbers(values):
+    """Clean a column of numeric attributes as Paper.to_dict() does: NaN becomes None, NumPy scalars become Python numbers
+
+    :returns: list
+
+    """
+    import numpy as np
+    arr = values if isinstance(values, np.ndarray) else np.asarray(values)
+    if arr.dtype.kind in 'biu':
+        return arr.tolist()
+    if arr.dtype.kind == 'f':
+        out = arr.astype(object)
+        out[np.isnan(arr)] = None
+        return out.tolist()
+    return [None if v != v else v.item() if hasattr(v, 'item') else v for v in arr.tolist()]
 
 class Paper:
 
-    """A single article, from a single data set."""
+    """A single article, from a single data set.
+
+    display_title, url, and display_authors are derived on first access
+    (from title, doi, and authors) if they were not given, and then cached.
+    """
+
+    __slots__ = [f for f in PAPER_FIELDS if f not in DERIVED_FIELDS] + ['_display_title', '_url', 'authors', '_display_authors']
 
     def __init__(self,
                  dataset=None,
@@ -41,56 +196,69 @@ class Paper:
         self.dataset_version = dataset_version
         self.paper_id = paper_id
         self.title = title
-        self.display_title = display_title
+        self._display_title = display_title
         self.doi = doi
-        self.url = url
+        self._url = url
         self.pub_date = pub_date
         self.year = year
         self.venue = venue
         self.node_rank = node_rank
 
-        if (not self.display_title) and (self.title):
-            self.display_title = self.title.title()
+        self.load_authors(authors)
 
-        if (not self.url) and (self.doi):
-            self.url = "https://doi.org/{}".format(self.doi)
+    @property
+    def display_title(self):
+        if is_missing(self._display_title):
+            self._display_title = None if is_missing(self.title) else str(self.title).title()
+        return self._display_title
 
-        self.load_authors(authors)
+    @display_title.setter
+    def display_title(self, value):
+        self._display_title = value
+
+    @property
+    def url(self):
+        if is_missing(self._url):
+            self._url = None if is_missing(self.doi) else "https://doi.org/{}".format(self.doi)
+        return self._url
+
+    @url.setter
+    def url(self, value):
+        self._url = value
+
+    @property
+    def display_authors(self):
+        if self._display_authors is None:
+            self._display_authors = self.get_display_authors()
+        return self._display_authors
+
+    @display_authors.setter
+    def display_authors(self, value):
+        self._display_authors = value
 
     def __repr__(self):
         return "Paper(paper_id: {})".format(self.paper_id)
 
-    def to_dict(self):
+    def to_dict(self, none_strings=True):
         """return a dictionary of attributes suitable for JSON output
+        :none_strings: if True (default), missing strings are the string 'None'. Otherwise they are None
         :returns: dictionary
 
         """
-        string_fields = [
-            'dataset',
-            'dataset_version',
-            'title',
-            'display_title',
-            'doi',
-            'url',
-            'pub_date',
-            'venue',
-            'display_authors'
-        ]
-
-        num_fields = [
-            'year',
-            'node_rank'
-        ]
         out = dict()
-        for f in string_fields:
+        missing = 'None' if none_strings else None
+        for f in STRING_FIELDS:
             attr = getattr(self, f)
             if not attr or (attr != attr):  # invalid value, probably NaN
-                attr = None  # default for missing data
-            out[f] = str(attr)
-        for f in num_fields:
+                out[f] = missing  # default for missing data
+            else:
+                out[f] = str(attr)
+        for f in NUMBER_FIELDS:
             attr = getattr(self, f)
             if (attr != attr):  # invalid value, probably NaN
                 attr = None  # default for missing data
+            elif hasattr(attr, 'item'):  # NumPy scalar
+                attr = attr.item()
             out[f] = attr
         return out
 
@@ -103,7 +271,7 @@ class Paper:
         self.authors = authors
         if not self.authors:
             self.authors = []
-        self.display_authors = self.get_display_authors()
+        self._display_authors = None
 
     def get_display_authors(self):
         """Get a string representation for the authors of this paper
@@ -122,7 +290,7 @@ class PaperCollection:
                  description=None,
                  citations=None):
         """
-        papers: list of Paper objects
+        papers: list of Paper objects (or a PaperTable)
         description: (str) description of this collection
         citations: list of tuples (citing_id, cited_id)
         """
@@ -134,6 +302,72 @@ class PaperCollection:
         self.citations = citations
         if self.citations is None:
             self.citations = list()
+        self.G = None
+        self.citation_graph = None
+        self.coauthorship_graph = None
+        self.layout = None
+        from .metrics import Metrics
+        self.metrics = Metrics()
+
+    @classmethod
+    def from_frames(cls,
+                    df_papers,
+                    df_citations=None,
+                    df_authors=None,
+                    column_map=None,
+                    description=None,
+                    compact=False,
+                    **paper_kwargs):
+        """Build a collection from dataframes of papers, citations, and authors
+
+        Reads whole columns at once rather than building a row Series for
+        each paper (as iterrows() does).
+
+        df_papers: pandas DataFrame with one row per paper
+        df_citations: pandas DataFrame with one row per citation (optional)
+        df_authors: pandas DataFrame with one row per paper/author (optional)
+        column_map: dict mapping names to dataframe column names. Keys can be
+                    Paper attributes (e.g., 'paper_id', 'title', 'year'),
+                    'citing' and 'cited' for df_citations, and
+                    'author_paper_id', 'author_seq', 'author_name', and
+                    'author_id' for df_authors
+        description: (str) description of this collection
+        compact: if True, store the papers in a PaperTable rather than a list
+        paper_kwargs: values shared by all papers (e.g., dataset='mag')
+        """
+        column_map = column_map or {}
+        fields = [f for f in PAPER_FIELDS if f in column_map]
+        columns = [df_papers[column_map[f]].tolist() for f in fields]
+
+        author_data = None
+        if df_authors is not None:
+            from .data_getter import get_authors_by_paper
+            author_data = get_authors_by_paper(df_authors,
+                                               paper_id_colname=column_map.get('author_paper_id', 'PaperId'),
+                                               author_seq_colname=column_map.get('author_seq', 'AuthorSequenceNumber'),
+                                               author_name_colname=column_map.get('author_name', 'OriginalAuthor'),
+                                               author_id_colname=column_map.get('author_id', 'AuthorId'))
+
+        def iter_papers():
+            for values in zip(*columns):
+                kwargs = dict(zip(fields, values))
+                if author_data is not None:
+                    kwargs['authors'] = author_data.get(kwargs.get('paper_id'))
+                yield Paper(**paper_kwargs, **kwargs)
+        papers = iter_papers()
+        if not compact:
+            papers = list(papers)
+
+        citations = None
+        if df_citations is not None:
+            citations = list(zip(df_citations[column_map.get('citing', 'citing')].tolist(),
+                                 df_citations[column_map.get('cited', 'cited')].tolist()))
+
+        if compact:
+            from .paper_table import PaperTable
+            papers = PaperTable.from_papers(papers)
+
+        return cls(papers=papers, description=description, citations=citations)
 
     def __repr__(self):
         return "PaperCollection({})".format(self.description)
@@ -141,42 +375,465 @@ class PaperCollection:
     def __len__(self):
         return len(self.papers)
 
-    def construct_graph(self):
+    def compact(self):
+        """Move self.papers into a PaperTable (struct-of-arrays storage).
+
+        Paper objects are then created on demand when the collection is
+        iterated or indexed. Changes to those objects are not stored.
+        """
+        from .paper_table import PaperTable
+        if not isinstance(self.papers, PaperTable):
+            self.papers = PaperTable.from_papers(self.papers)
+        return self
+
+    def derive_display_fields(self):
+        """Derive display_title, url, and display_authors for all papers at once
+
+        Papers derive these on first access, one at a time. This derives
+        them a column at a time instead (see derive_display_fields() and
+        join_author_names()). The exports (iter_records(), and so
+        to_records(), construct_graph(), and write_graph()) call it first.
+        Papers in a PaperTable are stored with them already derived.
+        """
+        from .paper_table import PaperTable
+        papers = self.papers
+        if isinstance(papers, PaperTable) or not papers:
+            return self
+        display_titles, urls = derive_display_fields([p.title for p in papers], [p._display_title for p in papers],
+                                                     [p.doi for p in papers], [p._url for p in papers])
+        authors = [p.authors for p in papers]
+        display_authors = [p._display_authors for p in papers]
+        for p, display_title, url in zip(papers, display_titles, urls):
+            p._display_title = display_title
+            p._url = url
+        todo = [i for i, (value, a) in enumerate(zip(display_authors, authors)) if value is None and a]
+        if todo:
+            for i, value in zip(todo, join_author_names([authors[i] for i in todo])):
+                papers[i]._display_authors = value
+        return self
+
+    def get_columns(self, fields, start=0, stop=None):
+        """Get Paper attributes for papers start to stop, a column at a time
+
+        fields: list of Paper attributes (including 'display_authors')
+        returns: dict of field -> list of values
+        """
+        from .paper_table import PaperTable
+        if isinstance(self.papers, PaperTable):
+            return {f: self.papers.get_display_authors(start, stop) if f == 'display_authors'
+                    else self.papers.get_values(f, start, stop) for f in fields}
+        from operator import attrgetter
+        papers = self.papers[start:stop]
+        # one pass per field: transposing tuples of values instead creates a tuple per paper, which sets off
+        # garbage collection passes over all the papers
+        return {f: list(map(attrgetter(f), papers)) for f in fields}
+
+    def iter_records(self, none_strings=False, chunk_size=65536):
+        """Yield the attribute dict of each paper, as to_records() gives them, computed a chunk of papers at a time"""
+        from .paper_table import PaperTable
+        if not isinstance(self.papers, PaperTable):
+            # Paper objects: their own to_dict() is faster than gathering and cleaning columns of their attributes
+            self.derive_display_fields()
+            for start in range(0, len(self.papers), chunk_size):
+                papers = self.papers[start:start + chunk_size]
+                records = [p.to_dict(none_strings=none_strings) for p in papers]
+                if self.layout is not None:
+                    xs, ys = self.layout.get_positions([p.paper_id for p in papers])
+                    for record, x, y in zip(records, xs, ys):
+                        record['x'] = x
+                        record['y'] = y
+                yield from records
+            return
+        table = self.papers
+        keys = STRING_FIELDS + NUMBER_FIELDS
+        if self.layout is not None:
+            keys = keys + ['x', 'y']
+        fill = 'None' if none_strings else None
+        for start in range(0, len(table), chunk_size):
+            stop = start + chunk_size
+            cleaned = [[v or fill for v in table.get_display_authors(start, stop)] if f == 'display_authors'
+                       else table.get_strings(f, start, stop, none_strings=none_strings) for f in STRING_FIELDS]
+            cleaned += [clean_numbers(table.get_column(f)[start:stop]) for f in NUMBER_FIELDS]
+            if self.layout is not None:
+                cleaned += self.layout.get_positions(table.get_column('paper_id')[start:stop])
+            yield from [dict(zip(keys, row)) for row in zip(*cleaned)]
+
+    def to_records(self, none_strings=False):
+        """Get the attribute dicts of all papers for JSON output
+
+        The same records as Paper.to_dict(), with display fields derived
+        in bulk first. For a PaperTable (see compact() and open()), NaN and
+        None are cleaned and strings are converted a column at a time
+        instead of paper by paper. Missing strings are None (JSON null).
+
+        none_strings: if True, missing strings are the string 'None', as in Paper.to_dict()
+        returns: list of dicts, in the order of self.papers. If a layout has
+                 been computed (see compute_layout()), they include 'x' and 'y'
+        """
+        return list(self.iter_records(none_strings=none_strings))
+
+    def save(self, path):
+        """Save the collection in the binary format (see storage.py), which open() maps back without reading it
+
+        path: output directory (replaced if it exists)
+        """
+        from .storage import save_collection
+        save_collection(self, path)
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """Open a collection saved with save()
+
+        The papers (a PaperTable) and citation graph (a CitationGraph) are
+        memory-mapped, so opening is fast regardless of size, and papers and
+        neighbor lists are read from disk only when accessed.
+
+        path: directory written by save()
+        mmap: if False, read the arrays into memory instead
+        """
+        from .storage import open_collection
+        return open_collection(path, mmap=mmap)
+
+    def remove_papers(self, paper_ids):
+        """Remove papers, and the citations to and from them
+
+        If the graph has been constructed, its nodes and edges are removed too.
+
+        paper_ids: iterable of paper IDs
+        """
+        remove = set(paper_ids)
+        papers = [p for p in self.papers if p.paper_id not in remove]
+        self.papers = self._store_like_papers(papers)
+        self.citations = [(citing, cited) for citing, cited in self.citations
+                          if citing not in remove and cited not in remove]
+        if self.G is not None:
+            self.G.remove_nodes_from([str(x) for x in remove])
+        self.citation_graph = None
+        self.coauthorship_graph = None
+        self.layout = None
+
+    def add_papers(self, papers, citations=None):
+        """Add papers and citations
+
+        If the graph has been constructed, the new nodes and edges are added to it too.
+
+        papers: list of Paper objects
+        citations: list of tuples (citing_id, cited_id)
+        """
+        from .paper_table import PaperTable
+        papers = list(papers)
+        citations = list(citations or [])
+        if isinstance(self.papers, PaperTable):
+            self.papers = PaperTable.from_papers(list(self.papers) + papers)
+        else:
+            self.papers.extend(papers)
+        if not isinstance(self.citations, list):  # e.g., read-only citations of an opened collection
+            self.citations = list(self.citations)
+        self.citations.extend(citations)
+        if self.G is not None:
+            for paper in papers:
+                self.G.add_node(str(paper.paper_id), **paper.to_dict())
+            for citing, cited in citations:
+                self.G.add_edge(str(citing), str(cited))
+        self.citation_graph = None
+        self.coauthorship_graph = None
+        self.layout = None
+
+    def _store_like_papers(self, papers):
+        """Store a list of Papers the same way as self.papers (list or PaperTable)"""
+        from .paper_table import PaperTable
+        if isinstance(self.papers, PaperTable):
+            return PaperTable.from_papers(papers)
+        return papers
+
+    def construct_graph(self, none_strings=True):
         """Construct a graph with papers and citations
+
+        Node attributes are the papers' records (see to_records()).
+
+        none_strings: if True (default), missing strings are 'None', as in Paper.to_dict()
         """
         import networkx as nx
-        G = nx.DiGraph()
+        with self.metrics.stage('construct_graph') as record:
+            G = nx.DiGraph()
 
-        for paper in self.papers:
-            # G.add_node(str(paper.paper_id),
-            #            title=paper.title,
-            #            display_title=paper.display_title,
-            #            doi=paper.doi,
-            #            url=paper.url,
-            #            pub_date=str(paper.pub_date),
-            #            year=str(paper.year),
-            #            node_rank=paper.node_rank)
-            G.add_node(str(paper.paper_id), **paper.to_dict())
+            paper_ids = self.get_columns(['paper_id'])['paper_id']
+            G.add_nodes_from(zip(map(str, paper_ids), self.iter_records(none_strings=none_strings)))
 
-        for citing, cited in self.citations:
-            G.add_edge(str(citing), str(cited))
+            for citing, cited in self.citations:
+                G.add_edge(str(citing), str(cited))
+            if self.layout is not None:
+                # nodes that are only cited or citing
+                for node_id, (x, y) in self.layout.node_positions().items():
+                    if 'x' not in G.nodes[node_id]:
+                        G.nodes[node_id]['x'], G.nodes[node_id]['y'] = x, y
 
-        self.G = G
+            self.G = G
+            record['rows'] = G.number_of_nodes()
+            record['edges'] = G.number_of_edges()
 
         return G
 
-    def write_graph(self, outfpath):
+    def construct_citation_graph(self):
+        """Construct a compact CitationGraph (integer indexes and CSR/CSC
+        arrays) from the papers and citations. Use its to_networkx() or
+        construct_graph() when a networkx graph is needed.
+        """
+        from .citation_graph import CitationGraph
+        self.citation_graph = CitationGraph.from_collection(self.papers, self.citations)
+        return self.citation_graph
+
+    def construct_coauthorship_graph(self, df_authors=None, column_map=None, **kwargs):
+        """Construct the coauthorship graph of the papers' authors (see coauthorship.py)
+
+        Edge weights come from a sparse incidence-matrix product, and papers
+        with more than max_authors authors add no edges.
+
+        df_authors: pandas DataFrame with one row per paper/author (e.g., MAG
+                    PaperAuthorAffiliations). Only rows for papers in the
+                    collection are used. Default: the papers' authors
+        column_map: column names for df_authors, as in from_frames()
+        kwargs: max_authors, weighting ('count' or 'fractional'), use_scipy (see CoauthorshipGraph.from_pairs)
+        returns: CoauthorshipGraph
+        """
+        from .coauthorship import CoauthorshipGraph
+        with self.metrics.stage('construct_coauthorship_graph') as record:
+            if df_authors is not None:
+                column_map = column_map or {}
+                paper_id_colname = column_map.get('author_paper_id', 'PaperId')
+                paper_ids = self.get_columns(['paper_id'])['paper_id']
+                df_authors = df_authors[df_authors[paper_id_colname].isin(paper_ids)]
+                cg = CoauthorshipGraph.from_frame(df_authors,
+                                                  paper_id_colname=paper_id_colname,
+                                                  author_seq_colname=column_map.get('author_seq', 'AuthorSequenceNumber'),
+                                                  author_name_colname=column_map.get('author_name', 'OriginalAuthor'),
+                                                  author_id_colname=column_map.get('author_id', 'AuthorId'),
+                                                  **kwargs)
+            else:
+                cg = CoauthorshipGraph.from_collection(self.papers, **kwargs)
+            record['rows'] = cg.number_of_nodes()
+            record['edges'] = cg.number_of_edges()
+        self.coauthorship_graph = cg
+        return cg
+
+    def _get_node_papers(self, cg):
+        """Get the position in self.papers of the paper for each node of a CitationGraph
+
+        As in networkx, a repeated paper ID is one node, with the attributes of its last paper.
+        returns: array aligned with cg.node_ids; -1 for IDs that are only cited or citing
+        """
+        import numpy as np
+        source = np.full(cg.number_of_nodes(), -1, dtype=np.int64)
+        if len(self.papers):
+            paper_ids = self.get_columns(['paper_id'])['paper_id']
+            np.maximum.at(source, np.asarray(cg.index_of(np.asarray(paper_ids))).reshape(-1), np.arange(len(paper_ids)))
+        return source
+
+    def compute_layout(self, iterations=50, attraction=0.5, spread=0.5, seed=0, cache_dir=None):
+        """Compute a time-directed layout of the citation graph (see layout.py)
+
+        x is fixed by year and pub_date; y comes from a vectorized force pass
+        over the citations. Once computed, node records (to_records(),
+        write_graph(), write_timeline()) include 'x' and 'y', in [0, 1].
+
+        The layout is kept for the collection, and reused while the
+        collection's graph and dates and the parameters are the same. With
+        cache_dir, it is also cached on disk (see cache.FrameCache), keyed
+        by a hash of those.
+
+        iterations, attraction, spread, seed: see layout.time_directed_layout
+        cache_dir: directory for a layout cache shared between runs
+        returns: Layout
+        """
+        import numpy as np
+        import pandas as pd
+        from .layout import get_times, time_directed_layout, layout_key, Layout
+        cg = self.citation_graph or self.construct_citation_graph()
+        with self.metrics.stage('compute_layout') as record:
+            source = self._get_node_papers(cg)
+            has_paper = source >= 0
+            columns = self.get_columns(['year', 'pub_date'])
+            paper_times = get_times(columns['year'], columns['pub_date'])
+            times = np.full(cg.number_of_nodes(), np.nan)
+            times[has_paper] = paper_times[source[has_paper]]
+            params = {'iterations': iterations, 'attraction': attraction, 'spread': spread, 'seed': seed}
+            key = layout_key(cg, times, **params)
+            record['rows'] = cg.number_of_nodes()
+            record['cached'] = True
+            if self.layout is not None and self.layout.key == key and self.layout.graph is cg:
+                return self.layout
+            cache = None
+            frames = None
+            if cache_dir is not None:
+                from .cache import FrameCache
+                cache = FrameCache(cache_dir)
+                frames = cache.get(key)
+            if frames is not None:
+                x, y = frames['layout']['x'].to_numpy(), frames['layout']['y'].to_numpy()
+            else:
+                record['cached'] = False
+                x, y = time_directed_layout(cg, times, **params)
+                if cache is not None:
+                    cache.put(key, {'layout': pd.DataFrame({'x': x, 'y': y})})
+            self.layout = Layout(cg, x, y, key=key)
+        return self.layout
+
+    def compute_node_rank(self, alpha=0.85, tol=1e-6, max_iter=100, warm_start=True):
+        """Compute PageRank over the citations and store it in each paper's node_rank
+
+        Uses the CitationGraph (built if needed) and sparse power iteration.
+
+        alpha: damping factor
+        tol: convergence tolerance (see ranking.pagerank)
+        max_iter: maximum number of iterations
+        warm_start: start from the papers' current node_rank values (e.g., from an
+                    earlier run before the collection changed)
+        returns: number of iterations
+        """
+        import numpy as np
+        from .ranking import pagerank
+        from .paper_table import PaperTable
+        cg = self.citation_graph or self.construct_citation_graph()
+        if isinstance(self.papers, PaperTable) and isinstance(self.papers.get_column('paper_id'), np.ndarray):
+            paper_ids = self.papers.get_column('paper_id')
+        else:
+            paper_ids = np.asarray([p.paper_id for p in self.papers])
+        paper_idx = cg.index_of(paper_ids)
+
+        start = None
+        if warm_start:
+            if isinstance(self.papers, PaperTable):
+                old_ranks = self.papers.get_column('node_rank')
+            else:
+                old_ranks = [p.node_rank for p in self.papers]
+            old_ranks = np.array([np.nan if r is None else r for r in old_ranks], dtype=np.float64)
+            if not np.isnan(old_ranks).all():
+                start = np.zeros(cg.number_of_nodes())
+                start[paper_idx] = old_ranks
+
+        ranks, iterations = pagerank(cg, alpha=alpha, tol=tol, max_iter=max_iter, start=start)
+        paper_ranks = ranks[paper_idx]
+        if isinstance(self.papers, PaperTable):
+            self.papers.set_column('node_rank', paper_ranks)
+        else:
+            for paper, rank in zip(self.papers, paper_ranks.tolist()):
+                paper.node_rank = rank
+        if self.G is not None:
+            for paper in self.papers:
+                self.G.nodes[str(paper.paper_id)]['node_rank'] = paper.node_rank
+        return iterations
+
+    def write_graph(self, outfpath, compress=None, serializer=None, none_strings=True):
         """Write graph to json
 
+        Streams node-link JSON straight from self.papers and self.citations,
+        one record at a time, without building the networkx graph. The output
+        has the same records as json.dump(json_graph.node_link_data(self.G))
+        with the edges under the 'links' key (and is byte-for-byte the same
+        with serializer='json').
+
         outfpath: output path (json)
+        compress: if True, gzip the output. If None (default), gzip if outfpath ends with '.gz'
+        serializer: JSON encoder: 'json' (default), 'orjson', 'ujson', or 'fastest' for the fastest one installed
+        none_strings: if True (default), missing strings are 'None', as in Paper.to_dict(). If False, they are null
 
         """
-        from networkx.readwrite import json_graph
-        if self.G is None:
-            self.construct_graph()
-        outfpath = Path(outfpath)
-        logger.debug("writing to {}".format(outfpath))
-        json_data = json_graph.node_link_data(self.G)
-        with outfpath.open('w') as outf:
-            json.dump(json_data, outf)
+        from .serialize import write_node_link, open_output, get_serializer
+        serializer, dumps = get_serializer(serializer)
+        logger.debug("writing to {} (serializer: {})".format(outfpath, serializer))
+        with self.metrics.stage('write_graph') as record:
+            with open_output(outfpath, compress=compress) as outf:
+                records = self.iter_records(none_strings=none_strings)
+                positions = self.layout.node_positions() if self.layout is not None else None
+                record['rows'], record['edges'] = write_node_link(self.papers, self.citations, outf, dumps=dumps,
+                                                                  records=records, positions=positions)
+            record['bytes'] = os.path.getsize(str(outfpath))
+
+    def write_coauthorship_graph(self, outfpath, compress=None, serializer=None, **kwargs):
+        """Write the coauthorship graph as undirected node-link JSON, streamed from its arrays
+
+        Nodes have 'id' (author ID), 'name', and 'num_papers'; links have
+        'source', 'target', and 'weight'. The graph is constructed first if
+        needed (kwargs are passed to construct_coauthorship_graph()).
 
+        outfpath: output path (json)
+        compress, serializer: see write_graph()
+        """
+        from .serialize import write_node_link_records, open_output, get_serializer
+        cg = self.coauthorship_graph
+        if cg is None or kwargs:
+            cg = self.construct_coauthorship_graph(**kwargs)
+        serializer, dumps = get_serializer(serializer)
+        logger.debug("writing coauthorship graph to {} (serializer: {})".format(outfpath, serializer))
+        with self.metrics.stage('write_coauthorship_graph') as record:
+            with open_output(outfpath, compress=compress) as outf:
+                record['rows'], record['edges'] = write_node_link_records(cg.iter_nodes(), cg.iter_links(), outf,
+                                                                          dumps=dumps, directed=False)
+            record['bytes'] = os.path.getsize(str(outfpath))
+
+    def write_timeline(self, outdir, years_per_chunk=1, chunks=None, compress=False, serializer=None, none_strings=True):
+        """Write the graph as one node-link JSON file per year range, plus a manifest (see timeline.py)
+
+        Frontends can load the manifest first and then fetch the chunks
+        incrementally, rather than loading the whole graph at once.
+
+        outdir: output directory
+        years_per_chunk: number of years in each chunk
+        chunks: IDs of the chunks to write (e.g., ['1995']). Default: all
+        compress: gzip the chunk files
+        serializer, none_strings: see write_graph()
+        returns: the manifest (dict)
+        """
+        from .timeline import write_timeline
+        with self.metrics.stage('write_timeline') as record:
+            manifest = write_timeline(self, outdir, years_per_chunk=years_per_chunk, chunks=chunks,
+                                      compress=compress, serializer=serializer, none_strings=none_strings)
+            record['rows'] = manifest['num_nodes']
+            record['edges'] = manifest['num_links']
+        return manifest
+
+    def summarize(self, k=10, none_strings=True):
+        """Summarize the citation graph for drawing: the top k papers by node_rank in each year, plus one cluster node per year for the rest
+
+        Links between the summary nodes are weighted by the number of
+        citations they stand for (see summary.py). Papers with no node_rank
+        are ranked last (see compute_node_rank()).
+
+        k: number of papers to keep in each year
+        none_strings: see to_records()
+        returns: GraphSummary
+        """
+        from .summary import summarize
+        with self.metrics.stage('summarize') as record:
+            summary = summarize(self, k=k, none_strings=none_strings)
+            record['rows'] = summary.number_of_nodes()
+            record['edges'] = summary.number_of_edges()
+        return summary
+
+    def write_summary(self, outfpath, k=10, compress=None, serializer=None, none_strings=True):
+        """Write the summary graph (see summarize()) as node-link JSON, with a 'weight' on each link
+
+        outfpath: output path (json)
+        k: number of papers to keep in each year
+        compress, serializer, none_strings: see write_graph()
+        returns: GraphSummary
+        """
+        from .serialize import write_node_link_records, open_output, get_serializer
+        summary = self.summarize(k=k, none_strings=none_strings)
+        serializer, dumps = get_serializer(serializer)
+        logger.debug("writing summary graph to {} (serializer: {})".format(outfpath, serializer))
+        with self.metrics.stage('write_summary') as record:
+            with open_output(outfpath, compress=compress) as outf:
+                record['rows'], record['edges'] = write_node_link_records(summary.iter_nodes(), summary.iter_links(), outf,
+                                                                          dumps=dumps, graph={'summary': {'k': k}})
+            record['bytes'] = os.path.getsize(str(outfpath))
+        return summary
+
+    def serve(self, host='127.0.0.1', port=8080, none_strings=False):
+        """Serve the collection over HTTP until interrupted (see server.py; requires aiohttp)
+
+        host, port: address to listen on
+        none_strings: see to_records(). Default: missing strings are null
+        """
+        from .server import serve
+        serve(self, host=host, port=port, none_strings=none_strings)
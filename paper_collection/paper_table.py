@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Compact struct-of-arrays storage for the papers in a PaperCollection.
+
+Numeric attributes (IDs, years, node ranks) are kept in NumPy arrays.
+Strings are kept either as offset-encoded UTF-8 buffers or, when a column
+has few distinct values (e.g., dataset, venue), as integer codes into a
+list of interned strings. Paper objects are created on demand.
+
+"""
+
+import sys
+
+import numpy as np
+
+from .paper_collection import Paper, PAPER_FIELDS
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+class StringColumn:
+
+    """Strings stored in one UTF-8 buffer with an array of offsets"""
+
+    def __init__(self, data, offsets, missing):
+        """
+        data: uint8 array with the concatenated encoded strings
+        offsets: int64 array of length n+1; string i is data[offsets[i]:offsets[i+1]]
+        missing: bool array; True where the value is missing
+        """
+        self.data = data
+        self.offsets = offsets
+        self.missing = missing
+
+    @classmethod
+    def from_values(cls, values):
+        encoded = [b'' if _is_missing(v) else v.encode('utf-8') for v in values]
+        missing = np.fromiter((_is_missing(v) for v in values), dtype=bool, count=len(values))
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(data, offsets, missing)
+
+    def __len__(self):
+        return len(self.missing)
+
+    def __getitem__(self, i):
+        if self.missing[i]:
+            return None
+        return self.data[self.offsets[i]:self.offsets[i+1]].tobytes().decode('utf-8')
+
+    def tolist(self, start=0, stop=None, fill=None):
+        """Decode the strings from start to stop
+
+        :fill: value for missing strings
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        offsets = self.offsets[start:stop + 1]
+        if len(offsets) < 2:
+            return []
+        buf = self.data[offsets[0]:offsets[-1]].tobytes()
+        text = buf.decode('utf-8')
+        offsets = offsets - offsets[0]
+        if len(text) == len(buf):
+            # ASCII only: byte offsets are character offsets, so slice the decoded text
+            out = [text[a:b] for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        else:
+            out = [buf[a:b].decode('utf-8') for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        missing = self.missing[start:stop]
+        if missing.any():
+            out = np.array(out, dtype=object)
+            out[missing] = fill
+            out = out.tolist()
+        return out
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.offsets.nbytes + self.missing.nbytes
+
+class CategoricalColumn:
+
+    """Strings stored as integer codes into a list of interned values"""
+
+    def __init__(self, codes, categories):
+        """
+        codes: int32 array; -1 where the value is missing
+        categories: list of str
+        """
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_values(cls, values):
+        lookup = {}
+        codes = np.fromiter((-1 if _is_missing(v) else lookup.setdefault(v, len(lookup)) for v in values),
+                            dtype=np.int32, count=len(values))
+        categories = [sys.intern(v) for v in lookup]
+        return cls(codes, categories)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        if code < 0:
+            return None
+        return self.categories[code]
+
+    def tolist(self, start=0, stop=None, fill=None, clean=None):
+        """Get the strings from start to stop
+
+        :fill: value for missing strings
+        :clean: function applied to each category (not to each value)
+        """
+        categories = self.categories.tolist() if hasattr(self.categories, 'tolist') else list(self.categories)
+        if clean is not None:
+            categories = [clean(c) for c in categories]
+        lookup = np.empty(len(categories) + 1, dtype=object)
+        lookup[:-1] = categories
+        lookup[-1] = fill  # code -1
+        return lookup[self.codes[start:stop]].tolist()
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + sum(sys.getsizeof(c) for c in self.categories)
+
+def make_column(values):
+    """Choose a compact storage type for a list of values
+
+    :values: list
+    :returns: numeric NumPy array, StringColumn, CategoricalColumn, or object array
+
+    """
+    if all(isinstance(v, str) or _is_missing(v) for v in values):
+        num_unique = len(set(v for v in values if isinstance(v, str)))
+        if num_unique * 2 <= len(values):
+            return CategoricalColumn.from_values(values)
+        return StringColumn.from_values(values)
+    arr = np.asarray(values)
+    if arr.dtype.kind in 'biuf':
+        return arr
+    if all(_is_missing(v) or isinstance(v, (int, float, np.number)) for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return np.array(values, dtype=object)
+
+def _column_nbytes(column):
+    if isinstance(column, np.ndarray) and column.dtype == object:
+        return column.nbytes + sum(sys.getsizeof(v) for v in column)
+    return column.nbytes
+
+def _tolist(column, start=0, stop=None):
+    if isinstance(column, (StringColumn, CategoricalColumn)):
+        return column.tolist(start, stop)
+    return column[start:stop].tolist()
+
+def _get(column, i):
+    value = column[i]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class PaperTable:
+
+    """Struct-of-arrays storage for Papers
+
+    Behaves like a read-only sequence of Paper objects. Each access creates
+    a new Paper from the stored columns, so changes to that Paper are not
+    stored back. Authors keep only their 'name' and 'author_id'.
+    """
+
+    def __init__(self, columns, author_offsets, author_names, author_ids):
+        """
+        columns: dict of Paper attribute -> column (see make_column)
+        author_offsets: int64 array of length n+1; the authors of paper i
+                        are at positions author_offsets[i]:author_offsets[i+1]
+        author_names: column of author names
+        author_ids: column of author IDs
+        """
+        self.columns = columns
+        self.author_offsets = author_offsets
+        self.author_names = author_names
+        self.author_ids = author_ids
+
+    @classmethod
+    def from_papers(cls, papers):
+        """Build a table from an iterable of Paper objects"""
+        values = {f: [] for f in PAPER_FIELDS}
+        author_counts = []
+        author_names = []
+        author_ids = []
+        for paper in papers:
+            for f in PAPER_FIELDS:
+                values[f].append(getattr(paper, f))
+            author_counts.append(len(paper.authors))
+            for author in paper.authors:
+                author_names.append(author.get('name'))
+                author_ids.append(author.get('author_id'))
+        author_offsets = np.zeros(len(author_counts) + 1, dtype=np.int64)
+        np.cumsum(np.asarray(author_counts, dtype=np.int64), out=author_offsets[1:])
+        columns = {f: make_column(v) for f, v in values.items()}
+        return cls(columns, author_offsets, make_column(author_names), make_column(author_ids))
+
+    def __len__(self):
+        return len(self.author_offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.get_paper(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("PaperTable index out of range")
+        return self.get_paper(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get_paper(i)
+
+    def __repr__(self):
+        return "PaperTable({} papers)".format(len(self))
+
+    def get_paper(self, i):
+        """Create a Paper object for row i"""
+        p = Paper.__new__(Paper)
+        for f, column in self.columns.items():
+            setattr(p, f, _get(column, i))
+        start, end = self.author_offsets[i], self.author_offsets[i+1]
+        p.load_authors([{'name': _get(self.author_names, j), 'author_id': _get(self.author_ids, j)}
+                        for j in range(start, end)])
+        return p
+
+    def get_column(self, field):
+        """Get the stored column for a Paper attribute"""
+        return self.columns[field]
+
+    def get_values(self, field, start=0, stop=None):
+        """Get the values of a Paper attribute for rows start to stop, as a list"""
+        return _tolist(self.columns[field], start, stop)
+
+    def get_strings(self, field, start=0, stop=None, none_strings=False):
+        """Get a string attribute for rows start to stop, cleaned as in Paper.to_dict()
+
+        Uses the column's encoding: missing and empty strings are masked
+        without checking each value.
+
+        :none_strings: if True, missing strings are 'None' (as in Paper.to_dict()); otherwise None
+        :returns: list
+
+        """
+        from .paper_collection import clean_strings
+        fill = 'None' if none_strings else None
+        column = self.columns[field]
+        if isinstance(column, StringColumn):
+            stop = len(self) if stop is None else min(stop, len(self))
+            values = column.tolist(start, stop, fill=fill)
+            empty = np.diff(column.offsets[start:stop + 1]) == 0
+            if empty.any():
+                values = np.array(values, dtype=object)
+                values[empty] = fill
+                values = values.tolist()
+            return values
+        if isinstance(column, CategoricalColumn):
+            return column.tolist(start, stop, fill=fill, clean=lambda c: c if c else fill)
+        return clean_strings(self.get_values(field, start, stop), none_strings=none_strings)
+
+    def get_display_authors(self, start=0, stop=None):
+        """Get display_authors (author names joined with ', ') for rows start to stop, as a list"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        offsets = self.author_offsets[start:stop + 1].tolist()
+        if len(offsets) < 2:
+            return []
+        if isinstance(self.author_names, StringColumn) and not self.author_names.missing[offsets[0]:offsets[-1]].any():
+            return self._join_author_names(np.asarray(offsets, dtype=np.int64)).tolist()
+        names = _tolist(self.author_names, offsets[0], offsets[-1])
+        base = offsets[0]
+        return [", ".join(names[a - base:b - base]) if b > a else None for a, b in zip(offsets, offsets[1:])]
+
+    def _join_author_names(self, offsets):
+        """Join the author names of each paper in the UTF-8 buffer, without decoding them one by one
+
+        :offsets: author offsets of the papers (a slice of author_offsets)
+        :returns: StringColumn with one string per paper (missing for papers with no authors)
+
+        """
+        names = self.author_names
+        base = offsets[0]
+        name_offsets = names.offsets[base:offsets[-1] + 1]
+        lengths = np.diff(name_offsets)
+        is_last = np.zeros(len(lengths), dtype=bool)
+        counts = np.diff(offsets)
+        is_last[(offsets[1:] - 1 - base)[counts > 0]] = True
+        out_lengths = lengths + 2 * ~is_last
+        out_starts = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(out_lengths, out=out_starts[1:])
+        data = np.empty(out_starts[-1], dtype=np.uint8)
+        src = names.data[name_offsets[0]:name_offsets[-1]]
+        data[np.arange(len(src)) + np.repeat(out_starts[:-1] - (name_offsets[:-1] - name_offsets[0]), lengths)] = src
+        sep = (out_starts[:-1] + lengths)[~is_last]
+        data[sep] = ord(',')
+        data[sep + 1] = ord(' ')
+        return StringColumn(data, out_starts[offsets - base], counts == 0)
+
+    def set_column(self, field, values):
+        """Replace the stored column for a Paper attribute"""
+        if len(values) != len(self):
+            raise ValueError("column length {} does not match number of papers {}".format(len(values), len(self)))
+        self.columns[field] = values if isinstance(values, np.ndarray) else make_column(list(values))
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by the stored columns"""
+        columns = list(self.columns.values()) + [self.author_offsets, self.author_names, self.author_ids]
+        return sum(_column_nbytes(c) for c in columns)
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Node ranks (PageRank) over a collection's citation graph, by sparse power iteration.
+
+Rank flows from citing papers to the papers they cite. Papers with no
+references in the graph spread their rank over all papers.
+
+"""
+
+import numpy as np
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+def _get_matvec(graph, use_scipy=None):
+    """Get a function computing y[t] = sum of v[s] over edges s -> t
+
+    Uses a scipy sparse matrix built on the graph's CSC arrays if scipy is
+    installed, otherwise numpy.bincount over the edge arrays.
+    """
+    n = graph.number_of_nodes()
+    if use_scipy is not False:
+        try:
+            from scipy import sparse
+        except ImportError:
+            if use_scipy:
+                raise
+        else:
+            data = np.ones(len(graph.in_indices), dtype=np.float64)
+            M = sparse.csr_matrix((data, graph.in_indices, graph.in_indptr), shape=(n, n))
+            return M.dot
+    sources, targets = graph.sources, graph.targets
+    def matvec(v):
+        return np.bincount(targets, weights=v[sources], minlength=n)
+    return matvec
+
+def pagerank(graph, alpha=0.85, tol=1e-6, max_iter=100, start=None, use_scipy=None):
+    """Compute PageRank for every node of a CitationGraph
+
+    :graph: CitationGraph
+    :alpha: damping factor
+    :tol: stop when the L1 change between iterations is below number_of_nodes * tol (as networkx does)
+    :max_iter: maximum number of iterations
+    :start: starting ranks aligned with graph.node_ids (e.g., the previous ranks, for a warm start).
+            Missing (NaN) or negative values count as 0. Default: uniform
+    :use_scipy: True/False to force or avoid scipy.sparse. Default: use it if installed
+    :returns: (ranks array aligned with graph.node_ids and summing to 1, number of iterations)
+
+    """
+    n = graph.number_of_nodes()
+    if n == 0:
+        return np.zeros(0), 0
+    x = None
+    if start is not None:
+        x = np.nan_to_num(np.asarray(start, dtype=np.float64), nan=0.0)
+        x[x < 0] = 0
+        if x.sum() <= 0:
+            x = None
+    if x is None:
+        x = np.full(n, 1.0 / n)
+    else:
+        x = x / x.sum()
+
+    out_degree = graph.out_degree()
+    dangling = out_degree == 0
+    inv_out_degree = np.zeros(n)
+    np.divide(1.0, out_degree, out=inv_out_degree, where=~dangling)
+    matvec = _get_matvec(graph, use_scipy=use_scipy)
+
+    for i in range(1, max_iter + 1):
+        x_new = alpha * matvec(x * inv_out_degree)
+        x_new += (alpha * x[dangling].sum() + (1.0 - alpha)) / n
+        err = np.abs(x_new - x).sum()
+        x = x_new
+        if err < n * tol:
+            logger.debug("pagerank converged after {} iterations".format(i))
+            return x, i
+    logger.warning("pagerank did not converge in {} iterations (error {:g})".format(max_iter, err))
+    return x, max_iter
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Write a PaperCollection as node-link JSON without building a networkx graph.
+
+The output matches json.dump(json_graph.node_link_data(G)) for the graph
+built by PaperCollection.construct_graph(), record for record: nodes in
+the order networkx would store them, then edges grouped by source node.
+
+"""
+
+import re
+import json
+import gzip
+from datetime import date, datetime
+from pathlib import Path
+from itertools import islice
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+# tried in this order for serializer='fastest'
+SERIALIZERS = ['orjson', 'ujson', 'json']
+
+# characters read at a time when patching a file in update_node_link
+READ_CHUNK_SIZE = 1 << 20
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+def json_default(obj):
+    """Encode values the stdlib json module does not handle (datetimes, NumPy scalars)"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, 'item'):  # NumPy scalar
+        return obj.item()
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
+
+def _load_orjson():
+    import orjson
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    def dumps(obj):
+        return orjson.dumps(obj, default=json_default, option=option).decode('utf-8')
+    return dumps
+
+def _load_ujson():
+    import ujson
+    def dumps(obj):
+        return ujson.dumps(obj, default=json_default, ensure_ascii=True)
+    return dumps
+
+def _load_json():
+    def dumps(obj):
+        return json.dumps(obj, default=json_default)
+    return dumps
+
+_loaders = {
+    'orjson': _load_orjson,
+    'ujson': _load_ujson,
+    'json': _load_json,
+}
+
+def get_serializer(name=None):
+    """Get a function that encodes one record as a JSON string
+
+    orjson and ujson write compact JSON (no spaces after separators), so
+    their output is equivalent to, but not byte-for-byte the same as, the
+    stdlib json output. They are only used when asked for.
+
+    :name: 'orjson', 'ujson', or 'json', or 'fastest' for the first one of these that is installed.
+           Default: 'json', which writes the same text as json.dump of the networkx node-link data
+    :returns: (name, dumps function)
+
+    """
+    if name is None:
+        name = 'json'
+    if name != 'fastest':
+        return name, _loaders[name]()
+    for name in SERIALIZERS:
+        try:
+            return name, _loaders[name]()
+        except ImportError:
+            continue
+
+def get_node_order(papers, citations):
+    """Get the order in which networkx would store the graph's nodes
+
+    :papers: sequence of Paper objects (supports len() and indexing)
+    :citations: iterable of (citing_id, cited_id) tuples
+    :returns: (node_order, attr_source)
+        node_order: dict of node id (str) -> position in the output
+        attr_source: list of positions in papers; attr_source[k] is the
+                     last paper with the k-th node id, whose attributes
+                     are the ones networkx keeps
+
+    """
+    node_order = {}
+    attr_source = []
+    if hasattr(papers, 'get_values'):  # PaperTable: read the column rather than creating Papers
+        paper_ids = papers.get_values('paper_id')
+    else:
+        paper_ids = (paper.paper_id for paper in papers)
+    for i, paper_id in enumerate(paper_ids):
+        k = node_order.setdefault(str(paper_id), len(node_order))
+        if k == len(attr_source):
+            attr_source.append(i)
+        else:
+            attr_source[k] = i
+    for citing, cited in citations:
+        node_order.setdefault(str(citing), len(node_order))
+        node_order.setdefault(str(cited), len(node_order))
+    return node_order, attr_source
+
+def iter_nodes(papers, node_order, attr_source, records=None, positions=None):
+    """Yield node dicts as node_link_data would give them
+
+    :records: iterable of attribute dicts aligned with papers (e.g.,
+              PaperCollection.iter_records()). Default: each paper's to_dict()
+    :positions: dict of node id -> (x, y), added to the nodes that are not papers (see PaperCollection.compute_layout())
+
+    """
+    if records is None:
+        for i in attr_source:
+            paper = papers[i]
+            node = paper.to_dict()
+            node['id'] = str(paper.paper_id)
+            yield node
+    else:
+        if len(attr_source) == len(papers) and all(i == k for k, i in enumerate(attr_source)):
+            # no repeated papers: stream the records in order
+            selected = records
+        else:
+            records = list(records)
+            selected = (records[i] for i in attr_source)
+        # the first len(attr_source) node ids are the papers', in the same order
+        for node_id, node in zip(node_order, selected):
+            node['id'] = node_id
+            yield node
+    for node_id in islice(node_order, len(attr_source), None):
+        if positions is not None and node_id in positions:
+            x, y = positions[node_id]
+            yield {'id': node_id, 'x': x, 'y': y}
+        else:
+            yield {'id': node_id}
+
+def iter_links(citations, node_order):
+    """Yield link dicts as node_link_data would give them
+
+    Edges come out grouped by source node (in node order), each group in
+    citation order with repeated edges dropped.
+    """
+    citations = list(citations)
+    source_pos = [node_order[str(citing)] for citing, _ in citations]
+    current_source = None
+    seen = set()
+    for j in sorted(range(len(citations)), key=source_pos.__getitem__):
+        citing, cited = str(citations[j][0]), str(citations[j][1])
+        if citing != current_source:
+            current_source = citing
+            seen = set()
+        if cited in seen:
+            continue
+        seen.add(cited)
+        yield {'source': citing, 'target': cited}
+
+def _write_array(outf, records, dumps):
+    """Write records as a JSON array
+    :returns: number of records written
+
+    """
+    outf.write('[')
+    k = 0
+    for k, record in enumerate(records, start=1):
+        if k > 1:
+            outf.write(', ')
+        outf.write(dumps(record))
+    outf.write(']')
+    return k
+
+def write_node_link_records(nodes, links, outf, link_key='links', dumps=None, directed=True, graph=None):
+    """Write node and link records to an open text file as node-link JSON
+
+    :nodes: iterable of node dicts
+    :links: iterable of link dicts
+    :outf: file object opened for writing text
+    :link_key: name of the edge list
+    :dumps: function to encode one record as a JSON string (default: see get_serializer)
+    :directed: value of the "directed" key
+    :graph: dict of graph attributes (the "graph" key)
+    :returns: (number of nodes, number of links) written
+
+    """
+    if dumps is None:
+        _, dumps = get_serializer()
+    outf.write('{{"directed": {}, "multigraph": false, "graph": {}, "nodes": '.format(json.dumps(bool(directed)), dumps(graph or {})))
+    num_nodes = _write_array(outf, nodes, dumps)
+    outf.write(', {}: '.format(json.dumps(link_key)))
+    num_links = _write_array(outf, links, dumps)
+    outf.write('}')
+    return num_nodes, num_links
+
+def write_node_link(papers, citations, outf, link_key='links', dumps=None, records=None, positions=None):
+    """Write papers and citations to an open text file as node-link JSON
+
+    Only one node or link record is held in memory at a time (plus an
+    index of node ids and citation sources).
+
+    :papers: sequence of Paper objects
+    :citations: list of (citing_id, cited_id) tuples
+    :outf: file object opened for writing text
+    :link_key: name of the edge list ('links' is what the d3 visualizations expect)
+    :dumps: function to encode one record as a JSON string (default: see get_serializer)
+    :records: node attribute dicts aligned with papers (default: each paper's to_dict())
+    :positions: positions of the nodes that are not papers (see iter_nodes)
+    :returns: (number of nodes, number of links) written
+
+    """
+    node_order, attr_source = get_node_order(papers, citations)
+    return write_node_link_records(iter_nodes(papers, node_order, attr_source, records=records, positions=positions),
+                            iter_links(citations, node_order),
+                            outf, link_key=link_key, dumps=dumps)
+
+class _JSONStream:
+
+    """Read a JSON document from a text file one value at a time, for files too big to json.load"""
+
+    def __init__(self, f, chunk_size=None):
+        self.f = f
+        self.chunk_size = chunk_size or READ_CHUNK_SIZE
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read another chunk into the buffer (dropping what has been consumed); False at the end of the file"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at the end of the file)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of chars"""
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError("invalid node-link JSON: expected one of {!r}, got {!r}".format(chars, c))
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next value
+        :returns: (value, its JSON text as it is in the file)
+
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # the value may continue in the next chunk
+                if self._fill():
+                    continue
+                raise
+            if end == len(self.buf) and not self.eof and self._fill():
+                # a number at the end of the buffer may continue in the next chunk
+                continue
+            text = self.buf[self.pos:end]
+            self.pos = end
+            return value, text
+
+    def iter_array(self):
+        """Yield (value, text) for each element of the array that comes next"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        scan_once = self.decoder.scan_once
+        skip = _WHITESPACE.match
+        while True:
+            buf = self.buf
+            start = skip(buf, self.pos).end()
+            try:
+                value, end = scan_once(buf, start)
+                sep = skip(buf, end).end()
+            except (StopIteration, ValueError):
+                sep = len(buf)
+            if sep < len(buf):
+                if buf[sep] not in ',]':
+                    raise ValueError("invalid node-link JSON: expected ',' or ']', got {!r}".format(buf[sep]))
+                self.pos = sep + 1
+                yield value, buf[start:end]
+                if buf[sep] == ']':
+                    return
+                continue
+            # the element, or the separator after it, continues in the next chunk
+            self.pos = start
+            if not self._fill():
+                raise ValueError("invalid node-link JSON: unexpected end of the array")
+
+def _write_array_text(outf, texts):
+    """Write JSON texts as a JSON array
+    :returns: number of elements written
+
+    """
+    outf.write('[')
+    k = 0
+    for k, text in enumerate(texts, start=1):
+        if k > 1:
+            outf.write(', ')
+        outf.write(text)
+    outf.write(']')
+    return k
+
+def update_node_link(fpath, papers=None, citations=None, remove_ids=None, serializer=None, compress=None,
+                     none_strings=True, positions=None):
+    """Patch a node-link JSON file written by write_node_link
+
+    Removes nodes (and their links), replaces nodes for the given papers
+    in place, and appends new nodes and links. The file is read and
+    written in one streaming pass: records that are not changed are
+    copied through as they are, so memory use depends on the size of the
+    update, not the size of the file. The file is replaced atomically.
+
+    :fpath: path to the JSON file
+    :papers: Paper objects to add (replacing nodes with the same id)
+    :citations: (citing_id, cited_id) tuples to add
+    :remove_ids: paper IDs to remove
+    :serializer: see get_serializer
+    :compress: see open_output
+    :none_strings: see PaperCollection.write_graph(). Give the setting the file was written with
+    :positions: if the file was written with a layout, the positions of the updated collection's
+                nodes: dict of node id -> (x, y) (see Layout.node_positions()). New nodes get theirs,
+                and nodes already in the file are rewritten if theirs changed
+    :returns: (number of nodes, number of links) written
+
+    """
+    import os
+    fpath = Path(fpath)
+    if compress is None:
+        compress = fpath.suffix == '.gz'
+    _, dumps = get_serializer(serializer)
+
+    remove = set(str(x) for x in (remove_ids or []))
+    new_nodes = {}
+    for paper in papers or []:
+        node_id = str(paper.paper_id)
+        node = paper.to_dict(none_strings=none_strings)
+        if positions is not None:
+            node['x'], node['y'] = positions.get(node_id, (None, None))
+        node['id'] = node_id
+        new_nodes[node_id] = node
+    new_links = dict.fromkeys((str(citing), str(cited)) for citing, cited in citations or [])
+    # link ends with no node yet; dropped from this as their nodes are written
+    missing = dict.fromkeys(node_id for link in new_links for node_id in link if node_id not in new_nodes)
+
+    def iter_nodes(stream):
+        for node, text in stream.iter_array():
+            node_id = node['id']
+            if node_id in remove:
+                continue
+            missing.pop(node_id, None)
+            if node_id in new_nodes:
+                yield dumps(new_nodes.pop(node_id))
+            elif positions is not None and node_id in positions \
+                    and (node.get('x'), node.get('y')) != tuple(positions[node_id]):
+                node['x'], node['y'] = positions[node_id]
+                yield dumps(node)
+            else:
+                yield text
+        for node in new_nodes.values():
+            yield dumps(node)
+        for node_id in missing:
+            if positions is not None and node_id in positions:
+                x, y = positions[node_id]
+                yield dumps({'id': node_id, 'x': x, 'y': y})
+            else:
+                yield dumps({'id': node_id})
+
+    def iter_links(stream):
+        for link, text in stream.iter_array():
+            key = (link['source'], link['target'])
+            if key[0] in remove or key[1] in remove:
+                continue
+            new_links.pop(key, None)
+            yield text
+        for citing, cited in new_links:
+            yield dumps({'source': citing, 'target': cited})
+
+    counts = {}
+    opener = gzip.open if compress else open
+    tmp = fpath.with_name('.{}.tmp'.format(fpath.name))
+    with opener(str(fpath), 'rt', encoding='utf-8') as f, open_output(tmp, compress=compress) as outf:
+        stream = _JSONStream(f)
+        stream.expect('{')
+        outf.write('{')
+        first = True
+        while stream.peek() != '}':
+            if not first:
+                stream.expect(',')
+                outf.write(', ')
+            first = False
+            key, key_text = stream.value()
+            stream.expect(':')
+            outf.write(key_text + ': ')
+            if key == 'nodes':
+                counts[key] = _write_array_text(outf, iter_nodes(stream))
+            elif key in ('links', 'edges'):
+                counts['links'] = _write_array_text(outf, iter_links(stream))
+            else:
+                outf.write(stream.value()[1])
+        stream.expect('}')
+        outf.write('}')
+    os.replace(str(tmp), str(fpath))
+    return counts.get('nodes', 0), counts.get('links', 0)
+
+def open_output(outfpath, compress=None):
+    """Open an output file for writing text
+
+    :outfpath: output path
+    :compress: if True, gzip the output. If None, gzip if the path ends with '.gz'
+    :returns: file object
+
+    """
+    outfpath = Path(outfpath)
+    if compress is None:
+        compress = outfpath.suffix == '.gz'
+    if compress:
+        return gzip.open(str(outfpath), 'wt', encoding='utf-8')
+    return outfpath.open('w', encoding='utf-8')
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """HTTP service (aiohttp) that keeps one PaperCollection in memory and answers queries about it.
+
+Endpoints (all GET, all returning compact JSON):
+
+  /                              collection info (counts, years)
+  /nodes                         nodes, paged (offset, limit), optionally in a year range
+                                 (year_start, year_end) and ordered by order=index|time|rank
+  /nodes/{id}                    one node
+  /nodes/{id}/neighbors          a node's references and citing papers (direction=out|in|both, limit)
+  /top                           top k nodes by node_rank, optionally in a year range, or per year (per_year=1)
+  /subgraph                      nodes in a year range (optionally only the top k) and the links between them
+
+Nodes are the records of PaperCollection.write_graph() (with missing
+strings as null). The collection is not changed while it is served, so
+each response's ETag comes from a hash of the collection and the query,
+and a request with a matching If-None-Match gets a 304 without the
+response being built.
+
+"""
+
+import hashlib
+from urllib.parse import urlencode
+
+import numpy as np
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+MAX_SUBGRAPH_NODES = 20000
+
+class CollectionIndex:
+
+    """Arrays for answering queries about a collection, built once"""
+
+    def __init__(self, coll, none_strings=False):
+        """
+        coll: PaperCollection (its citation graph is constructed if needed)
+        none_strings: see PaperCollection.to_records(). Default: missing strings are null
+        """
+        from .timeline import get_timeline_order
+        from .serialize import get_serializer
+        self.coll = coll
+        self.description = coll.description
+        cg = coll.citation_graph or coll.construct_citation_graph()
+        self.graph = cg
+        n = cg.number_of_nodes()
+        _, self.dumps = get_serializer('fastest')
+
+        records = coll.to_records(none_strings=none_strings)
+        source = coll._get_node_papers(cg)
+        positions = coll.layout.node_positions() if coll.layout is not None else None
+        self.labels = [str(x) for x in cg.node_ids.tolist()]
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.nodes = []
+        for label, i in zip(self.labels, source.tolist()):
+            if i >= 0:
+                node = dict(records[i])
+            else:
+                node = {}
+                if positions is not None and label in positions:
+                    node['x'], node['y'] = positions[label]
+            node['id'] = label
+            self.nodes.append(node)
+
+        from .summary import _to_float
+        has_paper = source >= 0
+        self.years = np.full(n, np.nan)
+        self.ranks = np.full(n, np.nan)
+        self.years[has_paper] = _to_float([records[i]['year'] for i in source[has_paper].tolist()])
+        self.ranks[has_paper] = _to_float([records[i]['node_rank'] for i in source[has_paper].tolist()])
+        pub_dates = [node.get('pub_date') for node in self.nodes]
+        pub_dates = [None if d in (None, 'None') else d for d in pub_dates]
+        self.time_order = get_timeline_order(self.years, pub_dates)
+        self.sorted_years = self.years[self.time_order]  # NaN (no year) last
+        self.rank_order = self.order_by_rank(np.arange(n))
+
+        h = hashlib.sha256()
+        for arr in (cg.sources, cg.targets):
+            h.update(np.ascontiguousarray(arr).tobytes())
+        for node in self.nodes:
+            h.update(self.dumps(node).encode('utf-8'))
+        self.version = h.hexdigest()
+
+    def __repr__(self):
+        return "CollectionIndex({} nodes, version {})".format(len(self.nodes), self.version[:12])
+
+    def order_by_rank(self, idx):
+        """Order node indexes by node_rank, highest first (NaN last, ties by index)"""
+        idx = np.asarray(idx, dtype=np.int64)
+        return idx[np.lexsort((idx, -np.nan_to_num(self.ranks[idx], nan=-np.inf)))]
+
+    def in_years(self, year_start=None, year_end=None):
+        """Node indexes with year_start <= year <= year_end, in time order (None: all nodes, in time order)"""
+        if year_start is None and year_end is None:
+            return self.time_order
+        lo = 0 if year_start is None else np.searchsorted(self.sorted_years, year_start, side='left')
+        if year_end is None:
+            hi = np.count_nonzero(~np.isnan(self.sorted_years))
+        else:
+            hi = np.searchsorted(self.sorted_years, year_end, side='right')
+        return self.time_order[lo:hi]
+
+    def top(self, k, year_start=None, year_end=None, per_year=False):
+        """Node indexes of the top k nodes by node_rank (in a year range, or in each year)"""
+        if per_year:
+            from .summary import top_k_per_group
+            idx = self.in_years(year_start, year_end)
+            _, groups = np.unique(self.years[idx], return_inverse=True)
+            _, selected = top_k_per_group(groups.ravel(), self.ranks[idx], k)
+            return idx[selected]
+        if year_start is None and year_end is None:
+            return self.rank_order[:k]
+        return self.order_by_rank(self.in_years(year_start, year_end))[:k]
+
+    def neighbors(self, i, direction='both'):
+        """Node indexes that node i cites (out), is cited by (in), or both"""
+        cg = self.graph
+        out_idx = cg.out_indices[cg.out_indptr[i]:cg.out_indptr[i + 1]] if direction in ('out', 'both') else []
+        in_idx = cg.in_indices[cg.in_indptr[i]:cg.in_indptr[i + 1]] if direction in ('in', 'both') else []
+        return np.asarray(out_idx, dtype=np.int64), np.asarray(in_idx, dtype=np.int64)
+
+    def links_among(self, idx):
+        """Links (as pairs of node indexes) with both ends in idx"""
+        mask = np.zeros(len(self.nodes), dtype=bool)
+        mask[idx] = True
+        cg = self.graph
+        keep = mask[cg.sources] & mask[cg.targets]
+        return cg.sources[keep], cg.targets[keep]
+
+    def get_links(self, sources, targets):
+        return [{'source': self.labels[s], 'target': self.labels[t]} for s, t in zip(sources.tolist(), targets.tolist())]
+
+    def get_nodes(self, idx):
+        return [self.nodes[i] for i in np.asarray(idx).tolist()]
+
+    def info(self):
+        known = self.years[~np.isnan(self.years)]
+        return {
+            'description': self.description,
+            'num_nodes': len(self.nodes),
+            'num_links': self.graph.number_of_edges(),
+            'year_min': int(known.min()) if len(known) else None,
+            'year_max': int(known.max()) if len(known) else None,
+            'version': self.version,
+        }
+
+def _get_int(request, name, default=None, minimum=None, maximum=None):
+    from aiohttp import web
+    value = request.query.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise web.HTTPBadRequest(text="{} must be an integer".format(name))
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        raise web.HTTPBadRequest(text="{} must be between {} and {}".format(name, minimum, maximum))
+    return value
+
+def _get_choice(request, name, choices, default):
+    from aiohttp import web
+    value = request.query.get(name, default)
+    if value not in choices:
+        raise web.HTTPBadRequest(text="{} must be one of {}".format(name, ", ".join(choices)))
+    return value
+
+def _get_years(request):
+    return _get_int(request, 'year_start'), _get_int(request, 'year_end')
+
+def _get_node_index(request, index):
+    from aiohttp import web
+    i = index.index.get(request.match_info['id'])
+    if i is None:
+        raise web.HTTPNotFound(text="no node {}".format(request.match_info['id']))
+    return i
+
+def make_app(coll, none_strings=False):
+    """Make the aiohttp application serving a collection
+
+    :coll: PaperCollection, or a CollectionIndex already built (e.g., to make several apps for one collection)
+    :none_strings: see CollectionIndex
+    :returns: aiohttp.web.Application
+
+    """
+    from aiohttp import web
+
+    if isinstance(coll, CollectionIndex):
+        index = coll
+    else:
+        with coll.metrics.stage('build_index') as record:
+            index = CollectionIndex(coll, none_strings=none_strings)
+            record['rows'] = len(index.nodes)
+    logger.debug("serving {}".format(index))
+
+    def etag_for(request):
+        query = urlencode(sorted(request.query.items()))
+        return '"{}"'.format(hashlib.sha1("{}\n{}\n{}".format(index.version, request.path, query).encode('utf-8')).hexdigest())
+
+    def cached(handler):
+        """Answer 304 if the client has the current ETag; otherwise build the response and add the ETag"""
+        async def wrapper(request):
+            etag = etag_for(request)
+            if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+                return web.Response(status=304, headers={'ETag': etag})
+            body = index.dumps(handler(request)).encode('utf-8')
+            return web.Response(body=body, content_type='application/json',
+                                headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+        return wrapper
+
+    def info(request):
+        return index.info()
+
+    def nodes(request):
+        offset = _get_int(request, 'offset', 0, minimum=0)
+        limit = _get_int(request, 'limit', DEFAULT_PAGE_SIZE, minimum=0, maximum=MAX_PAGE_SIZE)
+        year_start, year_end = _get_years(request)
+        filtered = year_start is not None or year_end is not None
+        order = _get_choice(request, 'order', ['index', 'time', 'rank'], 'time' if filtered else 'index')
+        if filtered:
+            idx = index.in_years(year_start, year_end)
+            if order == 'index':
+                idx = np.sort(idx)
+            elif order == 'rank':
+                idx = index.order_by_rank(idx)
+        else:
+            idx = {'index': np.arange(len(index.nodes)), 'time': index.time_order, 'rank': index.rank_order}[order]
+        return {'total': len(idx), 'offset': offset, 'limit': limit, 'nodes': index.get_nodes(idx[offset:offset + limit])}
+
+    def node(request):
+        return index.nodes[_get_node_index(request, index)]
+
+    def neighbors(request):
+        i = _get_node_index(request, index)
+        direction = _get_choice(request, 'direction', ['out', 'in', 'both'], 'both')
+        limit = _get_int(request, 'limit', MAX_PAGE_SIZE, minimum=0, maximum=MAX_PAGE_SIZE)
+        out_idx, in_idx = index.neighbors(i, direction)
+        out_idx, in_idx = out_idx[:limit], in_idx[:limit]
+        idx = np.unique(np.concatenate([out_idx, in_idx]))
+        sources = np.concatenate([np.full(len(out_idx), i), in_idx])
+        targets = np.concatenate([out_idx, np.full(len(in_idx), i)])
+        return {
+            'id': index.labels[i],
+            'num_references': int(index.graph.out_indptr[i + 1] - index.graph.out_indptr[i]),
+            'num_citations': int(index.graph.in_indptr[i + 1] - index.graph.in_indptr[i]),
+            'nodes': index.get_nodes(idx),
+            'links': index.get_links(sources.astype(np.int64), targets.astype(np.int64)),
+        }
+
+    def top(request):
+        k = _get_int(request, 'k', 10, minimum=0, maximum=MAX_PAGE_SIZE)
+        year_start, year_end = _get_years(request)
+        per_year = _get_choice(request, 'per_year', ['0', '1'], '0') == '1'
+        return {'nodes': index.get_nodes(index.top(k, year_start, year_end, per_year=per_year))}
+
+    def subgraph(request):
+        year_start, year_end = _get_years(request)
+        k = _get_int(request, 'k', minimum=0, maximum=MAX_SUBGRAPH_NODES)
+        per_year = _get_choice(request, 'per_year', ['0', '1'], '0') == '1'
+        if k is None:
+            idx = index.in_years(year_start, year_end)
+            if len(idx) > MAX_SUBGRAPH_NODES:
+                raise web.HTTPBadRequest(text="{} nodes in this range; narrow it or give k (at most {} nodes)".format(
+                    len(idx), MAX_SUBGRAPH_NODES))
+        else:
+            idx = index.top(k, year_start, year_end, per_year=per_year)
+            if len(idx) > MAX_SUBGRAPH_NODES:
+                raise web.HTTPBadRequest(text="{} nodes; use a smaller k (at most {} nodes)".format(len(idx), MAX_SUBGRAPH_NODES))
+        sources, targets = index.links_among(idx)
+        return {'nodes': index.get_nodes(idx), 'links': index.get_links(sources, targets)}
+
+    app = web.Application()
+    app.router.add_get('/', cached(info))
+    app.router.add_get('/nodes', cached(nodes))
+    app.router.add_get('/nodes/{id}', cached(node))
+    app.router.add_get('/nodes/{id}/neighbors', cached(neighbors))
+    app.router.add_get('/top', cached(top))
+    app.router.add_get('/subgraph', cached(subgraph))
+    return app
+
+def serve(coll, host='127.0.0.1', port=8080, none_strings=False):
+    """Serve a collection until interrupted (see make_app)"""
+    from aiohttp import web
+    web.run_app(make_app(coll, none_strings=none_strings), host=host, port=port)
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Binary on-disk format for a PaperCollection, opened with memory maps.
+
+A collection is saved as a directory of .npy arrays plus a small JSON
+manifest (meta.json):
+
+  papers.<field>.npy                          numeric columns (fixed width)
+  papers.<field>.{data,offsets,missing}.npy   string columns (UTF-8 heap + offsets)
+  papers.<field>.codes.npy + .categories.*    categorical string columns
+  authors.*                                   author offsets, names, and IDs
+  graph.*                                     CitationGraph node IDs, edges, and CSR/CSC arrays
+  citations.{sources,targets}.npy             the citations as node indexes, in order and with repeats
+
+Opening it maps the arrays (numpy.load(mmap_mode='r')) without reading
+them, so the papers (a PaperTable) and the citation graph (a CitationGraph)
+are read from disk only as they are accessed.
+
+"""
+
+import os
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from .paper_collection import PaperCollection
+from .paper_table import PaperTable, StringColumn, CategoricalColumn
+from .citation_graph import CitationGraph
+
+FORMAT_NAME = 'paper_collection'
+FORMAT_VERSION = 2
+
+GRAPH_ARRAYS = ['node_ids', 'sources', 'targets', 'out_indptr', 'out_indices', 'in_indptr', 'in_indices', '_sorter']
+
+class EdgeList:
+
+    """Read-only sequence of (citing_id, cited_id) tuples, stored as indexes into an array of node IDs"""
+
+    def __init__(self, node_ids, sources, targets):
+        self.node_ids = node_ids
+        self.sources = sources
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.sources)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(zip(self.node_ids[self.sources[i]].tolist(), self.node_ids[self.targets[i]].tolist()))
+        return (self.node_ids[self.sources[i]].item(), self.node_ids[self.targets[i]].item())
+
+    def __iter__(self):
+        chunk_size = 1 << 16
+        for start in range(0, len(self), chunk_size):
+            yield from self[start:start + chunk_size]
+
+    def __repr__(self):
+        return "EdgeList({} edges)".format(len(self))
+
+def _save_array(dirpath, name, arr):
+    np.save(str(dirpath.joinpath(name + '.npy')), np.ascontiguousarray(arr), allow_pickle=False)
+
+def _save_column(dirpath, name, column):
+    """Save a PaperTable column
+    :returns: dict describing the column, for the manifest
+
+    """
+    if isinstance(column, StringColumn):
+        _save_array(dirpath, name + '.data', column.data)
+        _save_array(dirpath, name + '.offsets', column.offsets)
+        _save_array(dirpath, name + '.missing', column.missing)
+        return {'kind': 'string'}
+    if isinstance(column, CategoricalColumn):
+        _save_array(dirpath, name + '.codes', column.codes)
+        _save_column(dirpath, name + '.categories', StringColumn.from_values(list(column.categories)))
+        return {'kind': 'categorical'}
+    column = np.asarray(column)
+    if column.dtype == object:
+        # e.g., dates or timestamps: store their string form, which is what to_dict() outputs
+        values = [None if v is None or v != v else str(v) for v in column.tolist()]
+        _save_column(dirpath, name, StringColumn.from_values(values))
+        logger.debug("column {} has no fixed-width type; storing it as strings".format(name))
+        return {'kind': 'string'}
+    _save_array(dirpath, name, column)
+    return {'kind': 'numeric'}
+
+def _load_array(dirpath, name, mmap=True):
+    return np.load(str(dirpath.joinpath(name + '.npy')), mmap_mode='r' if mmap else None, allow_pickle=False)
+
+def _load_column(dirpath, name, info, mmap=True):
+    kind = info['kind']
+    if kind == 'string':
+        return StringColumn(_load_array(dirpath, name + '.data', mmap),
+                            _load_array(dirpath, name + '.offsets', mmap),
+                            _load_array(dirpath, name + '.missing', mmap))
+    if kind == 'categorical':
+        return CategoricalColumn(_load_array(dirpath, name + '.codes', mmap),
+                                 _load_column(dirpath, name + '.categories', {'kind': 'string'}, mmap))
+    if kind == 'numeric':
+        return _load_array(dirpath, name, mmap)
+    raise ValueError("unknown column kind: {}".format(kind))
+
+def _citation_indexes(coll, graph):
+    """Get the collection's citations, in order and with repeats, as (sources, targets) node indexes in graph"""
+    citations = coll.citations
+    if isinstance(citations, EdgeList) and citations.node_ids is graph.node_ids:
+        return citations.sources, citations.targets
+    if len(citations) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    idx = graph.index_of(np.asarray(list(citations)).reshape(-1, 2))
+    if (idx < 0).any():
+        raise ValueError("the collection's citation graph does not have all of its citations")
+    return idx[:, 0], idx[:, 1]
+
+def save_collection(coll, path):
+    """Save a PaperCollection in the binary format
+
+    The collection's papers are stored as a PaperTable (see
+    PaperCollection.compact()), and its citations as a CitationGraph plus
+    the citation list itself, so that repeated citations (which the graph
+    has once) are kept. The directory is written under a temporary name
+    and then renamed.
+
+    :coll: PaperCollection
+    :path: output directory (replaced if it exists)
+
+    """
+    path = Path(path)
+    table = coll.papers if isinstance(coll.papers, PaperTable) else PaperTable.from_papers(coll.papers)
+    graph = coll.citation_graph or CitationGraph.from_collection(coll.papers, coll.citations)
+
+    tmp = path.parent.joinpath(".tmp-{}-{}".format(path.name, os.getpid()))
+    shutil.rmtree(str(tmp), ignore_errors=True)
+    tmp.mkdir(parents=True)
+    columns = {}
+    for field, column in table.columns.items():
+        columns[field] = _save_column(tmp, 'papers.' + field, column)
+    _save_array(tmp, 'authors.offsets', table.author_offsets)
+    authors = {
+        'name': _save_column(tmp, 'authors.name', table.author_names),
+        'author_id': _save_column(tmp, 'authors.author_id', table.author_ids),
+    }
+    for name in GRAPH_ARRAYS:
+        _save_array(tmp, 'graph.' + name, getattr(graph, name))
+    sources, targets = _citation_indexes(coll, graph)
+    _save_array(tmp, 'citations.sources', sources)
+    _save_array(tmp, 'citations.targets', targets)
+    meta = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'description': coll.description,
+        'num_papers': len(table),
+        'num_citations': len(sources),
+        'num_edges': graph.number_of_edges(),
+        'columns': columns,
+        'authors': authors,
+    }
+    tmp.joinpath('meta.json').write_text(json.dumps(meta, indent=2, default=str))
+    if path.exists():
+        shutil.rmtree(str(path))
+    os.replace(str(tmp), str(path))
+
+def open_collection(path, mmap=True):
+    """Open a PaperCollection saved with save_collection()
+
+    :path: directory written by save_collection()
+    :mmap: memory-map the arrays (default). If False, read them into memory
+    :returns: PaperCollection with a PaperTable for papers, its CitationGraph
+              as citation_graph, and a read-only EdgeList of the saved citations as citations
+
+    """
+    path = Path(path)
+    meta = json.loads(path.joinpath('meta.json').read_text())
+    if meta.get('format') != FORMAT_NAME:
+        raise ValueError("{} is not a saved paper collection".format(path))
+    if meta.get('version', 0) > FORMAT_VERSION:
+        raise ValueError("{} was saved in format version {}; this version can read up to {}".format(
+            path, meta['version'], FORMAT_VERSION))
+    columns = {field: _load_column(path, 'papers.' + field, info, mmap) for field, info in meta['columns'].items()}
+    table = PaperTable(columns,
+                       _load_array(path, 'authors.offsets', mmap),
+                       _load_column(path, 'authors.name', meta['authors']['name'], mmap),
+                       _load_column(path, 'authors.author_id', meta['authors']['author_id'], mmap))
+    graph = CitationGraph.from_arrays(**{name.lstrip('_'): _load_array(path, 'graph.' + name, mmap) for name in GRAPH_ARRAYS})
+    if meta.get('version', 0) >= 2:
+        citations = EdgeList(graph.node_ids, _load_array(path, 'citations.sources', mmap),
+                             _load_array(path, 'citations.targets', mmap))
+    else:  # only the graph's edges, without repeated citations
+        citations = EdgeList(graph.node_ids, graph.sources, graph.targets)
+    coll = PaperCollection(papers=table, description=meta.get('description'), citations=citations)
+    coll.citation_graph = graph
+    return coll
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Summary graph for collections too big to draw: the top papers of each year plus one cluster node per year.
+
+Within each year, the k papers with the highest node_rank are kept as
+nodes. The other nodes of that year are collapsed into a cluster node
+with their count and total node_rank. Nodes with no year (papers without
+one, and IDs that are only cited or citing) form an 'unknown' cluster.
+Citations are mapped onto the summary nodes and counted, so links carry
+the number of citations between them (citations within a cluster are
+counted on the cluster node instead). Everything is computed on the
+CitationGraph arrays.
+
+"""
+
+import numpy as np
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+CLUSTER_PREFIX = 'cluster-'
+
+def _to_float(values):
+    import pandas as pd
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+def top_k_per_group(groups, scores, k):
+    """Select the k highest scores within each group (NaN scores last, ties by position)
+
+    :groups: integer group of each item
+    :scores: float array
+    :returns: (bool array of the selected items, selected items ordered by group and then by score)
+
+    """
+    n = len(groups)
+    order = np.lexsort((np.arange(n), -np.nan_to_num(scores, nan=-np.inf), groups))
+    counts = np.bincount(groups)
+    starts = np.cumsum(counts) - counts
+    sorted_groups = groups[order]
+    selected_sorted = np.arange(n) - starts[sorted_groups] < k
+    selected = np.zeros(n, dtype=bool)
+    selected[order[selected_sorted]] = True
+    return selected, order[selected_sorted]
+
+class GraphSummary:
+
+    """Summary nodes (kept papers and cluster nodes) and weighted links between them"""
+
+    def __init__(self, nodes, sources, targets, weights):
+        """
+        nodes: list of node dicts (kept papers, then clusters), each with an 'id'
+        sources, targets: arrays of indexes into nodes
+        weights: array with the number of citations of each link
+        """
+        self.nodes = nodes
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+
+    def __repr__(self):
+        return "GraphSummary({} nodes, {} links)".format(self.number_of_nodes(), self.number_of_edges())
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self.sources)
+
+    def iter_nodes(self):
+        return iter(self.nodes)
+
+    def iter_links(self):
+        labels = [node['id'] for node in self.nodes]
+        for s, t, w in zip(self.sources.tolist(), self.targets.tolist(), self.weights.tolist()):
+            yield {'source': labels[s], 'target': labels[t], 'weight': w}
+
+def summarize(coll, k=10, none_strings=True):
+    """Summarize a collection's citation graph
+
+    :coll: PaperCollection
+    :k: number of papers to keep in each year
+    :none_strings: see PaperCollection.to_records()
+    :returns: GraphSummary. Paper nodes have the papers' records (with x and y if
+              the collection has a layout). Cluster nodes have 'id' (e.g.,
+              'cluster-1995'), 'cluster': True, 'year', 'count' (number of
+              nodes), 'node_rank' (their total), 'internal_links', and the
+              mean x and y of their nodes if the collection has a layout
+
+    """
+    from .paper_collection import PaperCollection
+    cg = coll.citation_graph or coll.construct_citation_graph()
+    n = cg.number_of_nodes()
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return GraphSummary([], empty, empty, empty)
+    source = coll._get_node_papers(cg)
+    has_paper = source >= 0
+    columns = coll.get_columns(['year', 'node_rank'])
+    years = np.full(n, np.nan)
+    ranks = np.full(n, np.nan)
+    years[has_paper] = _to_float(columns['year'])[source[has_paper]]
+    ranks[has_paper] = _to_float(columns['node_rank'])[source[has_paper]]
+
+    # one group per year, and a last one for nodes with no year
+    group_years, groups = np.unique(np.where(np.isnan(years), np.inf, years), return_inverse=True)
+    groups = groups.ravel()
+    keep, kept = top_k_per_group(groups, np.where(has_paper, ranks, np.nan), k)
+    # IDs that are only cited or citing have no attributes to show
+    keep &= has_paper
+    kept = kept[has_paper[kept]]
+
+    # summary node of each graph node: kept nodes first, then one cluster per group with nodes left
+    rest_groups = groups[~keep]
+    cluster_groups = np.unique(rest_groups)
+    cluster_of_group = np.full(len(group_years), -1, dtype=np.int64)
+    cluster_of_group[cluster_groups] = np.arange(len(cluster_groups))
+    summary_index = np.empty(n, dtype=np.int64)
+    summary_index[kept] = np.arange(len(kept))
+    summary_index[~keep] = len(kept) + cluster_of_group[rest_groups]
+    num_summary = len(kept) + len(cluster_groups)
+
+    # citations between summary nodes, counted
+    s, t = summary_index[cg.sources], summary_index[cg.targets]
+    internal = s == t
+    internal_links = np.bincount(s[internal] - len(kept), minlength=len(cluster_groups)) if len(cluster_groups) else np.zeros(0, dtype=np.int64)
+    pairs, weights = np.unique(s[~internal] * num_summary + t[~internal], return_counts=True)
+
+    kept_papers = [coll.papers[i] for i in source[kept].tolist()]
+    nodes = PaperCollection(papers=kept_papers).to_records(none_strings=none_strings)
+    for node, node_id in zip(nodes, cg.node_ids[kept].tolist()):
+        node['id'] = str(node_id)
+    if coll.layout is not None:
+        xs, ys = coll.layout.get_positions(cg.node_ids[kept])
+        for node, x, y in zip(nodes, xs, ys):
+            node['x'], node['y'] = x, y
+
+    rest = np.flatnonzero(~keep)
+    rest_clusters = cluster_of_group[rest_groups]
+    counts = np.bincount(rest_clusters, minlength=len(cluster_groups))
+    rank_totals = np.bincount(rest_clusters, weights=np.nan_to_num(ranks[rest]), minlength=len(cluster_groups))
+    if coll.layout is not None:
+        from .layout import POSITION_DECIMALS
+        mean_x = np.round(np.bincount(rest_clusters, weights=coll.layout.x[rest], minlength=len(cluster_groups)) / counts, POSITION_DECIMALS)
+        mean_y = np.round(np.bincount(rest_clusters, weights=coll.layout.y[rest], minlength=len(cluster_groups)) / counts, POSITION_DECIMALS)
+    for c, g in enumerate(cluster_groups.tolist()):
+        year = None if np.isinf(group_years[g]) else int(group_years[g])
+        node = {
+            'id': CLUSTER_PREFIX + ('unknown' if year is None else str(year)),
+            'cluster': True,
+            'year': year,
+            'count': int(counts[c]),
+            'node_rank': float(rank_totals[c]),
+            'internal_links': int(internal_links[c]),
+        }
+        if coll.layout is not None:
+            node['x'], node['y'] = float(mean_x[c]), float(mean_y[c])
+        nodes.append(node)
+    logger.debug("summarized {} nodes and {} links as {} papers, {} clusters, and {} links".format(
+        n, cg.number_of_edges(), len(kept), len(cluster_groups), len(pairs)))
+    return GraphSummary(nodes, pairs // num_summary, pairs % num_summary, weights)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Partitioned timeline export: node-link JSON split into one chunk file per year range.
+
+The nodes of the citation graph are ordered once by year and publication
+date and cut into chunks of years_per_chunk years. Each chunk file is a
+node-link JSON document with that chunk's nodes and the links from them
+(a link is stored with its citing paper). Nodes with no year (papers
+without one, and IDs that are only cited or citing) go in a last chunk,
+'unknown'. A manifest (manifest.json) lists the chunks in time order with
+their counts and the number of links between each pair of chunks, so
+that a frontend can load the chunks incrementally.
+
+A link whose cited paper is in another chunk has that chunk's ID as
+'target_chunk', so a frontend can tell which chunk to load for it. Links
+into a chunk from later chunks are only counted (links_from in the
+manifest): they are in the files of the chunks they come from.
+
+"""
+
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+FORMAT_NAME = 'paper_collection.timeline'
+FORMAT_VERSION = 2
+UNKNOWN_CHUNK = 'unknown'
+
+def chunk_id(year_start, year_end):
+    """Name of the chunk for years year_start to year_end (inclusive), e.g. '1990' or '1990-1994'"""
+    if year_start is None:
+        return UNKNOWN_CHUNK
+    if year_start == year_end:
+        return str(year_start)
+    return "{}-{}".format(year_start, year_end)
+
+def get_timeline_order(years, pub_dates):
+    """Order nodes by year, then publication date, then node index; nodes with no year go last
+
+    :years: float array aligned with the nodes (NaN where missing)
+    :pub_dates: list of publication date strings aligned with the nodes (None where missing)
+    :returns: array of node indexes
+
+    """
+    import pandas as pd
+    df = pd.DataFrame({'year': years, 'pub_date': pd.Series(pub_dates, dtype=object), 'node': np.arange(len(years))})
+    return df.sort_values(['year', 'pub_date', 'node'], kind='mergesort', na_position='last')['node'].to_numpy()
+
+def _read_chunk_files(manifest_fpath):
+    """Names of the chunk files in a manifest, or an empty set if there is none or it can't be read"""
+    try:
+        manifest = json.loads(Path(manifest_fpath).read_text())
+        return set(chunk['file'] for chunk in manifest.get('chunks', []))
+    except FileNotFoundError:
+        return set()
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        logger.warning("ignoring unreadable timeline manifest {}: {}".format(manifest_fpath, e))
+        return set()
+
+def _write_text_atomic(fpath, write, compress=None):
+    """Write a file through a temporary file and a rename, so readers never see a partial file"""
+    from .serialize import open_output
+    fpath = Path(fpath)
+    if compress is None:
+        compress = fpath.suffix == '.gz'
+    tmp = fpath.with_name('.{}.tmp'.format(fpath.name))
+    with open_output(tmp, compress=compress) as outf:
+        result = write(outf)
+    os.replace(str(tmp), str(fpath))
+    return result
+
+def write_timeline(coll, outdir, years_per_chunk=1, chunks=None, compress=False, serializer=None, none_strings=True):
+    """Write a collection's graph as year-range chunk files plus a manifest
+
+    Together the chunks have the same node and link records as
+    PaperCollection.write_graph() (as with networkx, a repeated paper ID
+    is one node, with the attributes of its last paper).
+
+    :coll: PaperCollection
+    :outdir: output directory (created if needed)
+    :years_per_chunk: number of years in each chunk. Chunks start at multiples of it (e.g., 1990-1994)
+    :chunks: IDs of the chunks to write (e.g., to rebuild one year after a change). Default: all of
+             them, and chunk files of an earlier export that are no longer in the manifest are removed.
+             The manifest is always rewritten
+    :compress: gzip the chunk files (.json.gz)
+    :serializer: see serialize.get_serializer
+    :none_strings: see PaperCollection.to_records()
+    :returns: manifest (dict)
+
+    """
+    import pandas as pd
+    from .serialize import write_node_link_records, get_serializer
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    _, dumps = get_serializer(serializer)
+
+    cg = coll.citation_graph or coll.construct_citation_graph()
+    n = cg.number_of_nodes()
+    records = coll.to_records(none_strings=none_strings)
+    # node -> position of its (last) paper, or -1 for IDs that are only cited or citing
+    source = coll._get_node_papers(cg)
+    has_paper = source >= 0
+    years = np.full(n, np.nan)
+    years[has_paper] = pd.to_numeric(pd.Series([records[i]['year'] for i in source[has_paper].tolist()], dtype=object),
+                                     errors='coerce').to_numpy(dtype=np.float64)
+    pub_dates = [None] * n
+    for node, i in zip(np.flatnonzero(has_paper).tolist(), source[has_paper].tolist()):
+        pub_date = records[i]['pub_date']
+        pub_dates[node] = None if pub_date in (None, 'None') else pub_date
+
+    # one pass over the nodes in time order: cut it where the year bucket changes
+    order = get_timeline_order(years, pub_dates)
+    buckets = np.floor(years[order] / years_per_chunk) * years_per_chunk
+    buckets[np.isnan(buckets)] = np.inf
+    boundaries = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]]) if len(order) else np.zeros(0, dtype=np.int64)
+    chunk_ranges = list(zip(boundaries.tolist(), np.r_[boundaries[1:], len(order)].tolist()))
+    chunk_of_node = np.empty(n, dtype=np.int64)
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    chunk_of_node[order] = np.repeat(np.arange(len(chunk_ranges)), [b - a for a, b in chunk_ranges])
+
+    # links grouped by the time order of their citing node, in citation order within each node
+    edge_order = np.argsort(rank[cg.sources], kind='stable')
+    sources, targets = cg.sources[edge_order], cg.targets[edge_order]
+    source_chunks, target_chunks = chunk_of_node[sources], chunk_of_node[targets]
+    edge_bounds = np.searchsorted(source_chunks, np.arange(len(chunk_ranges) + 1))
+    num_chunks = len(chunk_ranges)
+    pair_counts = np.bincount(source_chunks * num_chunks + target_chunks, minlength=num_chunks * num_chunks) \
+        .reshape(num_chunks, num_chunks)
+
+    labels = [str(x) for x in cg.node_ids.tolist()]
+    positions = coll.layout.node_positions() if coll.layout is not None else None
+    suffix = '.json.gz' if compress else '.json'
+    manifest_chunks = []
+    for c, (a, b) in enumerate(chunk_ranges):
+        bucket = buckets[a]
+        if np.isinf(bucket):
+            year_start = year_end = None
+        else:
+            year_start, year_end = int(bucket), int(bucket) + years_per_chunk - 1
+        manifest_chunks.append({
+            'id': chunk_id(year_start, year_end),
+            'file': chunk_id(year_start, year_end) + suffix,
+            'year_start': year_start,
+            'year_end': year_end,
+            'num_nodes': b - a,
+            'num_links': int(edge_bounds[c + 1] - edge_bounds[c]),
+        })
+    ids = [chunk['id'] for chunk in manifest_chunks]
+    for c, chunk in enumerate(manifest_chunks):
+        chunk['links_to'] = {ids[d]: int(pair_counts[c, d]) for d in np.flatnonzero(pair_counts[c]).tolist() if d != c}
+        chunk['links_from'] = {ids[d]: int(pair_counts[d, c]) for d in np.flatnonzero(pair_counts[:, c]).tolist() if d != c}
+
+    def iter_nodes(nodes):
+        for node in nodes:
+            i = source[node]
+            if i < 0:
+                if positions is not None and labels[node] in positions:
+                    x, y = positions[labels[node]]
+                    yield {'id': labels[node], 'x': x, 'y': y}
+                else:
+                    yield {'id': labels[node]}
+            else:
+                record = dict(records[i])
+                record['id'] = labels[node]
+                yield record
+
+    def iter_links(c, start, stop):
+        for s, t, d in zip(sources[start:stop].tolist(), targets[start:stop].tolist(), target_chunks[start:stop].tolist()):
+            if d == c:
+                yield {'source': labels[s], 'target': labels[t]}
+            else:
+                yield {'source': labels[s], 'target': labels[t], 'target_chunk': ids[d]}
+
+    selected = set(ids) if chunks is None else set(chunks)
+    unknown = selected - set(ids)
+    if unknown:
+        raise ValueError("no such chunks: {}".format(sorted(unknown)))
+    for c, (a, b) in enumerate(chunk_ranges):
+        chunk = manifest_chunks[c]
+        if chunk['id'] not in selected:
+            continue
+        graph = {'chunk': chunk['id'], 'year_start': chunk['year_start'], 'year_end': chunk['year_end']}
+        _write_text_atomic(outdir.joinpath(chunk['file']),
+                           lambda outf: write_node_link_records(iter_nodes(order[a:b].tolist()),
+                                                                iter_links(c, edge_bounds[c], edge_bounds[c + 1]),
+                                                                outf, dumps=dumps, graph=graph),
+                           compress=compress)
+
+    manifest_fpath = outdir.joinpath(MANIFEST_NAME)
+    if chunks is None:
+        for fname in _read_chunk_files(manifest_fpath) - set(chunk['file'] for chunk in manifest_chunks):
+            try:
+                outdir.joinpath(fname).unlink()
+            except FileNotFoundError:
+                pass
+    manifest = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'description': coll.description,
+        'years_per_chunk': years_per_chunk,
+        'num_nodes': n,
+        'num_links': cg.number_of_edges(),
+        'chunks': manifest_chunks,
+    }
+    _write_text_atomic(manifest_fpath, lambda outf: outf.write(json.dumps(manifest, indent=2, default=str)), compress=False)
+    logger.debug("wrote {} timeline chunks ({} nodes, {} links) to {}".format(len(manifest_chunks), n, cg.number_of_edges(), outdir))
+    return manifest
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """get many collections from MAG 2019 dataset with one extraction, using spark (or pyarrow), then write their graphs in parallel"""
+
+import sys, os, time, json
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from config import Config
+from paper_collection.batch import BatchDataGetterMAG2019
+
+def get_paper_ids(fpath):
+    fpath = Path(fpath)
+    paper_ids = fpath.read_text().split('\n')
+    return paper_ids
+
+def main(args):
+    logging.getLogger('py4j').setLevel(logging.WARNING)
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    seed_sets = {}
+    for fpath in args.paper_ids:
+        name = Path(fpath).stem
+        if name in seed_sets:
+            raise ValueError("more than one seed file named {}".format(name))
+        seed_sets[name] = get_paper_ids(fpath)
+    ext = '.json.gz' if args.compress else '.json'
+    outfpaths = {name: outdir.joinpath(name + ext) for name in seed_sets}
+
+    config = Config()
+    try:
+        datagetter = BatchDataGetterMAG2019(config, seed_sets, method=args.method,
+                                            papers=args.papers,
+                                            citations=args.citations,
+                                            paper_authors=args.paper_authors,
+                                            cache_dir=args.cache_dir)
+        if datagetter.from_cache:
+            logger.info("loaded extracted data from cache {}".format(args.cache_dir))
+    finally:
+        # the extraction is done; don't hold on to the JVM while building collections
+        config.teardown()
+    results = datagetter.write_graphs(outfpaths, processes=args.processes)
+    datagetter.metrics.log(logger, collection='all')
+    for r in results:
+        logger.info("{}: {} papers, {} citations -> {}".format(r['name'], r['num_papers'], r['num_citations'], r['outfpath']))
+        logger.info("metrics {}".format(json.dumps({'collection': r['name'], 'stages': r['metrics']}, sort_keys=True)))
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("papers", help="path to MAG papers parquet data")
+    parser.add_argument("citations", help="path to MAG citations parquet data")
+    parser.add_argument("paper_authors", help="path to MAG paper_authors parquet data")
+    parser.add_argument("outdir", help="directory for the output files (one JSON file per seed file, named after it)")
+    parser.add_argument("paper_ids", nargs='+', help="paths to files with newline separated paper ids (one per collection)")
+    parser.add_argument("--method", choices=['spark', 'arrow'], default='spark', help="engine for reading the MAG data: spark, or arrow (pyarrow, no JVM) (default: spark)")
+    parser.add_argument("--processes", type=int, help="number of processes for building collections and writing graphs (default: number of CPUs)")
+    parser.add_argument("--compress", action='store_true', help="gzip the output files")
+    parser.add_argument("--cache-dir", help="directory for caching extracted data between runs with the same seed papers and MAG files")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
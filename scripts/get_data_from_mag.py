@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-DESCRIPTION = """get data from MAG 2019 dataset using spark"""
+DESCRIPTION = """get data from MAG 2019 dataset using spark (or pyarrow, for small collections)"""
 
 import sys, os, time
 from pathlib import Path
@@ -27,21 +27,41 @@ def get_paper_ids(fpath):
 def main(args):
     logging.getLogger('py4j').setLevel(logging.WARNING)
     config = Config()
-    spark = config.spark
     paper_ids = get_paper_ids(args.paper_ids)
     try:
-        datagetter = DataGetterMAG2019(config, paper_ids, description="MSRC seed papers", method='spark',
+        datagetter = DataGetterMAG2019(config, paper_ids, description="MSRC seed papers", method=args.method,
                                         papers=args.papers,
                                         citations=args.citations,
-                                        paper_authors=args.paper_authors)
+                                        paper_authors=args.paper_authors,
+                                        cache_dir=args.cache_dir,
+                                        hops=args.hops,
+                                        max_per_node=args.max_per_node)
+        if datagetter.from_cache:
+            logger.info("loaded extracted data from cache {}".format(args.cache_dir))
         coll = datagetter.collection
+        if args.layout:
+            logger.debug("computing time-directed layout")
+            coll.compute_layout(cache_dir=args.cache_dir)
         logger.debug("constructing graph")
         G = coll.construct_graph()
         logger.debug("writing graph with {} nodes and {} edges to {}".format(G.number_of_nodes(), G.number_of_edges(), args.output))
         coll.write_graph(args.output)
+        if args.summary_output:
+            logger.debug("writing summary graph to {}".format(args.summary_output))
+            coll.write_summary(args.summary_output, k=args.summary_k)
+        if args.timeline_output:
+            logger.debug("writing timeline chunks to {}".format(args.timeline_output))
+            coll.write_timeline(args.timeline_output, years_per_chunk=args.years_per_chunk)
+        if args.coauthorship_output:
+            logger.debug("writing coauthorship graph to {}".format(args.coauthorship_output))
+            coll.write_coauthorship_graph(args.coauthorship_output, df_authors=datagetter.df_paper_authors,
+                                          column_map=datagetter.column_map, max_authors=args.max_authors)
 
     finally:
         config.teardown()
+    datagetter.metrics.log(logger, output=args.output)
+    if args.prometheus_file:
+        datagetter.metrics.write_prometheus(args.prometheus_file, output=args.output)
 
 if __name__ == "__main__":
     total_start = timer()
@@ -58,6 +78,18 @@ if __name__ == "__main__":
     parser.add_argument("citations", help="path to MAG citations parquet data")
     parser.add_argument("paper_authors", help="path to MAG paper_authors parquet data")
     parser.add_argument("output", help="path to output file (JSON)")
+    parser.add_argument("--method", choices=['spark', 'arrow'], default='spark', help="engine for reading the MAG data: spark, or arrow (pyarrow, no JVM) (default: spark)")
+    parser.add_argument("--hops", type=int, default=0, help="expand the seed papers to their k-hop citation neighborhood (default: 0, no expansion)")
+    parser.add_argument("--max-per-node", type=int, help="when expanding, keep at most this many neighbors per paper, by node rank (flow)")
+    parser.add_argument("--cache-dir", help="directory for caching extracted data between runs with the same seed papers and MAG files")
+    parser.add_argument("--layout", action='store_true', help="compute a time-directed layout and include node positions (x, y) in the output (cached in --cache-dir, if given)")
+    parser.add_argument("--summary-output", help="also write a summary graph (the top papers of each year, and the rest collapsed into one node per year) to this file (JSON)")
+    parser.add_argument("--summary-k", type=int, default=10, help="number of papers per year to keep in the summary graph, by node rank (default: 10)")
+    parser.add_argument("--timeline-output", help="also write the graph as one JSON file per year range, with a manifest, to this directory")
+    parser.add_argument("--years-per-chunk", type=int, default=1, help="number of years in each timeline chunk (default: 1)")
+    parser.add_argument("--coauthorship-output", help="also write the authors' coauthorship graph to this file (JSON)")
+    parser.add_argument("--max-authors", type=int, default=100, help="in the coauthorship graph, papers with more authors than this add no edges (default: 100)")
+    parser.add_argument("--prometheus-file", help="write per-stage metrics to this file in the Prometheus text format (e.g., for the node_exporter textfile collector)")
     parser.add_argument("--debug", action='store_true', help="output debugging info")
     global args
     args = parser.parse_args()
@@ -21,34 +21,22 @@ from paper_collection import PaperCollection, Paper
 import pandas as pd
 import numpy as np
 
-def get_authors_by_paper(df_authors):
-    """Get a dictionary mapping paper_id to author data
-
-    """
-    author_data = {}
-    for paper_id, group in df_authors.groupby('PaperId'):
-        group = group.sort_values('AuthorSequenceNumber')
-        this_authors = []
-        for _, row in group.iterrows():
-            this_authors.append({'name': row.OriginalAuthor, 'author_id': row.AuthorId})
-        author_data[paper_id] = this_authors
-    return author_data
-
-def load_paper(prow, author_data=None):
-    paper_id = prow.PaperId
-    p = Paper(dataset='mag',
-            dataset_version='mag-2019-11-22',
-            paper_id=paper_id,
-            title=prow.PaperTitle,
-            display_title=prow.OriginalTitle,
-            doi=prow.Doi,
-            pub_date=prow.Date,
-            year=prow.Year,
-            venue=prow.OriginalVenue,
-            node_rank=prow.flow)
-    if author_data is not None:
-        p.load_authors(author_data[paper_id])
-    return p
+COLUMN_MAP = {
+    'paper_id': 'PaperId',
+    'title': 'PaperTitle',
+    'display_title': 'OriginalTitle',
+    'doi': 'Doi',
+    'pub_date': 'Date',
+    'year': 'Year',
+    'venue': 'OriginalVenue',
+    'node_rank': 'flow',
+    'citing': 'PaperId',
+    'cited': 'PaperReferenceId',
+    'author_paper_id': 'PaperId',
+    'author_seq': 'AuthorSequenceNumber',
+    'author_name': 'OriginalAuthor',
+    'author_id': 'AuthorId',
+}
 
 def main(args):
     df_papers = pd.read_csv(args.papers, sep='\t')
@@ -56,15 +44,15 @@ def main(args):
     df_citations = pd.read_csv(args.citations, sep='\t')
     if args.authors:
         df_authors = pd.read_csv(args.authors, sep='\t')
-        author_data = get_authors_by_paper(df_authors)
     else:
-        author_data = None
-    coll = PaperCollection(description="Paper Collection")
-    for _, prow in df_papers.iterrows():
-        p = load_paper(prow, author_data=author_data)
-        coll.papers.append(p)
-    for _, row in df_citations.iterrows():
-        coll.citations.append((row.PaperId, row.PaperReferenceId))
+        df_authors = None
+    coll = PaperCollection.from_frames(df_papers,
+                                       df_citations=df_citations,
+                                       df_authors=df_authors,
+                                       column_map=COLUMN_MAP,
+                                       description="Paper Collection",
+                                       dataset='mag',
+                                       dataset_version='mag-2019-11-22')
     logger.debug("constructing graph")
     G = coll.construct_graph()
     logger.debug("writing graph with {} nodes and {} edges to {}".format(G.number_of_nodes(), G.number_of_edges(), args.output))
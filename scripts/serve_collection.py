@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+DESCRIPTION = """Serve a collection saved with PaperCollection.save() over HTTP (see paper_collection/server.py). Requires aiohttp (the "server" extra)"""
+
+import sys, os, time
+from pathlib import Path
+from datetime import datetime
+from timeit import default_timer as timer
+try:
+    from humanfriendly import format_timespan
+except ImportError:
+    def format_timespan(seconds):
+        return "{:.2f} seconds".format(seconds)
+
+import logging
+root_logger = logging.getLogger()
+logger = root_logger.getChild(__name__)
+
+from paper_collection import PaperCollection
+from paper_collection.server import CollectionIndex, make_app
+
+def main(args):
+    from aiohttp import web
+    start = timer()
+    coll = PaperCollection.open(args.collection, mmap=not args.no_mmap)
+    if args.layout:
+        logger.debug("computing layout")
+        coll.compute_layout(cache_dir=args.cache_dir)
+    index = CollectionIndex(coll)
+    logger.info("loaded {} in {}".format(index, format_timespan(timer() - start)))
+    web.run_app(make_app(index), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    total_start = timer()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt="%(asctime)s %(name)s.%(lineno)d %(levelname)s : %(message)s", datefmt="%H:%M:%S"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(logging.INFO)
+    logger.info(" ".join(sys.argv))
+    logger.info( '{:%Y-%m-%d %H:%M:%S}'.format(datetime.now()) )
+    import argparse
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("collection", help="path to a collection directory written by PaperCollection.save()")
+    parser.add_argument("--host", default='127.0.0.1', help="host to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--layout", action='store_true', help="compute a layout, so that nodes have x and y")
+    parser.add_argument("--cache-dir", help="directory to cache the layout in")
+    parser.add_argument("--no-mmap", action='store_true', help="read the collection into memory instead of memory-mapping it")
+    parser.add_argument("--debug", action='store_true', help="output debugging info")
+    global args
+    args = parser.parse_args()
+    if args.debug:
+        root_logger.setLevel(logging.DEBUG)
+        logger.debug('debug mode is on')
+    main(args)
+    total_end = timer()
+    logger.info('all finished. total time: {}'.format(format_timespan(total_end-total_start)))
@@ -12,6 +12,14 @@ with open('HISTORY.rst') as history_file:
 
 requirements = [ ]
 
+# optional dependencies, by feature
+extras_requirements = {
+    'server': ['aiohttp>=3.8'],  # paper_collection.server
+    'arrow': ['pyarrow>=1.0'],  # DataGetterMAG2019(method='arrow')
+    'spark': ['pyspark'],  # DataGetterMAG2019(method='spark')
+    'speedups': ['scipy', 'orjson'],  # sparse ranking and layout, faster JSON output
+}
+
 setup_requirements = [ ]
 
 test_requirements = [ ]
@@ -19,20 +27,19 @@ test_requirements = [ ]
 setup(
     author="Jason Portenoy",
     author_email='jason.portenoy@gmail.com',
-    python_requires='>=3.5',
+    python_requires='>=3.7',
     classifiers=[
         'Development Status :: 2 - Pre-Alpha',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Natural Language :: English',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
     ],
     description="Work with metadata for collections of scholarly articles, allowing for the use of different data sets such as Web of Science and Microsoft Academic",
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
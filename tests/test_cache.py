@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+
+"""Tests for `paper_collection.cache`."""
+
+
+import os
+import unittest
+import tempfile
+from pathlib import Path
+
+from paper_collection.cache import FrameCache, make_key, fingerprint_path
+
+import pandas as pd
+import numpy as np
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestFrameCache(unittest.TestCase):
+    """Tests for the on-disk dataframe cache"""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.cache_dir = Path(self.tmpdir.name).joinpath('cache')
+        self.df = pd.DataFrame({'PaperId': np.arange(1000), 'Title': ['title {}'.format(i) for i in range(1000)]})
+
+    def tearDown(self):
+        """Tear down test fixtures, if any."""
+        self.tmpdir.cleanup()
+
+    def test_000_roundtrip(self):
+        """Stored dataframes load back the same"""
+        cache = FrameCache(self.cache_dir)
+        key = make_key(seed_ids=[1, 2, 3])
+        assert cache.get(key) is None
+        cache.put(key, {'papers': self.df})
+        assert key in cache
+        frames = cache.get(key)
+        pd.testing.assert_frame_equal(frames['papers'], self.df)
+
+    def test_001_keys(self):
+        """Keys change with the seed IDs and the input files"""
+        fpath = Path(self.tmpdir.name).joinpath('data.tsv')
+        fpath.write_text('a\n')
+        key = make_key(seed_ids=[1, 2], inputs=fingerprint_path(fpath))
+        assert key == make_key(seed_ids=[1, 2], inputs=fingerprint_path(fpath))
+        assert key != make_key(seed_ids=[1, 3], inputs=fingerprint_path(fpath))
+        fpath.write_text('ab\n')
+        assert key != make_key(seed_ids=[1, 2], inputs=fingerprint_path(fpath))
+
+    def test_002_evict(self):
+        """Least recently used entries are evicted when the cache is too big"""
+        cache = FrameCache(self.cache_dir)
+        for i in range(3):
+            cache.put(str(i), {'papers': self.df})
+            os.utime(str(cache.entry_dir(str(i))), ns=(i * 10**9, i * 10**9))
+        entry_size = sum(p.stat().st_size for p in cache.entry_dir('0').iterdir())
+        cache.get('0')  # now the most recently used
+        cache.max_bytes = entry_size * 2
+        cache.put('3', {'papers': self.df})
+        assert sorted(p.name for p in cache.entries()) == ['0', '3']
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+
+"""Tests for `paper_collection.data_getter`."""
+
+
+import unittest
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from paper_collection.data_getter import DataGetterMAG2019
+from paper_collection.batch import BatchDataGetterMAG2019
+
+import pandas as pd
+
+try:
+    import pyspark
+except ImportError:
+    pyspark = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+PAPERS_FPATH = 'tests/jw_papers_mag2019.tsv'
+CITATIONS_FPATH = 'tests/jw_citations_mag2019.tsv'
+PAPER_AUTHORS_FPATH = 'tests/jw_PaperAuthorAffiliations_mag2019.tsv'
+
+
+def expected_neighborhood(df_papers, df_citations, seeds, hops, max_per_node=None):
+    """Reference k-hop expansion, one frontier paper at a time"""
+    flow = dict(zip(df_papers['PaperId'], df_papers['flow']))
+    visited = set(seeds)
+    frontier = set(seeds)
+    for _ in range(hops):
+        new = set()
+        for source in frontier:
+            neighbors = set(df_citations.loc[df_citations['PaperId'] == source, 'PaperReferenceId'])
+            neighbors |= set(df_citations.loc[df_citations['PaperReferenceId'] == source, 'PaperId'])
+            neighbors = sorted(neighbors - visited, key=lambda x: (-flow.get(x, -1), x))
+            if max_per_node:
+                neighbors = neighbors[:max_per_node]
+            new.update(neighbors)
+        frontier = new - visited
+        visited |= frontier
+    return sorted(visited)
+
+
+@unittest.skipIf(pyspark is None, "pyspark is not installed")
+class TestDataGetterSpark(unittest.TestCase):
+    """Extract a collection with a local-mode SparkSession from the TSV fixtures"""
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.spark = pyspark.sql.SparkSession.builder \
+                .master('local[1]') \
+                .appName('test_data_getter') \
+                .config('spark.ui.enabled', 'false') \
+                .getOrCreate()
+        except Exception as e:  # e.g., no Java runtime
+            raise unittest.SkipTest("could not start spark: {}".format(e))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.spark.stop()
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.df_papers = pd.read_csv(PAPERS_FPATH, sep='\t')
+        self.df_papers.drop_duplicates(subset=['PaperId'], inplace=True)
+        self.df_citations = pd.read_csv(CITATIONS_FPATH, sep='\t')
+        self.df_authors = pd.read_csv(PAPER_AUTHORS_FPATH, sep='\t')
+        self.config = SimpleNamespace(spark=self.spark)
+
+    def read_tsv(self, fpath):
+        sdf = self.spark.read.csv(fpath, sep='\t', header=True, inferSchema=True)
+        return sdf.dropDuplicates(['PaperId']) if fpath == PAPERS_FPATH else sdf
+
+    def get_datagetter(self, paper_ids):
+        return DataGetterMAG2019(self.config, paper_ids, description="test", method='spark',
+                                 papers=self.read_tsv(PAPERS_FPATH),
+                                 citations=self.read_tsv(CITATIONS_FPATH),
+                                 paper_authors=self.read_tsv(PAPER_AUTHORS_FPATH))
+
+    def test_000_all_papers(self):
+        """All fixture papers as seeds (as strings, with a blank line, like a seed file)"""
+        paper_ids = [str(x) for x in self.df_papers['PaperId']] + ['']
+        datagetter = self.get_datagetter(paper_ids)
+        coll = datagetter.collection
+        assert set(p.paper_id for p in coll.papers) == set(self.df_papers['PaperId'])
+        assert len(coll.citations) == len(self.df_citations)
+        assert len(datagetter.df_paper_authors) == len(self.df_authors)
+        assert 'OriginalAffiliation' not in datagetter.df_paper_authors.columns
+        metrics = datagetter.metrics.to_dict()
+        assert metrics['get_papers']['rows'] == len(self.df_papers)
+        assert metrics['get_papers']['spark_jobs'] > 0
+        assert metrics['get_papers']['spark_job_seconds'] >= 0
+        assert self.spark.sparkContext.getLocalProperty('spark.jobGroup.id') is None
+
+    def test_001_subset(self):
+        """Citations are kept only when both ends are seeds"""
+        paper_ids = self.df_papers['PaperId'].iloc[:40].tolist()
+        datagetter = self.get_datagetter(paper_ids)
+        coll = datagetter.collection
+        expected = self.df_citations[self.df_citations['PaperId'].isin(paper_ids)
+                                     & self.df_citations['PaperReferenceId'].isin(paper_ids)]
+        assert len(coll) == 40
+        assert sorted(coll.citations) == sorted(zip(expected['PaperId'], expected['PaperReferenceId']))
+        expected_authors = self.df_authors[self.df_authors['PaperId'].isin(paper_ids)]
+        assert len(datagetter.df_paper_authors) == len(expected_authors)
+
+    def test_002_arrow(self):
+        """Arrow and non-Arrow toPandas() give the same collection"""
+        paper_ids = self.df_papers['PaperId'].tolist()
+        sdf_papers = self.read_tsv(PAPERS_FPATH)
+        sdf_papers = sdf_papers.withColumn('Date', sdf_papers['Date'].cast('date'))
+        colls = []
+        for arrow in [True, False]:
+            datagetter = DataGetterMAG2019(self.config, paper_ids, description="test", method='spark',
+                                           papers=sdf_papers,
+                                           citations=self.read_tsv(CITATIONS_FPATH),
+                                           paper_authors=self.read_tsv(PAPER_AUTHORS_FPATH),
+                                           arrow=arrow)
+            assert datagetter.arrow is arrow
+            colls.append(datagetter.collection)
+        papers_arrow = sorted(colls[0].papers, key=lambda p: p.paper_id)
+        papers_no_arrow = sorted(colls[1].papers, key=lambda p: p.paper_id)
+        assert [p.to_dict() for p in papers_arrow] == [p.to_dict() for p in papers_no_arrow]
+        paper = next(p for p in papers_arrow if p.paper_id == 1993001003)
+        assert paper.to_dict()['pub_date'] == '2010-05-01'
+        assert sorted(colls[0].citations) == sorted(colls[1].citations)
+
+    def test_003_update(self):
+        """Incremental update matches a fresh extraction"""
+        paper_ids = self.df_papers['PaperId'].tolist()
+        datagetter = self.get_datagetter(paper_ids[:40])
+        datagetter.update(paper_ids[5:60])
+        coll = datagetter.collection
+        expected = self.get_datagetter(paper_ids[5:60]).collection
+        assert sorted(p.paper_id for p in coll.papers) == sorted(p.paper_id for p in expected.papers)
+        assert sorted(coll.citations) == sorted(expected.citations)
+
+    def test_004_expand(self):
+        """k-hop expansion adds references and citing papers"""
+        seeds = self.df_papers['PaperId'].iloc[:3].tolist()
+        for hops, max_per_node in [(1, None), (2, None), (2, 2)]:
+            datagetter = DataGetterMAG2019(self.config, seeds, method='spark',
+                                           papers=self.read_tsv(PAPERS_FPATH),
+                                           citations=self.read_tsv(CITATIONS_FPATH),
+                                           paper_authors=self.read_tsv(PAPER_AUTHORS_FPATH),
+                                           hops=hops, max_per_node=max_per_node)
+            expected = expected_neighborhood(self.df_papers, self.df_citations, seeds, hops, max_per_node)
+            assert datagetter.seed_ids == expected
+            assert sorted(p.paper_id for p in datagetter.collection.papers) == expected
+
+
+    def test_005_batch(self):
+        """One batch extraction gives the same collections as separate extractions"""
+        paper_ids = self.df_papers['PaperId'].tolist()
+        seed_sets = {'a': paper_ids[:40], 'b': paper_ids[20:70], 'c': paper_ids[60:]}
+        batch = BatchDataGetterMAG2019(self.config, seed_sets, method='spark',
+                                       papers=self.read_tsv(PAPERS_FPATH),
+                                       citations=self.read_tsv(CITATIONS_FPATH),
+                                       paper_authors=self.read_tsv(PAPER_AUTHORS_FPATH))
+        for name, seeds in seed_sets.items():
+            coll = batch.get_collection(name)
+            expected = self.get_datagetter(seeds).collection
+            assert sorted(p.paper_id for p in coll.papers) == sorted(p.paper_id for p in expected.papers)
+            assert sorted(coll.citations) == sorted(expected.citations)
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class TestDataGetterArrow(unittest.TestCase):
+    """Extract a collection with pyarrow from parquet copies of the TSV fixtures"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.fpaths = {}
+        for name, fpath in [('papers', PAPERS_FPATH), ('citations', CITATIONS_FPATH), ('paper_authors', PAPER_AUTHORS_FPATH)]:
+            df = pd.read_csv(fpath, sep='\t')
+            if name == 'papers':
+                df.drop_duplicates(subset=['PaperId'], inplace=True)
+            outfpath = Path(cls.tmpdir.name).joinpath('{}.parquet'.format(name))
+            # small row groups, so that row group statistics are used
+            pyarrow.parquet.write_table(pyarrow.Table.from_pandas(df, preserve_index=False), str(outfpath), row_group_size=10)
+            cls.fpaths[name] = outfpath
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.df_papers = pd.read_csv(PAPERS_FPATH, sep='\t')
+        self.df_papers.drop_duplicates(subset=['PaperId'], inplace=True)
+        self.df_citations = pd.read_csv(CITATIONS_FPATH, sep='\t')
+        self.df_authors = pd.read_csv(PAPER_AUTHORS_FPATH, sep='\t')
+
+    def get_datagetter(self, paper_ids):
+        return DataGetterMAG2019(None, paper_ids, description="test", method='arrow', **self.fpaths)
+
+    def test_000_all_papers(self):
+        """All fixture papers as seeds (as strings, with a blank line, like a seed file)"""
+        paper_ids = [str(x) for x in self.df_papers['PaperId']] + ['']
+        datagetter = self.get_datagetter(paper_ids)
+        coll = datagetter.collection
+        assert set(p.paper_id for p in coll.papers) == set(self.df_papers['PaperId'])
+        assert len(coll.citations) == len(self.df_citations)
+        assert len(datagetter.df_paper_authors) == len(self.df_authors)
+        assert 'OriginalAffiliation' not in datagetter.df_paper_authors.columns
+        metrics = datagetter.metrics.to_dict()
+        assert list(metrics) == ['open_sources', 'get_papers', 'get_citations', 'get_paper_authors', 'load_collection']
+        assert metrics['get_papers']['rows'] == len(self.df_papers)
+        assert metrics['get_citations']['rows'] == len(self.df_citations)
+        assert metrics['load_collection']['rows'] == len(coll)
+        assert 'spark_jobs' not in metrics['get_papers']
+        coll.construct_graph()
+        assert 'construct_graph' in datagetter.metrics.stages
+
+    def test_001_subset(self):
+        """Citations are kept only when both ends are seeds"""
+        paper_ids = self.df_papers['PaperId'].iloc[:40].tolist()
+        datagetter = self.get_datagetter(paper_ids)
+        coll = datagetter.collection
+        expected = self.df_citations[self.df_citations['PaperId'].isin(paper_ids)
+                                     & self.df_citations['PaperReferenceId'].isin(paper_ids)]
+        assert len(coll) == 40
+        assert sorted(coll.citations) == sorted(zip(expected['PaperId'], expected['PaperReferenceId']))
+        expected_authors = self.df_authors[self.df_authors['PaperId'].isin(paper_ids)]
+        assert len(datagetter.df_paper_authors) == len(expected_authors)
+        for p in coll.papers:
+            row = self.df_papers[self.df_papers['PaperId'] == p.paper_id].iloc[0]
+            assert p.title == row.PaperTitle
+            assert p.year == row.Year
+
+    def test_002_cache(self):
+        """A second extraction with the same seeds loads from the cache"""
+        paper_ids = self.df_papers['PaperId'].iloc[:40].tolist()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = DataGetterMAG2019(None, paper_ids, method='arrow', cache_dir=cache_dir, **self.fpaths)
+            assert not first.from_cache
+            second = DataGetterMAG2019(None, paper_ids, method='arrow', cache_dir=cache_dir, **self.fpaths)
+            assert second.from_cache
+            assert [p.to_dict() for p in second.collection.papers] == [p.to_dict() for p in first.collection.papers]
+            assert second.collection.citations == first.collection.citations
+            third = DataGetterMAG2019(None, paper_ids[:-1], method='arrow', cache_dir=cache_dir, **self.fpaths)
+            assert not third.from_cache
+            # results of another method are cached separately
+            key = third.get_cache_key()
+            third.method = 'spark'
+            assert third.get_cache_key() != key
+
+            # an expanded extraction gets the same seed_ids (the neighborhood, including IDs that are only
+            # in the citations) whether it is run or loaded from the cache
+            seeds = paper_ids[:3]
+            expected = expected_neighborhood(self.df_papers, self.df_citations, seeds, 1)
+            missing = next(x for x in expected if x not in seeds)
+            fpaths = dict(self.fpaths, papers=Path(cache_dir).joinpath('papers.parquet'))
+            self.df_papers[self.df_papers['PaperId'] != missing].to_parquet(str(fpaths['papers']), index=False)
+            first = DataGetterMAG2019(None, seeds, method='arrow', hops=1, cache_dir=cache_dir, **fpaths)
+            second = DataGetterMAG2019(None, seeds, method='arrow', hops=1, cache_dir=cache_dir, **fpaths)
+            assert second.from_cache and not first.from_cache
+            assert first.seed_ids == second.seed_ids == expected
+            assert missing not in set(p.paper_id for p in second.collection.papers)
+
+    def test_003_update(self):
+        """Incremental update matches a fresh extraction, and patches the written graph"""
+        import json
+        paper_ids = self.df_papers['PaperId'].tolist()
+        datagetter = self.get_datagetter(paper_ids[:40])
+        coll = datagetter.collection
+        coll.construct_graph()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            graph_fpath = Path(tmpdir).joinpath('graph.json')
+            coll.write_graph(graph_fpath)
+            added, removed = datagetter.update(paper_ids[5:60], graph_fpath=graph_fpath)
+            assert added == sorted(paper_ids[40:60])
+            assert removed == sorted(paper_ids[:5])
+
+            expected = self.get_datagetter(paper_ids[5:60]).collection
+            by_id = lambda c: sorted((p.to_dict() for p in c.papers), key=lambda d: (d['title'], d['pub_date']))
+            assert by_id(coll) == by_id(expected)
+            assert sorted(coll.citations) == sorted(expected.citations)
+            assert coll.G.number_of_nodes() == expected.construct_graph().number_of_nodes()
+            assert coll.G.number_of_edges() == expected.G.number_of_edges()
+
+            expected_fpath = Path(tmpdir).joinpath('expected.json')
+            expected.write_graph(expected_fpath)
+            data = json.loads(graph_fpath.read_text())
+            expected_data = json.loads(expected_fpath.read_text())
+            key = lambda d: d['id']
+            assert sorted(data['nodes'], key=key) == sorted(expected_data['nodes'], key=key)
+            key = lambda d: (d['source'], d['target'])
+            assert sorted(data['links'], key=key) == sorted(expected_data['links'], key=key)
+
+            # a graph written with a layout and null strings is patched the same way, with the new layout
+            datagetter = self.get_datagetter(paper_ids[:40])
+            datagetter.collection.compute_layout()
+            datagetter.collection.write_graph(graph_fpath, none_strings=False)
+            datagetter.update(paper_ids[5:60], graph_fpath=graph_fpath, none_strings=False)
+            assert datagetter.collection.layout is not None
+            datagetter.collection.write_graph(expected_fpath, none_strings=False)
+            key = lambda d: d['id']
+            assert sorted(json.loads(graph_fpath.read_text())['nodes'], key=key) \
+                == sorted(json.loads(expected_fpath.read_text())['nodes'], key=key)
+
+    def test_004_expand(self):
+        """k-hop expansion adds references and citing papers"""
+        seeds = self.df_papers['PaperId'].iloc[:3].tolist()
+        for hops, max_per_node in [(1, None), (2, None), (2, 2)]:
+            datagetter = DataGetterMAG2019(None, seeds, method='arrow', hops=hops, max_per_node=max_per_node, **self.fpaths)
+            expected = expected_neighborhood(self.df_papers, self.df_citations, seeds, hops, max_per_node)
+            assert len(expected) > len(seeds)
+            assert datagetter.seed_ids == expected
+            assert datagetter.initial_seed_ids == sorted(seeds)
+            coll = datagetter.collection
+            assert sorted(p.paper_id for p in coll.papers) == expected
+            expected_citations = self.df_citations[self.df_citations['PaperId'].isin(expected)
+                                                   & self.df_citations['PaperReferenceId'].isin(expected)]
+            assert len(coll.citations) == len(expected_citations)
+
+    def test_005_batch(self):
+        """One batch extraction gives the same collections and graphs as separate extractions"""
+        import json
+        paper_ids = self.df_papers['PaperId'].tolist()
+        seed_sets = {'a': paper_ids[:40], 'b': [str(x) for x in paper_ids[20:70]] + [''], 'c': paper_ids[60:], 'empty': []}
+        batch = BatchDataGetterMAG2019(None, seed_sets, descriptions={'a': "group a"}, method='arrow', **self.fpaths)
+        assert batch.seed_ids == sorted(paper_ids)
+        assert not hasattr(batch, 'update')
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfpaths = {name: Path(tmpdir).joinpath('{}.json'.format(name)) for name in seed_sets}
+            for processes in [1, 2]:
+                results = batch.write_graphs(outfpaths, processes=processes, serializer='json')
+                assert [r['name'] for r in results] == list(seed_sets)
+                for name, r in zip(seed_sets, results):
+                    expected = self.get_datagetter(seed_sets[name]).collection
+                    coll = batch.get_collection(name)
+                    assert [p.to_dict() for p in coll.papers] == [p.to_dict() for p in expected.papers]
+                    assert coll.citations == expected.citations
+                    assert r['num_papers'] == len(expected)
+                    expected_fpath = Path(tmpdir).joinpath('expected.json')
+                    expected.write_graph(expected_fpath, serializer='json')
+                    assert json.loads(outfpaths[name].read_text()) == json.loads(expected_fpath.read_text())
+        assert batch.get_collection('a').description == "group a"
+        assert batch.get_collection('c').description == 'c'
+
+    def test_006_update_expanded(self):
+        """Updating an expanded collection expands the new seeds, and caches under the seeds before expansion"""
+        import json
+        paper_ids = self.df_papers['PaperId'].tolist()
+        old_seeds, new_seeds = paper_ids[:3], paper_ids[2:6]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_dir = Path(tmpdir).joinpath('cache')
+            datagetter = DataGetterMAG2019(None, old_seeds, method='arrow', hops=1, max_per_node=5, cache_dir=cache_dir, **self.fpaths)
+            coll = datagetter.collection
+            graph_fpath = Path(tmpdir).joinpath('graph.json')
+            coll.write_graph(graph_fpath)
+            old_ids = set(datagetter.seed_ids)
+            added, removed = datagetter.update(new_seeds, graph_fpath=graph_fpath)
+
+            expected_ids = expected_neighborhood(self.df_papers, self.df_citations, new_seeds, 1, 5)
+            assert datagetter.seed_ids == expected_ids
+            assert datagetter.initial_seed_ids == sorted(new_seeds)
+            assert added == sorted(set(expected_ids) - old_ids)
+            assert removed == sorted(old_ids - set(expected_ids))
+            # papers pulled in by the expansion of seeds that are kept are not removed
+            assert (set(expected_ids) & old_ids) - set(old_seeds) - set(new_seeds)
+
+            expected = DataGetterMAG2019(None, new_seeds, method='arrow', hops=1, max_per_node=5, **self.fpaths).collection
+            assert sorted(p.paper_id for p in coll.papers) == sorted(p.paper_id for p in expected.papers)
+            assert sorted(coll.citations) == sorted(expected.citations)
+            expected_fpath = Path(tmpdir).joinpath('expected.json')
+            expected.write_graph(expected_fpath)
+            data = json.loads(graph_fpath.read_text())
+            expected_data = json.loads(expected_fpath.read_text())
+            assert sorted(node['id'] for node in data['nodes']) == sorted(node['id'] for node in expected_data['nodes'])
+            assert len(data['links']) == len(expected_data['links'])
+
+            # a fresh run with the new seeds finds the updated (expanded) frames in the cache
+            cached = DataGetterMAG2019(None, new_seeds, method='arrow', hops=1, max_per_node=5, cache_dir=cache_dir, **self.fpaths)
+            assert cached.from_cache
+            assert sorted(p.paper_id for p in cached.collection.papers) == sorted(p.paper_id for p in expected.papers)
@@ -4,13 +4,38 @@
 
 
 import unittest
+import sys
+import json
+import subprocess
+import gzip
+import tempfile
+import shutil
+from pathlib import Path
 
 from paper_collection import paper_collection
+from paper_collection.data_getter import get_authors_by_paper
 
 import pandas as pd
 import numpy as np
 
 
+COLUMN_MAP = {
+    'paper_id': 'PaperId',
+    'title': 'PaperTitle',
+    'display_title': 'OriginalTitle',
+    'doi': 'Doi',
+    'pub_date': 'Date',
+    'year': 'Year',
+    'venue': 'OriginalVenue',
+    'node_rank': 'flow',
+    'citing': 'PaperId',
+    'cited': 'PaperReferenceId',
+}
+
+# `import paper_collection` should take less than this (microseconds, as reported by python -X importtime)
+IMPORT_TIME_BUDGET = 150000
+
+
 class TestPaper_collection(unittest.TestCase):
     """Tests for `paper_collection` package."""
 
@@ -22,13 +47,30 @@ class TestPaper_collection(unittest.TestCase):
         self.df_citations = pd.read_csv('tests/jw_citations_mag2019.tsv', sep='\t')
         self.num_citations = len(self.df_citations)
         self.df_authors = pd.read_csv('tests/jw_PaperAuthorAffiliations_mag2019.tsv', sep='\t')
-        self.authors_by_paper = self.get_authors_by_paper(self.df_authors)
+        self.authors_by_paper = get_authors_by_paper(self.df_authors)
 
     def tearDown(self):
         """Tear down test fixtures, if any."""
 
-    def get_authors_by_paper(self, df_authors):
-        """Get a dictionary mapping paper_id to author data
+    def load_collection(self, **kwargs):
+        return paper_collection.PaperCollection.from_frames(self.df_papers,
+                                                            df_citations=self.df_citations,
+                                                            df_authors=self.df_authors,
+                                                            column_map=COLUMN_MAP,
+                                                            description="Paper Collection",
+                                                            dataset='mag',
+                                                            dataset_version='mag-2019-11-22',
+                                                            **kwargs)
+
+    def node_link_json(self, coll):
+        """Output of the networkx-based writer, with edges under 'links'"""
+        from networkx.readwrite import json_graph
+        data = json_graph.node_link_data(coll.construct_graph())
+        data['links'] = data.pop('edges', None) or data.pop('links')
+        return json.dumps(data)
+
+    def get_authors_by_paper_loop(self, df_authors):
+        """Reference implementation: groupby with iterrows for each paper
 
         """
         author_data = {}
@@ -82,3 +124,604 @@ class TestPaper_collection(unittest.TestCase):
         assert G.number_of_nodes() == self.num_papers
         assert G.number_of_edges() == self.num_citations
 
+
+    def test_003_authors_by_paper(self):
+        """Vectorized author grouping matches the groupby/iterrows implementation"""
+        expected = self.get_authors_by_paper_loop(self.df_authors)
+        assert self.authors_by_paper == expected
+        for paper_id, authors in expected.items():
+            assert [a['name'] for a in self.authors_by_paper[paper_id]] == [a['name'] for a in authors]
+
+    def test_004_from_frames(self):
+        """Bulk constructor matches loading papers one row at a time"""
+        coll = paper_collection.PaperCollection.from_frames(self.df_papers,
+                                                            df_citations=self.df_citations,
+                                                            df_authors=self.df_authors,
+                                                            column_map=COLUMN_MAP,
+                                                            description="Paper Collection",
+                                                            dataset='mag',
+                                                            dataset_version='mag-2019-11-22')
+        assert len(coll) == self.num_papers
+        assert len(coll.citations) == self.num_citations
+        for p, (_, prow) in zip(coll.papers, self.df_papers.iterrows()):
+            expected = self.load_paper(prow)
+            assert p.paper_id == expected.paper_id
+            assert p.authors == expected.authors
+            assert p.to_dict() == expected.to_dict()
+        for (citing, cited), (_, row) in zip(coll.citations, self.df_citations.iterrows()):
+            assert (citing, cited) == (row.PaperId, row.PaperReferenceId)
+
+    def test_005_compact(self):
+        """Papers stored in a PaperTable match the list of Paper objects"""
+        kwargs = dict(df_citations=self.df_citations,
+                      df_authors=self.df_authors,
+                      column_map=COLUMN_MAP,
+                      dataset='mag',
+                      dataset_version='mag-2019-11-22')
+        coll = paper_collection.PaperCollection.from_frames(self.df_papers, **kwargs)
+        coll_compact = paper_collection.PaperCollection.from_frames(self.df_papers, compact=True, **kwargs)
+        assert len(coll_compact) == self.num_papers
+        for p, p_compact in zip(coll.papers, coll_compact.papers):
+            assert p_compact.paper_id == p.paper_id
+            assert p_compact.authors == p.authors
+            assert p_compact.to_dict() == p.to_dict()
+        assert coll_compact.papers[-1].paper_id == coll.papers[-1].paper_id
+        G = coll_compact.construct_graph()
+        assert G.number_of_nodes() == self.num_papers
+        assert len(coll.compact().papers) == self.num_papers
+
+    def test_006_write_graph(self):
+        """Streaming writer output is the same as networkx node_link_data"""
+        coll = self.load_collection()
+        # a repeated paper, a repeated citation, and a citation outside the collection
+        coll.papers.append(coll.papers[0])
+        coll.citations.append(coll.citations[0])
+        coll.citations.append((coll.papers[5].paper_id, 12345))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfpath = Path(tmpdir).joinpath('graph.json')
+            coll.write_graph(outfpath, serializer='json')
+            assert outfpath.read_text() == self.node_link_json(coll)
+
+            outfpath = Path(tmpdir).joinpath('graph.json.gz')
+            coll.write_graph(outfpath, serializer='json')
+            with gzip.open(str(outfpath), 'rt') as f:
+                assert f.read() == self.node_link_json(coll)
+
+    def test_007_serializers(self):
+        """Every installed JSON backend writes the same data"""
+        from paper_collection.serialize import SERIALIZERS, get_serializer
+        coll = self.load_collection()
+        coll.papers[0].year = np.int64(coll.papers[0].year)
+        coll.papers[1].node_rank = np.nan
+        expected = json.loads(self.node_link_json(coll))
+        assert expected['nodes'][1]['node_rank'] is None
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in SERIALIZERS:
+                try:
+                    get_serializer(name)
+                except ImportError:
+                    continue
+                outfpath = Path(tmpdir).joinpath('graph_{}.json'.format(name))
+                coll.write_graph(outfpath, serializer=name)
+                assert json.loads(outfpath.read_text()) == expected
+            # the default is the stdlib json, whatever else is installed; the others are opt-in
+            outfpath = Path(tmpdir).joinpath('graph.json')
+            coll.write_graph(outfpath)
+            assert outfpath.read_text() == self.node_link_json(coll)
+            name, _ = get_serializer('fastest')
+            assert name in SERIALIZERS
+
+    def test_008_add_remove_papers(self):
+        """Removing and re-adding papers patches the collection and graph"""
+        for compact in [False, True]:
+            coll = self.load_collection(compact=compact)
+            G = coll.construct_graph()
+            removed = [p for p in coll.papers][:10]
+            removed_ids = set(p.paper_id for p in removed)
+            removed_citations = [c for c in coll.citations if c[0] in removed_ids or c[1] in removed_ids]
+            coll.remove_papers(removed_ids)
+            assert len(coll) == self.num_papers - 10
+            assert len(coll.citations) == self.num_citations - len(removed_citations)
+            assert G.number_of_nodes() == self.num_papers - 10
+            assert G.number_of_edges() == len(coll.citations)
+            coll.add_papers(removed, removed_citations)
+            assert len(coll) == self.num_papers
+            assert len(coll.citations) == self.num_citations
+            assert G.number_of_nodes() == self.num_papers
+            assert G.number_of_edges() == self.num_citations
+
+    def test_009_citation_graph(self):
+        """CSR citation graph matches the networkx graph"""
+        coll = self.load_collection()
+        coll.citations.append(coll.citations[0])
+        coll.citations.append((coll.papers[5].paper_id, 12345))
+        G = coll.construct_graph()
+        for compact in [False, True]:
+            if compact:
+                coll.compact()
+            cg = coll.construct_citation_graph()
+            assert cg.number_of_nodes() == G.number_of_nodes()
+            assert cg.number_of_edges() == G.number_of_edges()
+            labels = [str(x) for x in cg.node_ids]
+            assert labels == list(G.nodes)
+            assert dict(zip(labels, cg.out_degree().tolist())) == dict(G.out_degree())
+            assert dict(zip(labels, cg.in_degree().tolist())) == dict(G.in_degree())
+            for paper_id in cg.node_ids[:20]:
+                assert sorted(str(x) for x in cg.successors(paper_id)) == sorted(G.successors(str(paper_id)))
+                assert sorted(str(x) for x in cg.predecessors(paper_id)) == sorted(G.predecessors(str(paper_id)))
+            assert cg.index_of(-1) == -1
+            assert list(cg.to_networkx().edges) == list(G.edges)
+
+            ids = cg.node_ids[::3]
+            sub = cg.subgraph(ids)
+            G_sub = G.subgraph([str(x) for x in ids])
+            assert sub.number_of_nodes() == G_sub.number_of_nodes()
+            assert sub.number_of_edges() == G_sub.number_of_edges()
+
+    def test_010_node_rank(self):
+        """PageRank node ranks match networkx, with and without scipy and warm starts"""
+        import networkx as nx
+        from paper_collection.ranking import pagerank
+        coll = self.load_collection()
+        G = coll.construct_graph()
+        cg = coll.construct_citation_graph()
+        ranks, cold_iterations = pagerank(cg, tol=1e-12, max_iter=1000)
+        _, warm_iterations = pagerank(cg, tol=1e-12, max_iter=1000, start=ranks)
+        assert warm_iterations < cold_iterations
+        try:
+            expected = nx.pagerank(G, alpha=0.85, tol=1e-12, max_iter=1000)
+        except ImportError:  # networkx uses scipy
+            self.skipTest("scipy is not installed")
+        expected = np.array([expected[str(x)] for x in cg.node_ids])
+        for use_scipy in [False, None]:
+            ranks, iterations = pagerank(cg, tol=1e-12, max_iter=1000, use_scipy=use_scipy)
+            assert np.allclose(ranks, expected, atol=1e-9)
+
+        for compact in [False, True]:
+            coll = self.load_collection(compact=compact)
+            coll.compute_node_rank(tol=1e-12, max_iter=1000, warm_start=False)
+            paper_ranks = {p.paper_id: p.node_rank for p in coll.papers}
+            for paper_id, rank in zip(cg.node_ids, expected):
+                if paper_id in paper_ranks:
+                    assert abs(paper_ranks[paper_id] - rank) < 1e-9
+            assert coll.compute_node_rank(tol=1e-12, max_iter=1000) <= 2
+
+    def test_011_derived_fields(self):
+        """display_title, url, and display_authors are derived on first access, or in bulk"""
+        p = paper_collection.Paper(paper_id=1, title="a test paper", doi="10.1/abc",
+                                   authors=[{'name': 'A'}, {'name': 'B'}])
+        assert p._display_title is None and p._url is None and p._display_authors is None
+        assert p.display_title == "A Test Paper"
+        assert p.url == "https://doi.org/10.1/abc"
+        assert p.display_authors == "A, B"
+        p.load_authors([{'name': 'C'}])
+        assert p.display_authors == "C"
+        p = paper_collection.Paper(paper_id=2, title="a test paper", display_title="Given", url="http://example.com")
+        assert p.display_title == "Given" and p.url == "http://example.com"
+        assert p.display_authors is None
+
+        lazy = self.load_collection()
+        for p in lazy.papers[::2]:
+            p.display_title = None
+        bulk = self.load_collection()
+        for p in bulk.papers[::2]:
+            p.display_title = None
+        bulk.derive_display_fields()
+        assert bulk.papers[0]._display_title is not None
+        assert [p.to_dict() for p in bulk.papers] == [p.to_dict() for p in lazy.papers]
+
+        # missing titles and DOIs (None, NaN, or empty) give the same result either way
+        def missing_papers():
+            values = [None, np.nan, '', "a title", "ǆemal's ﬁsh 2nd"]
+            return [paper_collection.Paper(paper_id=i, title=title, display_title=given, doi=doi)
+                    for i, (title, given, doi) in enumerate((t, g, d) for t in values for g in values for d in values)]
+        lazy_missing = paper_collection.PaperCollection(papers=missing_papers())
+        bulk_missing = paper_collection.PaperCollection(papers=missing_papers()).derive_display_fields()
+        attrs = [[(p.display_title, p.url) for p in coll.papers] for coll in (lazy_missing, bulk_missing)]
+        assert attrs[0] == attrs[1]
+        assert (None, None) in attrs[0] and ("A Title", None) in attrs[0] and ("ǅemal'S Fish 2Nd", None) in attrs[0]
+        assert all(p.url is None for p in bulk_missing.papers if not isinstance(p.doi, str) or not p.doi)
+
+        # display_authors comes from one join over the author names
+        with_authors = [p for p in bulk.papers if p.authors]
+        assert with_authors and all(p._display_authors == p.get_display_authors() for p in with_authors)
+        assert paper_collection.join_author_names([[], [{'name': 'A'}], [{'name': 'B'}, {'name': 'C'}], []]) == [None, 'A', 'B, C', None]
+
+        # exports derive them in bulk first
+        coll = self.load_collection()
+        assert all(p._display_authors is None for p in coll.papers)
+        records = coll.to_records(none_strings=True)
+        assert all(p._display_authors is not None for p in coll.papers if p.authors)
+        assert records == [p.to_dict() for p in self.load_collection().papers]
+
+    def test_012_import_time(self):
+        """Importing the package is fast, and doesn't import pandas, numpy, networkx, or pyspark"""
+        code = "import sys, paper_collection; print(','.join(m for m in ['pandas', 'numpy', 'networkx', 'pyspark'] if m in sys.modules))"
+        r = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert r.stdout.strip() == ''
+        times = []
+        for _ in range(3):
+            r = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import paper_collection'],
+                               capture_output=True, text=True, check=True)
+            # lines look like "import time:   self [us] | cumulative | imported package"
+            line = next(l for l in r.stderr.splitlines() if l.split('|')[-1].strip() == 'paper_collection')
+            times.append(int(line.split('|')[1]))
+        assert min(times) < IMPORT_TIME_BUDGET, "import took {} us".format(min(times))
+        # a star import stays fast too: the lazy names are in dir() but not in __all__
+        code = "import sys; from paper_collection import *; print(','.join(m for m in ['pandas', 'numpy', 'pyspark'] if m in sys.modules))"
+        r = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert r.stdout.strip() == ''
+        import paper_collection as package
+        assert 'PaperTable' not in package.__all__ and 'PaperTable' in dir(package)
+        from paper_collection.paper_table import PaperTable
+        assert package.PaperTable is PaperTable
+        with self.assertRaises(AttributeError):
+            package.not_a_name
+
+    def test_013_metrics(self):
+        """construct_graph and write_graph record their stages; metrics export as JSON and Prometheus text"""
+        coll = self.load_collection()
+        G = coll.construct_graph()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfpath = Path(tmpdir).joinpath('graph.json')
+            coll.write_graph(outfpath)
+            coll.write_graph(outfpath)
+            metrics = coll.metrics.to_dict()
+            assert list(metrics) == ['construct_graph', 'write_graph']
+            assert metrics['construct_graph']['rows'] == G.number_of_nodes()
+            assert metrics['construct_graph']['edges'] == G.number_of_edges()
+            assert metrics['write_graph']['calls'] == 2
+            assert metrics['write_graph']['rows'] == 2 * G.number_of_nodes()
+            assert metrics['write_graph']['bytes'] == 2 * outfpath.stat().st_size
+            for record in metrics.values():
+                assert record['seconds'] > 0
+                assert record['peak_rss'] > 0
+
+            data = json.loads(coll.metrics.to_json(collection='test'))
+            assert data['collection'] == 'test' and data['stages'] == metrics
+
+            prom_fpath = Path(tmpdir).joinpath('metrics.prom')
+            coll.metrics.write_prometheus(prom_fpath, collection='te"st')
+            lines = prom_fpath.read_text().splitlines()
+            assert '# TYPE paper_collection_stage_seconds gauge' in lines
+            line = next(l for l in lines if l.startswith('paper_collection_stage_rows{'))
+            assert line == 'paper_collection_stage_rows{{collection="te\\"st",stage="construct_graph"}} {}'.format(
+                float(G.number_of_nodes()))
+            assert any(l.startswith('paper_collection_stage_peak_rss_bytes{') for l in lines)
+            assert list(Path(tmpdir).iterdir()) != [] and not any('.tmp-' in p.name for p in Path(tmpdir).iterdir())
+
+    def test_014_save_open(self):
+        """A collection saved in the binary format opens memory-mapped and gives the same papers, citations, and graph"""
+        coll = self.load_collection()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir).joinpath('coll')
+            coll.save(path)
+            opened = paper_collection.PaperCollection.open(path)
+            assert opened.description == coll.description
+            assert isinstance(opened.papers.get_column('year'), np.memmap)
+            assert isinstance(opened.citation_graph.out_indices, np.memmap)
+            assert len(opened) == len(coll)
+            assert [p.to_dict() for p in opened.papers] == [p.to_dict() for p in coll.papers]
+            assert [p.authors for p in opened.papers] == [[{'name': a['name'], 'author_id': a['author_id']} for a in p.authors]
+                                                          for p in coll.papers]
+            assert list(opened.citations) == coll.citations
+            assert opened.citations[-1] == coll.citations[-1]
+
+            cg = coll.construct_citation_graph()
+            for paper in coll.papers[:10]:
+                assert list(opened.citation_graph.successors(paper.paper_id)) == list(cg.successors(paper.paper_id))
+                assert list(opened.citation_graph.predecessors(paper.paper_id)) == list(cg.predecessors(paper.paper_id))
+            assert opened.citation_graph.index_of(-1) == -1
+
+            coll.write_graph(Path(tmpdir).joinpath('expected.json'), serializer='json')
+            opened.write_graph(Path(tmpdir).joinpath('opened.json'), serializer='json')
+            assert Path(tmpdir).joinpath('opened.json').read_text() == Path(tmpdir).joinpath('expected.json').read_text()
+
+            # node ranks are computed on the mapped graph; the ranks column is then held in memory
+            opened.compute_node_rank()
+            assert not isinstance(opened.papers.get_column('node_rank'), np.memmap)
+            opened.add_papers([], [(coll.papers[0].paper_id, coll.papers[1].paper_id)])
+            assert len(opened.citations) == len(coll.citations) + 1
+
+            # saving again replaces the directory
+            coll.save(path)
+            in_memory = paper_collection.PaperCollection.open(path, mmap=False)
+            assert not isinstance(in_memory.papers.get_column('year'), np.memmap)
+            assert len(in_memory) == len(coll)
+            assert sorted(p.name for p in Path(tmpdir).iterdir()) == ['coll', 'expected.json', 'opened.json']
+
+            # repeated citations are kept (the graph has the edge once), also when an opened collection is saved
+            repeated = self.load_collection()
+            repeated.citations = repeated.citations + repeated.citations[:3]
+            repeated.save(path)
+            opened = paper_collection.PaperCollection.open(path)
+            assert list(opened.citations) == repeated.citations
+            assert opened.citation_graph.number_of_edges() == len(coll.citations)
+            opened.save(Path(tmpdir).joinpath('again'))
+            again = paper_collection.PaperCollection.open(Path(tmpdir).joinpath('again'))
+            assert list(again.citations) == repeated.citations
+            shutil.rmtree(str(Path(tmpdir).joinpath('again')))
+            coll.save(path)
+
+            meta_fpath = path.joinpath('meta.json')
+            meta = json.loads(meta_fpath.read_text())
+            meta['version'] += 1
+            meta_fpath.write_text(json.dumps(meta))
+            with self.assertRaises(ValueError):
+                paper_collection.PaperCollection.open(path)
+
+    def test_015_to_records(self):
+        """to_records cleans whole columns the way Paper.to_dict cleans each paper"""
+        coll = self.load_collection()
+        expected = [p.to_dict() for p in coll.papers]
+        assert coll.to_records(none_strings=True) == expected
+        records = coll.to_records()
+        assert len(records) == len(expected)
+        for record, d in zip(records, expected):
+            assert record == {k: None if v == 'None' else v for k, v in d.items()}
+        assert records == [p.to_dict(none_strings=False) for p in coll.papers]
+        assert list(coll.iter_records(none_strings=True, chunk_size=7)) == expected
+
+        compact = coll.compact()
+        assert compact.to_records(none_strings=True) == expected
+        assert compact.to_records() == records
+        assert list(compact.iter_records(chunk_size=7)) == records
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir).joinpath('coll')
+            coll.save(path)
+            assert paper_collection.PaperCollection.open(path).to_records(none_strings=True) == expected
+
+            outfpath = Path(tmpdir).joinpath('nulls.json')
+            coll.write_graph(outfpath, serializer='json', none_strings=False)
+            nodes = json.loads(outfpath.read_text())['nodes']
+            assert any(v is None for node in nodes for v in node.values())
+            assert not any(v == 'None' for node in nodes for v in node.values())
+
+    def test_016_coauthorship(self):
+        """Coauthorship edge weights count the papers each pair of authors wrote together"""
+        from itertools import combinations
+        from collections import Counter
+        from paper_collection.coauthorship import CoauthorshipGraph
+        coll = self.load_collection()
+        expected = Counter()
+        papers_per_author = Counter()
+        for paper in coll.papers:
+            author_ids = sorted(set(a['author_id'] for a in paper.authors))
+            papers_per_author.update(author_ids)
+            expected.update(combinations(author_ids, 2))
+        assert len(expected) > 0
+
+        def get_weights(cg):
+            ids = cg.author_ids.tolist()
+            return {tuple(sorted((ids[s], ids[t]))): w
+                    for s, t, w in zip(cg.sources.tolist(), cg.targets.tolist(), cg.weights.tolist())}
+
+        cg = coll.construct_coauthorship_graph()
+        assert coll.coauthorship_graph is cg
+        assert get_weights(cg) == dict(expected)
+        assert dict(zip(cg.author_ids.tolist(), cg.num_papers.tolist())) == dict(papers_per_author)
+        assert (cg.sources < cg.targets).all()
+        assert get_weights(CoauthorshipGraph.from_collection(coll.papers, use_scipy=False)) == dict(expected)
+        assert get_weights(coll.compact().construct_coauthorship_graph()) == dict(expected)
+        from_frame = coll.construct_coauthorship_graph(df_authors=self.df_authors)
+        assert get_weights(from_frame) == dict(expected)
+        assert sorted(from_frame.author_ids.tolist()) == sorted(cg.author_ids.tolist())
+        assert all(from_frame.names)
+
+        # papers with more than max_authors authors add no edges
+        max_authors = max(len(set(a['author_id'] for a in p.authors)) for p in coll.papers) - 1
+        pruned = coll.construct_coauthorship_graph(max_authors=max_authors)
+        assert 0 < pruned.number_of_edges() < cg.number_of_edges()
+        assert pruned.number_of_nodes() == cg.number_of_nodes()
+        fractional = coll.construct_coauthorship_graph(weighting='fractional')
+        assert np.allclose(fractional.weights, CoauthorshipGraph.from_collection(
+            coll.papers, weighting='fractional', use_scipy=False).weights)
+        assert (fractional.weights <= cg.weights).all()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfpath = Path(tmpdir).joinpath('coauthorship.json')
+            coll.write_coauthorship_graph(outfpath, weighting='count')
+            data = json.loads(outfpath.read_text())
+            assert data['directed'] is False
+            assert len(data['nodes']) == cg.number_of_nodes()
+            assert sorted(node['num_papers'] for node in data['nodes']) == sorted(papers_per_author.values())
+            G = cg.to_networkx()
+            assert G.number_of_edges() == len(data['links'])
+            for link in data['links']:
+                assert G.edges[link['source'], link['target']]['weight'] == link['weight']
+
+    def test_017_timeline(self):
+        """Timeline chunks together have the records of write_graph, split by year, with a manifest of cross-chunk links"""
+        coll = self.load_collection()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            expected_fpath = Path(tmpdir).joinpath('expected.json')
+            coll.write_graph(expected_fpath, serializer='json')
+            expected = json.loads(expected_fpath.read_text())
+
+            outdir = Path(tmpdir).joinpath('timeline')
+            manifest = coll.write_timeline(outdir, serializer='json')
+            assert json.loads(outdir.joinpath('manifest.json').read_text()) == manifest
+            assert manifest['num_nodes'] == len(expected['nodes'])
+            assert manifest['num_links'] == len(expected['links'])
+            nodes, links = [], []
+            chunk_of = {}
+            last_year = None
+            for chunk in manifest['chunks']:
+                data = json.loads(outdir.joinpath(chunk['file']).read_text())
+                assert data['graph']['chunk'] == chunk['id']
+                assert len(data['nodes']) == chunk['num_nodes']
+                assert len(data['links']) == chunk['num_links']
+                for node in data['nodes']:
+                    chunk_of[node['id']] = chunk['id']
+                    if chunk['year_start'] is not None:
+                        assert chunk['year_start'] == node['year'] == chunk['year_end']
+                        assert last_year is None or node['year'] >= last_year
+                        last_year = node['year']
+                nodes.extend(data['nodes'])
+                links.extend(data['links'])
+            # links into other chunks name the chunk of their target
+            assert any('target_chunk' in link for link in links)
+            for link in links:
+                assert link.pop('target_chunk', chunk_of[link['source']]) == chunk_of[link['target']]
+            key = lambda d: json.dumps(d, sort_keys=True)
+            assert sorted(map(key, nodes)) == sorted(map(key, expected['nodes']))
+            assert sorted(map(key, links)) == sorted(map(key, expected['links']))
+            for chunk in manifest['chunks']:
+                cross = sum(1 for link in links if chunk_of[link['source']] == chunk['id'] and chunk_of[link['target']] != chunk['id'])
+                assert sum(chunk['links_to'].values()) == cross
+
+            # rebuild one chunk; with a new chunk width, files of the old chunks are removed
+            first = manifest['chunks'][0]
+            outdir.joinpath(first['file']).unlink()
+            coll.write_timeline(outdir, chunks=[first['id']], serializer='json')
+            assert outdir.joinpath(first['file']).exists()
+            with self.assertRaises(ValueError):
+                coll.write_timeline(outdir, chunks=['1066'])
+            manifest = coll.write_timeline(outdir, years_per_chunk=10, compress=True)
+            assert all(chunk['year_start'] is None or chunk['year_start'] % 10 == 0 for chunk in manifest['chunks'])
+            assert sorted(p.name for p in outdir.iterdir()) == sorted([chunk['file'] for chunk in manifest['chunks']] + ['manifest.json'])
+            with gzip.open(str(outdir.joinpath(manifest['chunks'][0]['file'])), 'rt') as f:
+                assert len(json.load(f)['nodes']) == manifest['chunks'][0]['num_nodes']
+
+            # a full rewrite skips old chunk files that are already gone, and ignores a corrupt old manifest
+            outdir.joinpath(manifest['chunks'][0]['file']).unlink()
+            manifest = coll.write_timeline(outdir, years_per_chunk=5)
+            assert sorted(p.name for p in outdir.iterdir()) == sorted([chunk['file'] for chunk in manifest['chunks']] + ['manifest.json'])
+            outdir.joinpath('manifest.json').write_text('{"chunks": [')
+            manifest = coll.write_timeline(outdir, years_per_chunk=5)
+            assert json.loads(outdir.joinpath('manifest.json').read_text()) == manifest
+
+    def test_018_layout(self):
+        """The time-directed layout puts x in time order and y in [0, 1], is embedded in the exported nodes, and is cached"""
+        coll = self.load_collection()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_dir = Path(tmpdir).joinpath('cache')
+            layout = coll.compute_layout(cache_dir=cache_dir)
+            assert coll.metrics.stages['compute_layout']['cached'] is False
+            n = coll.citation_graph.number_of_nodes()
+            assert len(layout.x) == len(layout.y) == n
+            assert ((layout.x >= 0) & (layout.x <= 1)).all()
+            assert ((layout.y >= 0) & (layout.y <= 1)).all()
+            x, _ = layout.get_positions([p.paper_id for p in coll.papers])
+            by_year = sorted(zip([p.year for p in coll.papers], x))
+            assert [x for _, x in by_year] == sorted(x)
+
+            # the same collection reuses the layout; on disk, the cache is keyed by the collection's graph and dates
+            assert coll.compute_layout(cache_dir=cache_dir) is layout
+            other = self.load_collection()
+            other_layout = other.compute_layout(cache_dir=cache_dir)
+            assert other.metrics.stages['compute_layout']['cached'] is True
+            assert np.array_equal(other_layout.y, layout.y)
+            assert len(list(cache_dir.iterdir())) == 1
+            other.compute_layout(seed=1, cache_dir=cache_dir)
+            assert other.metrics.stages['compute_layout']['cached'] is False
+            assert len(list(cache_dir.iterdir())) == 2
+            from paper_collection.layout import time_directed_layout
+            _, y_numpy = time_directed_layout(coll.citation_graph, np.full(n, np.nan), use_scipy=False)
+            _, y_scipy = time_directed_layout(coll.citation_graph, np.full(n, np.nan), use_scipy=True)
+            assert np.allclose(y_numpy, y_scipy)
+
+            records = coll.to_records()
+            assert all(0 <= r['x'] <= 1 and 0 <= r['y'] <= 1 for r in records)
+            assert list(coll.iter_records(chunk_size=7)) == records
+            outfpath = Path(tmpdir).joinpath('graph.json')
+            coll.write_graph(outfpath, serializer='json')
+            nodes = json.loads(outfpath.read_text())['nodes']
+            assert all('x' in node and 'y' in node for node in nodes)
+            assert json.loads(outfpath.read_text()) == json.loads(self.node_link_json(coll))
+            manifest = coll.write_timeline(Path(tmpdir).joinpath('timeline'))
+            chunk = json.loads(Path(tmpdir).joinpath('timeline', manifest['chunks'][0]['file']).read_text())
+            assert all('x' in node for node in chunk['nodes'])
+
+            # changing the collection drops the layout
+            coll.remove_papers([coll.papers[0].paper_id])
+            assert coll.layout is None
+            assert 'x' not in coll.to_records()[0]
+
+    def test_019_summary(self):
+        """The summary keeps the top-k papers by node_rank in each year and collapses the rest into weighted clusters"""
+        coll = self.load_collection()
+        k = 2
+        summary = coll.summarize(k=k)
+        papers = [node for node in summary.nodes if not node.get('cluster')]
+        clusters = [node for node in summary.nodes if node.get('cluster')]
+        by_year = {}
+        for paper in coll.papers:
+            by_year.setdefault(paper.year, []).append(paper)
+        expected_ids = set()
+        for year, year_papers in by_year.items():
+            # missing node ranks last
+            top = sorted(year_papers, key=lambda p: (p.node_rank != p.node_rank, -p.node_rank))[:k]
+            expected_ids.update(str(p.paper_id) for p in top)
+        assert set(node['id'] for node in papers) == expected_ids
+        num_nodes = coll.citation_graph.number_of_nodes()
+        assert len(papers) + sum(node['count'] for node in clusters) == num_nodes
+        num_links = coll.citation_graph.number_of_edges()
+        assert summary.weights.sum() + sum(node['internal_links'] for node in clusters) == num_links
+        assert summary.number_of_edges() < num_links
+        paper = papers[0]
+        assert {k: v for k, v in paper.items() if k != 'id'} == [p for p in coll.papers if str(p.paper_id) == paper['id']][0].to_dict()
+
+        coll.compute_layout()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outfpath = Path(tmpdir).joinpath('summary.json')
+            coll.write_summary(outfpath, k=k)
+            data = json.loads(outfpath.read_text())
+            assert len(data['nodes']) == summary.number_of_nodes()
+            assert all('x' in node and 'y' in node for node in data['nodes'])
+            ids = set(node['id'] for node in data['nodes'])
+            assert all(link['source'] in ids and link['target'] in ids and link['weight'] >= 1 for link in data['links'])
+            assert sum(link['weight'] for link in data['links']) == summary.weights.sum()
+
+    def test_020_update_node_link(self):
+        """Patching a written graph in a streaming pass gives the same graph as writing the new collection"""
+        from unittest import mock
+        from paper_collection import serialize
+        coll = self.load_collection()
+        removed = coll.papers[:10]
+        removed_ids = set(p.paper_id for p in removed)
+        removed_citations = [c for c in coll.citations if c[0] in removed_ids or c[1] in removed_ids]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for fname in ['graph.json', 'graph.json.gz']:
+                outfpath = Path(tmpdir).joinpath(fname)
+                coll.write_graph(outfpath)
+                new = self.load_collection()
+                new.remove_papers(removed_ids)
+                new.add_papers(removed[:5], removed_citations)
+                expected_fpath = Path(tmpdir).joinpath('expected_' + fname)
+                new.write_graph(expected_fpath)
+                # small chunks, so that records are split across reads
+                with mock.patch.object(serialize, 'READ_CHUNK_SIZE', 7):
+                    num_nodes, num_links = serialize.update_node_link(outfpath, papers=removed[:5],
+                                                                      citations=removed_citations, remove_ids=removed_ids)
+                opener = gzip.open if fname.endswith('.gz') else open
+                with opener(str(outfpath), 'rt') as f:
+                    data = json.load(f)
+                with opener(str(expected_fpath), 'rt') as f:
+                    expected = json.load(f)
+                key = lambda d: d['id']
+                assert sorted(data['nodes'], key=key) == sorted(expected['nodes'], key=key)
+                key = lambda d: (d['source'], d['target'])
+                assert sorted(data['links'], key=key) == sorted(expected['links'], key=key)
+                assert (num_nodes, num_links) == (len(data['nodes']), len(data['links']))
+                assert data['directed'] is True
+
+            # a file written with a layout and null strings keeps both: new nodes get positions and nulls,
+            # and the other nodes get the positions of the new layout
+            outfpath = Path(tmpdir).joinpath('layout.json')
+            coll.compute_layout()
+            coll.write_graph(outfpath, none_strings=False)
+            new = self.load_collection()
+            new.remove_papers(removed_ids)
+            new.add_papers(removed[:5], removed_citations)
+            new.compute_layout()
+            expected_fpath = Path(tmpdir).joinpath('expected_layout.json')
+            new.write_graph(expected_fpath, none_strings=False)
+            serialize.update_node_link(outfpath, papers=removed[:5], citations=removed_citations, remove_ids=removed_ids,
+                                       none_strings=False, positions=new.layout.node_positions())
+            data = json.loads(outfpath.read_text())
+            expected = json.loads(expected_fpath.read_text())
+            key = lambda d: d['id']
+            assert sorted(data['nodes'], key=key) == sorted(expected['nodes'], key=key)
+            assert all('x' in node for node in data['nodes'])
+            assert not any(v == 'None' for node in data['nodes'] for v in node.values())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""Tests for `paper_collection.server`."""
+
+
+import unittest
+
+from paper_collection import paper_collection
+
+import pandas as pd
+import numpy as np
+
+try:
+    import aiohttp
+    from aiohttp.test_utils import AioHTTPTestCase
+except ImportError:
+    aiohttp = None
+    AioHTTPTestCase = unittest.TestCase
+
+from .test_paper_collection import COLUMN_MAP
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestServer_(AioHTTPTestCase):
+    """Tests for the collection HTTP service, on localhost with the jw_* fixtures"""
+
+    @classmethod
+    def setUpClass(cls):
+        df_papers = pd.read_csv('tests/jw_papers_mag2019.tsv', sep='\t').drop_duplicates(subset=['PaperId'])
+        df_citations = pd.read_csv('tests/jw_citations_mag2019.tsv', sep='\t')
+        cls.coll = paper_collection.PaperCollection.from_frames(df_papers, df_citations=df_citations,
+                                                                 column_map=COLUMN_MAP, description="Paper Collection")
+        cls.cg = cls.coll.construct_citation_graph()
+        from paper_collection.server import CollectionIndex
+        cls.index = CollectionIndex(cls.coll)
+
+    async def get_application(self):
+        from paper_collection.server import make_app
+        return make_app(self.index)
+
+    async def get_json(self, path, status=200):
+        resp = await self.client.get(path)
+        self.assertEqual(resp.status, status)
+        return await resp.json() if status == 200 else None
+
+    async def test_000_info(self):
+        """Info has the graph's counts"""
+        info = await self.get_json('/')
+        self.assertEqual(info['num_nodes'], self.cg.number_of_nodes())
+        self.assertEqual(info['num_links'], self.cg.number_of_edges())
+        self.assertEqual(info['description'], "Paper Collection")
+
+    async def test_001_nodes_paged(self):
+        """Pages of nodes cover every node once, in graph order"""
+        ids = []
+        offset = 0
+        while True:
+            page = await self.get_json('/nodes?offset={}&limit=500'.format(offset))
+            self.assertEqual(page['total'], self.cg.number_of_nodes())
+            if not page['nodes']:
+                break
+            ids.extend(node['id'] for node in page['nodes'])
+            offset += 500
+        self.assertEqual(ids, [str(x) for x in self.cg.node_ids.tolist()])
+        await self.get_json('/nodes?limit=-1', status=400)
+        await self.get_json('/nodes?offset=x', status=400)
+
+    async def test_002_year_range(self):
+        """Year-range queries return exactly the papers in the range, in time order"""
+        page = await self.get_json('/nodes?year_start=2000&year_end=2004&limit=10000')
+        years = [node['year'] for node in page['nodes']]
+        self.assertEqual(years, sorted(years))
+        self.assertTrue(all(2000 <= y <= 2004 for y in years))
+        expected = sum(1 for p in self.coll.papers if p.year is not None and 2000 <= p.year <= 2004)
+        self.assertEqual(page['total'], expected)
+        self.assertGreater(expected, 0)
+
+    async def test_003_node_and_neighbors(self):
+        """A node's neighbors are its references and citing papers"""
+        i = int(np.argmax(self.cg.in_degree() + self.cg.out_degree()))
+        node_id = self.cg.node_ids[i]
+        node = await self.get_json('/nodes/{}'.format(node_id))
+        self.assertEqual(node['id'], str(node_id))
+        result = await self.get_json('/nodes/{}/neighbors'.format(node_id))
+        expected = set(str(x) for x in self.cg.successors(node_id)) | set(str(x) for x in self.cg.predecessors(node_id))
+        self.assertEqual(set(n['id'] for n in result['nodes']), expected)
+        self.assertEqual(len(result['links']), result['num_references'] + result['num_citations'])
+        result = await self.get_json('/nodes/{}/neighbors?direction=out'.format(node_id))
+        self.assertTrue(all(link['source'] == str(node_id) for link in result['links']))
+        await self.get_json('/nodes/nonexistent', status=404)
+
+    async def test_004_top_and_subgraph(self):
+        """Top k by node_rank, and the links among a subgraph"""
+        top = await self.get_json('/top?k=5')
+        ranks = [node['node_rank'] for node in top['nodes']]
+        self.assertEqual(len(ranks), 5)
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        known = [p.node_rank for p in self.coll.papers if p.node_rank is not None and not np.isnan(p.node_rank)]
+        self.assertEqual(ranks[0], max(known))
+
+        per_year = await self.get_json('/top?k=2&per_year=1&year_start=2000&year_end=2004')
+        counts = pd.Series([node['year'] for node in per_year['nodes']]).value_counts()
+        self.assertTrue((counts <= 2).all())
+        self.assertEqual(set(counts.index), set(range(2000, 2005)) & set(p.year for p in self.coll.papers))
+
+        sub = await self.get_json('/subgraph?year_start=2000&year_end=2004&k=50')
+        ids = set(node['id'] for node in sub['nodes'])
+        expected = self.cg.subgraph([int(x) for x in ids])
+        self.assertEqual(len(sub['links']), expected.number_of_edges())
+        self.assertTrue(all(link['source'] in ids and link['target'] in ids for link in sub['links']))
+        await self.get_json('/subgraph?k=100000', status=400)
+
+    async def test_005_etag(self):
+        """Responses carry an ETag, and a matching If-None-Match gets a 304 with no body"""
+        resp = await self.client.get('/nodes?limit=10')
+        etag = resp.headers['ETag']
+        body = await resp.read()
+        resp = await self.client.get('/nodes?limit=10', headers={'If-None-Match': etag})
+        self.assertEqual(resp.status, 304)
+        self.assertEqual(await resp.read(), b'')
+        # the same query in another order has the same ETag; another query has another one
+        resp = await self.client.get('/nodes?limit=10&offset=0')
+        other = await self.client.get('/nodes?offset=0&limit=10')
+        self.assertEqual(resp.headers['ETag'], other.headers['ETag'])
+        resp = await self.client.get('/nodes?limit=11')
+        self.assertNotEqual(resp.headers['ETag'], etag)
+        # compact JSON
+        self.assertNotIn(b', ', body[:200])